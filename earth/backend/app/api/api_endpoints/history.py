@@ -0,0 +1,37 @@
+import asyncio
+
+from fastapi import HTTPException, Query
+
+from eventbus.bus import History
+
+from ...bus import historian
+from ...tsdb.query import AGGREGATE, LTTB, POINTS
+from . import router
+
+
+# /api/history
+@router.get("/history")
+async def get_history_stats():
+    return History().stats
+
+
+# /api/history/query?eid=*.temperature&start=...&end=...&points=500&method=lttb
+@router.get("/history/query")
+async def query_history(
+    start: float,
+    end: float,
+    eid: list[str] = Query(),
+    points: int = POINTS,
+    method: str = LTTB,
+):
+    """Downsampled stored history of all eids matching the patterns, see app.tsdb.query"""
+    if method not in (AGGREGATE, LTTB):
+        raise HTTPException(status_code=400, detail=f"invalid method {method}")
+    return await asyncio.to_thread(historian.query.query, eid, start, end, points, method)
+
+
+# /api/history/{eid}
+@router.get("/history/{eid}")
+async def get_history(eid: str, since: float | None = None, until: float | None = None, limit: int | None = None):
+    """Recent values of eid, [[timestamp, value], ...]"""
+    return History().query(eid, since, until, limit)
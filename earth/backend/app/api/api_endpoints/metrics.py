@@ -0,0 +1,12 @@
+from fastapi.responses import PlainTextResponse
+
+from eventbus.bus import Metrics
+
+from . import router
+
+
+# /api/metrics
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Eventbus metrics in Prometheus text format, see eventbus.bus.metrics"""
+    return Metrics().prometheus()
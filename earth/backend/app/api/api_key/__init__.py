@@ -5,6 +5,7 @@ from uuid import UUID
 
 from fastapi import HTTPException
 
+from ..base.crud import on_write
 from .crud import crud
 from .endpoints import router
 from .model import ApiKey, ApiKeyBase
@@ -12,13 +13,41 @@ from .schema import ApiKeyCreate, ApiKeyRead, ApiKeyUpdate
 
 # TODO: implement api_key management
 
+# all api keys by kid (str(key.uuid)) and the most recent key, loaded on first use
+_keys: dict[str, ApiKeyRead] = {}
+_latest: list[ApiKeyRead] = []
+
+
+@on_write
+def _invalidate(model) -> None:
+    if model in (None, ApiKey):
+        _keys.clear()
+        _latest.clear()
+
+
+async def _load(db_session) -> None:
+    api_keys = []
+    while True:
+        page = await crud.get_list(db_session=db_session, skip=len(api_keys))
+        api_keys.extend(page)
+        if len(page) < 100:
+            break
+    if api_keys == []:
+        # create a first key (invalidates the cache)
+        obj_in = ApiKeyCreate()
+        api_keys = [await crud.create(obj_in=obj_in, db_session=db_session)]
+    _keys.update((str(key.uuid), key) for key in api_keys)  # type: ignore
+    _latest[:] = api_keys[-1:]  # type: ignore
+
 
 async def get_key(db_session, kid: str | None = None) -> ApiKeyRead:
     """
-    Retrieve an API key from the database.
+    Retrieve an API key.
+
+    Keys are cached in-process, the cache is invalidated when the api_key table is written.
 
     Args:
-        db_session: The database session.
+        db_session: The database session, used if the cache is empty.
         kid: The ID of the API key to retrieve (optional).
 
     Returns:
@@ -28,17 +57,12 @@ async def get_key(db_session, kid: str | None = None) -> ApiKeyRead:
     Raises:
         HTTPException: If the key for supplied kid is not found.
     """
-    api_keys = await crud.get_list(db_session=db_session)
-    if api_keys == []:
-        # create a first key
-        obj_in = ApiKeyCreate()
-        api_keys = [await crud.create(obj_in=obj_in, db_session=db_session)]
+    if not _latest:
+        await _load(db_session)
     if kid is None:
         # return the most recent key
-        return api_keys[-1]  # type: ignore
-
-    # find the key that matches the kid (str(key.uuid) == kid)
-    for key in api_keys:
-        if str(key.uuid) == kid:
-            return key  # type: ignore
-    raise HTTPException(status_code=404, detail="API key not found")
+        return _latest[0]
+    try:
+        return _keys[kid]
+    except KeyError:
+        raise HTTPException(status_code=404, detail="API key not found")
@@ -1,4 +1,4 @@
-from typing import Generic, TypeVar
+from typing import Callable, Generic, TypeVar
 from uuid import UUID
 
 from fastapi import HTTPException
@@ -13,6 +13,21 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 ReadSchemaType = TypeVar("ReadSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=SQLModel)
 
+# called with the model class after every write through CRUDBase (None: all tables), e.g. to invalidate caches
+_write_listeners: list[Callable[[type | None], None]] = []
+
+
+def on_write(listener: Callable[[type | None], None]) -> Callable[[type | None], None]:
+    """Register listener called with the model class after CRUD writes."""
+    _write_listeners.append(listener)
+    return listener
+
+
+def written(model: type | None = None) -> None:
+    """Notify listeners of a write to the table of model (None: all tables)."""
+    for listener in _write_listeners:
+        listener(model)
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, ReadSchemaType, UpdateSchemaType]):
     def __init__(self, model: type[ModelType]):
@@ -61,6 +76,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, ReadSchemaType, UpdateSchema
                 status_code=409,
                 detail=f"Object already exists {e}",
             )
+        written(self.model)
 
         await db_session.refresh(db_obj)
         return db_obj  # type: ignore
@@ -78,6 +94,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, ReadSchemaType, UpdateSchema
         obj.sqlmodel_update(obj_new.model_dump(exclude_unset=True))
         db_session.add(obj)
         await db_session.commit()
+        written(self.model)
         await db_session.refresh(obj)
         return obj  # type: ignore
 
@@ -87,6 +104,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, ReadSchemaType, UpdateSchema
             raise HTTPException(status_code=404, detail="Object not found")
         await db_session.delete(obj)
         await db_session.commit()
+        written(self.model)
         return obj  # type: ignore
 
     async def count(self, *, db_session: AsyncSession) -> int:
@@ -3,4 +3,5 @@
 from .crud import crud
 from .endpoints import router
 from .model import Tree, TreeBase
+from .registry import TreeEntry, registry
 from .schema import TreeCreate, TreeRead, TreeUpdate
@@ -5,8 +5,10 @@ from sqlalchemy import delete, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..base import CRUDBase
+from ..base.crud import written
 from ..branch.model import Branch
 from .model import Tree
+from .registry import registry
 from .schema import TreeCreate, TreeRead, TreeUpdate
 
 
@@ -26,9 +28,11 @@ class CRUDTree(CRUDBase[Tree, TreeCreate, TreeRead, TreeUpdate]):
         return tree
 
     async def get_tree_branches(self, *, uuid: UUID | str, db_session: AsyncSession) -> list[Branch]:
-        branches = await db_session.execute(select(Branch).where(Branch.tree_uuid == uuid))  # type: ignore
-        branches = branches.scalars().all()
-        return branches  # type: ignore
+        # served by the registry (cached), db_session is not used
+        try:
+            return (await registry.get(uuid=uuid)).branches
+        except HTTPException:
+            return []
 
     # customize to also delete linked branches
     async def remove(self, *, uuid: UUID | str, db_session: AsyncSession) -> TreeRead:
@@ -41,6 +45,7 @@ class CRUDTree(CRUDBase[Tree, TreeCreate, TreeRead, TreeUpdate]):
         # then remove the tree
         await db_session.delete(obj)
         await db_session.commit()
+        written(self.model)
         return obj  # type: ignore
 
 
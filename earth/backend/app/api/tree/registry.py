@@ -0,0 +1,93 @@
+import asyncio
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from ... import db
+from ..base.crud import on_write
+from ..branch.model import Branch
+from .model import Tree
+
+"""
+Read-through cache of all trees and their branches.
+
+The first lookup loads all trees and branches (two queries), later lookups are
+answered from memory until a tree or branch is written through CRUDBase.
+"""
+
+
+def _version(tree: Tree, branches: list[Branch]) -> str:
+    """Most recent update to tree or any branch."""
+    dates = [branch.updated_at for branch in branches if branch.updated_at is not None]
+    dates.append(tree.updated_at)  # type: ignore
+    return max(dates).replace(microsecond=0).isoformat()
+
+
+class TreeEntry:
+    def __init__(self, tree: Tree, branches: list[Branch]):
+        self.tree = tree
+        self.branches = branches
+        # secrets version
+        self.version = _version(tree, branches)
+
+
+class TreeRegistry:
+    def __init__(self):
+        self._by_id = {}  # tree_id -> TreeEntry
+        self._by_uuid = {}  # str(tree.uuid) -> TreeEntry
+        self._by_mac = {}  # branch mac -> [(TreeEntry, Branch), ...]
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._generation = 0  # incremented by clear, discards loads overlapping a write
+
+        @on_write
+        def invalidate(model) -> None:
+            if model in (None, Tree, Branch):
+                self.clear()
+
+    def clear(self) -> None:
+        self._by_id = {}
+        self._by_uuid = {}
+        self._by_mac = {}
+        self._loaded = False
+        self._generation += 1
+
+    async def get(self, *, tree_id: str | None = None, uuid=None) -> TreeEntry:
+        """Tree with tree_id or uuid and its branches. Raises HTTPException (404) if not found."""
+        await self._load()
+        entry = self._by_id.get(tree_id) if uuid is None else self._by_uuid.get(str(uuid))
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Tree not found")
+        return entry
+
+    async def get_by_mac(self, mac: str) -> list[tuple[TreeEntry, Branch]]:
+        """Branches with mac address (unique per tree)."""
+        await self._load()
+        return self._by_mac.get(mac.lower(), [])
+
+    async def _load(self) -> None:
+        if self._loaded:
+            return
+        async with self._lock:
+            # loaded while waiting for the lock?
+            if self._loaded:
+                return
+            generation = self._generation
+            async for session in db.get_session():
+                trees = (await session.execute(select(Tree))).scalars().all()
+                branches = (await session.execute(select(Branch))).scalars().all()
+            by_tree = {}
+            for branch in branches:
+                by_tree.setdefault(branch.tree_uuid, []).append(branch)
+            by_id, by_uuid, by_mac = {}, {}, {}
+            for tree in trees:
+                entry = TreeEntry(tree, by_tree.get(tree.uuid, []))
+                by_id[tree.tree_id] = entry
+                by_uuid[str(tree.uuid)] = entry
+                for branch in entry.branches:
+                    by_mac.setdefault(branch.mac.lower(), []).append((entry, branch))
+            self._by_id, self._by_uuid, self._by_mac = by_id, by_uuid, by_mac
+            self._loaded = generation == self._generation
+
+
+registry = TreeRegistry()
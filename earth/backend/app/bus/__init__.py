@@ -1,19 +1,25 @@
 import asyncio
 import os
 
-from eventbus.bus import Config, Counter, CurrentState, Reflect
+from eventbus.bus import Config, Counter, CurrentState, History, Metrics, Reflect
 
 from ..env import env
 from .certificates import Certificates
+from .historian import Historian
 from .secrets import Secrets
 
 config = Config(config_file=os.path.join(env.CONFIG_DIR, "config.json"))
 state = CurrentState()
 print("created CurrentState, id=", id(state))
+history = History()
+historian = Historian(os.path.join(env.CONFIG_DIR, "tsdb"))
 Secrets()
 Certificates()
 reflect = Reflect(interval=10)
 counter = Counter(eid="counter.count", interval=10)
+metrics = Metrics(interval=60, instrument=True)
 loop = asyncio.get_event_loop()
 loop.create_task(reflect.emitter_task())
 loop.create_task(counter.counter_task())
+loop.create_task(historian.compaction_task())
+loop.create_task(metrics.metrics_task())
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import time
+
+from eventbus import event_type, eventbus
+from eventbus.event import addressed_to_me, get_src_addr, history
+
+from ..tsdb import TSDB
+from ..tsdb.query import LTTB, QueryEngine
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+FLUSH_INTERVAL = 60  # write pending samples and build rollups [seconds]
+
+
+def _number(value) -> bool:
+    # bool is an int, but switch states are not recorded
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class Historian:
+    """Record numeric STATE values in the persistent time series store (app.tsdb).
+
+    Answers GET_HISTORY requests with `points` (downsampled history) with a
+    HISTORY event per matching eid.
+    """
+
+    def __init__(self, root: str):
+        self.db = TSDB(root)
+        self.query = QueryEngine(self.db)
+
+        @eventbus.on(event_type.STATE)
+        def state(eid, value, timestamp, **event):
+            if _number(value) and _number(timestamp):
+                self.db.append(eid, timestamp, value)
+
+        @eventbus.on(event_type.STATE_SNAPSHOT)
+        def snapshot(states, src, **event):
+            if src == get_src_addr():
+                # replies of CurrentState
+                return
+            for eid, value, timestamp in states:
+                if _number(value) and _number(timestamp):
+                    self.db.append(eid, timestamp, value)
+
+        @eventbus.on(event_type.GET_HISTORY)
+        async def get(src, dst, eid, since=None, until=None, points=None, method=None, **event):
+            if points is None or not addressed_to_me(dst):
+                # recent raw values (eventbus.bus.History) or request to another node
+                return
+            until = time.time() if until is None else until
+            since = until - 86400 if since is None else since
+            res = await asyncio.to_thread(self.query.query, [eid], since, until, points, method or LTTB)
+            for e, data in res.items():
+                await eventbus.emit(history(e, data, dst=src))
+
+    async def compaction_task(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            # flushes buffered samples, file io off the event loop
+            await asyncio.to_thread(self.db.compact)
+
+    def close(self):
+        self.db.close()
@@ -1,5 +1,4 @@
 from fastapi.encoders import jsonable_encoder
-from sqlmodel.ext.asyncio.session import AsyncSession
 
 from eventbus import event_type, eventbus, tree_id
 from eventbus.event import put_secrets
@@ -7,52 +6,38 @@ from eventbus.event import put_secrets
 from .. import api, db, env, tokens
 
 
-async def _get_version(tree, session: AsyncSession) -> str:  # api.tree.schema.TreeReadWithBraches):
+async def get_version(tree_id: str) -> str:
     """Most recent update to tree or any branch."""
-    branches = await api.tree.crud.get_tree_branches(uuid=tree.uuid, db_session=session)
-    dates = [branch.updated_at for branch in branches if branch.updated_at is not None]
-    dates.append(tree.updated_at)  # type: ignore
-    return max(dates).replace(microsecond=0).isoformat()
+    entry = await api.tree.registry.get(tree_id=tree_id)
+    return entry.version
 
 
-async def get_version(tree_id: str) -> str:
+async def _get_secrets(entry: "api.tree.TreeEntry") -> dict:
+    tree = entry.tree
     async for session in db.get_session():
-        tree = await api.tree.crud.get_by_tree_id(tree_id=tree_id, db_session=session)  # type: ignore
-        return await _get_version(tree, session)
-    return ""
-
-
-async def _get_secrets(tree, session: AsyncSession) -> dict:
-    api_key = await api.api_key.get_key(db_session=session)
-    gateway_token = await tokens.new_gateway2earth(tree=tree, api_key=api_key)
-    branches = await api.tree.crud.get_tree_branches(uuid=tree.uuid, db_session=session)
+        api_key = await api.api_key.get_key(db_session=session)
+    gateway_token = await tokens.new_gateway2earth(tree=tree, api_key=api_key)  # type: ignore
 
     tree_ = jsonable_encoder(tree)
-    tree_["branches"] = [jsonable_encoder(branch) for branch in branches]
+    tree_["branches"] = [jsonable_encoder(branch) for branch in entry.branches]
 
     return {
         "domain": f"{tree.tree_id}.ws.{env.get_env().DOMAIN}",
         "tree": tree_,
         "gateway-token": gateway_token,
-        "version": await _get_version(tree, session),
+        "version": entry.version,
     }
 
 
 async def get_secrets_uuid(*, tree_uuid: str) -> dict:
-    async for session in db.get_session():
-        tree = await api.tree.crud.get_by_uuid(uuid=tree_uuid, db_session=session)
-        return await _get_secrets(tree, session)
-    return {}
+    return await _get_secrets(await api.tree.registry.get(uuid=tree_uuid))
 
 
 async def get_secrets_tree_id(
     *,
     tree_id: str,
 ) -> dict:
-    async for session in db.get_session():
-        tree = await api.tree.crud.get_by_tree_id(tree_id=tree_id, db_session=session)
-        return await _get_secrets(tree, session)
-    return {}
+    return await _get_secrets(await api.tree.registry.get(tree_id=tree_id))
 
 
 class Secrets:
@@ -83,9 +83,12 @@ class DBEngine:
             logger.debug(f"{env.FIRST_SUPERUSER_EMAIL} already exists {e.detail[:21]} ...")
 
     async def clear(self):
+        from .api.base.crud import written
+
         async with self.engine.begin() as conn:
             await conn.run_sync(SQLModel.metadata.drop_all)
             await conn.run_sync(SQLModel.metadata.create_all)
+        written()
 
 
 db: DBEngine
@@ -1,6 +1,8 @@
 import logging
 import os
-from fnmatch import fnmatch
+import re
+import time
+from fnmatch import translate
 
 import yaml
 from fastapi import Depends, HTTPException, WebSocket
@@ -13,33 +15,86 @@ logger = logging.getLogger(__name__)
 
 auth_file = os.path.join(os.path.dirname(__file__), "authorizations.yml")
 
-with open(auth_file, "r") as file:
-    AUTH = yaml.safe_load(file)
+CHECK_INTERVAL = 1  # minimum time between checks for changes of auth_file [seconds]
+CACHE_SIZE = 4096  # decisions cached by Policy
+
+
+class Policy:
+    """Authorization policy (authorizations.yml) compiled to regexes indexed by HTTP method.
+
+    Path patterns are matched against the path template of the route
+    (e.g. /api/tree/{uuid}), i.e. path parameters are matched by wildcards.
+    Decisions are cached per (roles, method, path template). The file is
+    reloaded when it changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._rules = {}  # method -> [(regex, roles), ...]
+        self._cache = {}  # (roles, method, path) -> bool
+        self._mtime = None
+        self._checked = 0
+        self.load()
+
+    def load(self) -> None:
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, "r") as file:
+            auth = yaml.safe_load(file)
+        rules = {}
+        for pattern, a in auth.items():
+            regex = re.compile(translate(f"/api{pattern}"))
+            for method in a["methods"]:
+                rules.setdefault(method, []).append((regex, frozenset(a["roles"])))
+        self._rules = rules
+        self._cache = {}
+        self._mtime = mtime
+
+    def allowed(self, roles: frozenset, method: str, path: str) -> bool:
+        self._reload()
+        key = (roles, method, path)
+        res = self._cache.get(key)
+        if res is None:
+            res = any(regex.match(path) and not roles.isdisjoint(r) for regex, r in self._rules.get(method, ()))
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = res
+        return res
+
+    def _reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < CHECK_INTERVAL:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            logger.error(f"policy {self.path} not found, keeping current: {e}")
+            return
+        if mtime == self._mtime:
+            return
+        # don't retry a broken file until it changes again
+        self._mtime = mtime
+        try:
+            self.load()
+            logger.info(f"reloaded {self.path}")
+        except (OSError, yaml.YAMLError, AttributeError, KeyError, TypeError) as e:
+            logger.error(f"failed to load {self.path}, keeping current policy: {e}")
+
+
+POLICY = Policy(auth_file)
 
 
 async def verify_roles(request: HTTPConnection, user: UserRead = Depends(get_current_user)):
     if isinstance(request, WebSocket):
         return
 
-    roles = user.roles.copy()
-    if user.superuser:
-        roles.append("superuser")
-    path = request.url.path
+    roles = frozenset(user.roles + ["superuser"] if user.superuser else user.roles)
+    route = request.scope.get("route")
+    path = getattr(route, "path", None) or request.url.path
     method = request.method  # type: ignore
-    logger.debug(f"{user.email} {roles}, {path}, {method}")
-
-    for pattern in AUTH:
-        logger.debug(f"path {path} matches {pattern}? {fnmatch(path, f'/api{pattern}')}")
-        if fnmatch(path, f"/api{pattern}"):
-            auth = AUTH[pattern]
-            if method in auth["methods"]:
-                logger.debug(f"method {method} is in {auth['methods']}")
-                if not set(roles).isdisjoint(auth["roles"]):
-                    logger.debug(f"roles {roles} is not disjoint with {auth['roles']}")
-                    logger.debug(f"path {path} is authorized")
-                    return
-
-    logger.debug(f"{user.email} with roles {roles} is not authorized for {method} {path}")
-    raise HTTPException(
-        status_code=403, detail=f"{user.email} with roles {roles} is not authorized for {method} {path}"
-    )
+    if POLICY.allowed(roles, method, path):
+        return
+
+    detail = f"{user.email} with roles {sorted(roles)} is not authorized for {method} {request.url.path}"
+    logger.debug(detail)
+    raise HTTPException(status_code=403, detail=detail)
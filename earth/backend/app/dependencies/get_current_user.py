@@ -6,8 +6,22 @@ from sqlmodel import select
 
 if TYPE_CHECKING:
     from ..api.user.model import User
+from ..api.base.crud import on_write, written
 from ..db import get_session
 
+USER_CACHE_SIZE = 256
+
+# email -> User, cleared when the user table is written (e.g. /api/user, /api/me)
+_users: dict[str, "User"] = {}
+
+
+@on_write
+def _invalidate(model) -> None:
+    from ..api.user.model import User
+
+    if model in (None, User):
+        _users.clear()
+
 
 async def get_current_user(request: HTTPConnection) -> "User":  # type: ignore
     """
@@ -34,6 +48,11 @@ async def get_current_user(request: HTTPConnection) -> "User":  # type: ignore
     except AttributeError:
         raise HTTPException(status_code=400, detail="Not authenticated.")
 
+    user = _users.get(email)
+    if user is not None:
+        request.state.user = user
+        return user
+
     # lookup user in the database or create if not found
     async for session in get_session():
         res = await session.execute(select(User).where(User.email == email))
@@ -44,6 +63,10 @@ async def get_current_user(request: HTTPConnection) -> "User":  # type: ignore
             user: User = User(email=email, roles=["guest"])
             session.add(user)
             await session.commit()
+            written(User)
             await session.refresh(user)
+        if len(_users) >= USER_CACHE_SIZE:
+            _users.clear()
+        _users[email] = user
         request.state.user = user
         return user
@@ -1,8 +1,10 @@
 # https://www.crosstalksolutions.com/cloudflare-tunnel-easy-setup/
 # https://developers.cloudflare.com/cloudflare-one/tutorials/fastapi/
 
+import hashlib
 import json
 import logging
+import time
 
 import aiohttp
 import jwt
@@ -20,6 +22,9 @@ If successful, sets request.state.user_email to the email address in the token.
 Raises: HTTPException with status 400 if the token is missing or invalid.
 
 Test skipped for config.ENVIRONMENT != config.Environment.production.
+
+Verified tokens are cached (by token hash) for up to CF_TOKEN_TTL seconds,
+but not beyond their expiration.
 """
 
 logger = logging.getLogger(__name__)
@@ -28,26 +33,49 @@ logger.setLevel(logging.ERROR)
 # CF Access team domain
 CERTS_URL = "{}/cdn-cgi/access/certs".format(env.CF_TEAM_DOMAIN)
 
-CHECK_USER_DISABLED = False
+# user lookups are cached by get_current_user
+CHECK_USER_DISABLED = True
+
+CF_TOKEN_TTL = 60  # max time a verified token is cached [seconds]
+CF_TOKEN_CACHE_SIZE = 256
+
+# sha256 of token -> (valid until, claims)
+_verified: dict[bytes, tuple[float, dict]] = {}
 
 
 @alru_cache
 async def _get_public_keys():
     """
     Returns:
-        List of RSA public keys usable by PyJWT.
+        RSA public keys usable by PyJWT by kid.
     """
     async with aiohttp.ClientSession() as session:
         async with session.get(CERTS_URL) as resp:
             jwk_set = await resp.json()
-            public_keys = []
+            public_keys = {}
             for key_dict in jwk_set["keys"]:
                 public_key = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key_dict))  # type: ignore
-                public_keys.append(public_key)
+                public_keys[key_dict.get("kid")] = public_key
     logger.debug(f"CF._get_public_keys: got {len(public_keys)} keys")
     return public_keys
 
 
+def _decode(token: str, keys: dict) -> dict | None:
+    """Claims of token verified with the key matching its kid (or any key), None if invalid."""
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except jwt.DecodeError:
+        return None
+    candidates = [keys[kid]] if kid in keys else list(keys.values())
+    for key in candidates:
+        try:
+            return jwt.decode(token, key=key, audience=env.CF_POLICY_AUD, algorithms=["RS256"])
+        except jwt.InvalidTokenError:
+            # try another key
+            pass
+    return None
+
+
 cookie_scheme = APIKeyCookie(name="CF_Authorization", auto_error=False, description="Cloudflare Access Token")
 
 
@@ -73,35 +101,29 @@ async def verify_cloudflare_cookie(request: HTTPConnection, session: str = Depen
 
     token = request.cookies["CF_Authorization"]
     logger.debug(f"Got CF token '{token}'")
-    keys = await _get_public_keys()  # type: ignore
-
-    # Loop through the keys since we can't pass the key set to the decoder
-    for key in keys:
-        try:
-            # decode returns the claims that has the email when needed
-            claims = jwt.decode(
-                token,
-                key=key,
-                audience=env.CF_POLICY_AUD,
-                algorithms=["RS256"],
-            )
-            request.state.user_email = claims["email"]
-            if CHECK_USER_DISABLED:
-                # verify that the user is not disabled in the database
-                # TODO: expensive database lookup - cache?
-                from .get_current_user import get_current_user
-
-                user = await get_current_user(request)
-                if user.disabled:
-                    raise HTTPException(status_code=403, detail="Account suspended")
-                # we just return the email to keep compatibility with situations where user data is not retrieved
-                logger.debug(f"Verified CF token, user = {user.email}")
-            return claims["email"]
-        except jwt.DecodeError:
-            # try another key
-            pass
-    logger.debug(
-        f"Cloudflare token not validated by any of {len(keys)}: {jwt.decode(token,audience=env.CF_POLICY_AUD,algorithms=['RS256'],options={'verify_signature': False})}"
-    )
-
-    raise HTTPException(status_code=400, detail="Invalid Cloudflare token")
+    digest = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    hit = _verified.get(digest)
+    if hit is not None and hit[0] > now:
+        claims = hit[1]
+    else:
+        keys = await _get_public_keys()  # type: ignore
+        claims = _decode(token, keys)
+        if claims is None:
+            logger.debug(f"Cloudflare token not validated by any of {len(keys)} keys")
+            raise HTTPException(status_code=400, detail="Invalid Cloudflare token")
+        if len(_verified) >= CF_TOKEN_CACHE_SIZE:
+            _verified.clear()
+        _verified[digest] = (min(now + CF_TOKEN_TTL, claims.get("exp", now)), claims)
+
+    request.state.user_email = claims["email"]
+    if CHECK_USER_DISABLED:
+        # verify that the user is not disabled in the database (cached by get_current_user)
+        from .get_current_user import get_current_user
+
+        user = await get_current_user(request)
+        if user.disabled:
+            raise HTTPException(status_code=403, detail="Account suspended")
+        # we just return the email to keep compatibility with situations where user data is not retrieved
+        logger.debug(f"Verified CF token, user = {user.email}")
+    return claims["email"]
@@ -8,7 +8,7 @@ from logging import Formatter, Handler
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from eventbus import eventbus
-from eventbus.bus.log import Log
+from eventbus.bus.log import Log, RateLimit
 from eventbus.event import log_event
 
 from .env import Environment, env
@@ -81,6 +81,8 @@ def print_log_message(event):
 class EventLogHandler(Handler):
     def __init__(self):
         super(EventLogHandler, self).__init__()
+        # drop repeats before they reach the eventbus (and all clients)
+        self.limit = RateLimit()
 
     def emit(self, record):
         event = log_event(
@@ -95,7 +97,13 @@ class EventLogHandler(Handler):
             buf = StringIO()
             print(traceback.print_tb(record.exc_info[2], file=buf))
             event["traceback"] = buf.getvalue()
-        if env.ENVIRONMENT != Environment.test:
+        if env.ENVIRONMENT == Environment.test:
+            return
+        n = self.limit(event)
+        if n:
+            if n > 1:
+                # repeats dropped since the last one sent
+                event["count"] = n
             # very taxing on balena cloud api
             # print_log_message(event)
             eventbus.emit_sync(event)
@@ -107,7 +115,7 @@ logger.setLevel(logging.ERROR)
 
 logging.getLogger("uvicorn.access").disabled = True
 
-log_history = Log(size=500)
+log_history = Log(size=500, level=logging.ERROR)
 
 
 # handler.setFormatter(JsonFormatter())
@@ -13,7 +13,7 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
 
-from . import api, db
+from . import api, bus, db
 from .dependencies.api_roles import verify_roles
 from .dependencies.verify_cloudflare_cookie import verify_cloudflare_cookie
 from .env import Environment, env
@@ -33,6 +33,7 @@ async def lifespan(app: FastAPI):
     await db.init_db()
     yield
     # Shutdown
+    bus.historian.close()
     gc.collect()
 
 
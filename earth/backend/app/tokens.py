@@ -1,4 +1,6 @@
+import hashlib
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 from typing import TYPE_CHECKING
 from uuid import UUID
@@ -9,6 +11,7 @@ from fastapi import HTTPException
 from . import api
 from .api.api_key import get_key
 from .api.api_key.schema import ApiKeyRead
+from .api.base.crud import on_write
 from .api.tree.schema import TreeRead
 from .db import get_session
 from .env import Environment, env
@@ -26,8 +29,45 @@ Token
     gateway->earth          tree_uuid, tree_id
     client->gateway         tree_uuid, tree_id
     client->earth           user_uuid
+
+Results of verify_gateway2earth and verify_client2earth are cached by token
+hash until the token expires (at most TOKEN_CACHE_SIZE tokens). The cache is
+cleared when the api_key, tree or user tables are written.
 """
 
+TOKEN_CACHE_SIZE = 1024
+
+# (audience, sha256 of token) -> (exp, tree or user)
+_verified: dict[tuple[str, bytes], tuple[float, object]] = {}
+
+
+@on_write
+def _invalidate(model) -> None:
+    if model in (None, api.api_key.ApiKey, api.tree.model.Tree, api.user.model.User):
+        _verified.clear()
+
+
+def _cached(audience: str, token: str) -> tuple[tuple[str, bytes], object]:
+    """Returns cache key and cached result (None if not cached or expired)."""
+    key = (audience, hashlib.sha256(token.encode()).digest())
+    hit = _verified.get(key)
+    if hit is None:
+        return key, None
+    if hit[0] <= time.time():
+        del _verified[key]
+        return key, None
+    return key, hit[1]
+
+
+def _cache(key: tuple[str, bytes], payload: dict, result) -> None:
+    exp = payload.get("exp")
+    if exp is None:
+        return
+    if len(_verified) >= TOKEN_CACHE_SIZE:
+        # drop the oldest entry
+        del _verified[next(iter(_verified))]
+    _verified[key] = (exp, result)
+
 
 async def new_gateway2earth(
     *, tree: TreeRead, api_key: ApiKeyRead, validity: timedelta = env.GATEWAY_EARTH_VALIDITY
@@ -79,6 +119,10 @@ async def verify_gateway2earth(token: str) -> TreeRead:
     # in any case, we return the tree
     verify = env.ENVIRONMENT != Environment.development
 
+    cache_key, tree = _cached("gateway->earth", token)
+    if tree is not None:
+        return tree  # type: ignore
+
     try:
         header = jwt.get_unverified_header(token)
     except jwt.DecodeError as e:
@@ -100,13 +144,14 @@ async def verify_gateway2earth(token: str) -> TreeRead:
             )
             # check that the tree exists and is not disabled
             if verify:
-                tree = await api.tree.crud.get_by_uuid(uuid=payload.get("tree_uuid"), db_session=session)
+                tree = (await api.tree.registry.get(uuid=payload.get("tree_uuid"))).tree
             else:
                 # use tree_id to allow configurations generated on production server be used in development
-                tree = await api.tree.crud.get_by_tree_id(tree_id=payload.get("tree_id"), db_session=session)
+                tree = (await api.tree.registry.get(tree_id=payload.get("tree_id"))).tree
             if tree.disabled:
                 logger.info(f"tree disabled {tree.tree_id}")
                 raise HTTPException(status_code=403, detail="Tree disabled")
+            _cache(cache_key, payload, tree)
             return tree
         except jwt.DecodeError as e:
             logger.error(f"invalid token: {token}")
@@ -133,6 +178,10 @@ async def verify_client2earth(token: str) -> "UserRead":
         logger.error("no token provided")
         raise HTTPException(status_code=401, detail="No token provided")
 
+    cache_key, user = _cached("client->earth", token)
+    if user is not None:
+        return user  # type: ignore
+
     try:
         header = jwt.get_unverified_header(token)
     except jwt.DecodeError as e:
@@ -145,7 +194,7 @@ async def verify_client2earth(token: str) -> "UserRead":
             user = await api.user.crud.get_by_uuid(db_session=session, uuid=payload.get("user_uuid"))
             if user.disabled:
                 raise HTTPException(status_code=403, detail="User suspended")
-
+            _cache(cache_key, payload, user)
             return user
 
         except jwt.DecodeError as e:
@@ -0,0 +1,22 @@
+# ruff: noqa: F401
+
+from .tsdb import BLOCK_SIZE, RETENTION, TSDB
+
+"""
+Persistent time series store (historian) of STATE values on earth.
+
+Each eid is stored in its own directory: raw samples in daily, append-only
+segments of gorilla compressed blocks (delta-of-delta timestamps, XOR
+compressed values) with a time index, plus minute and hour rollups
+(min, max, sum, count, last) built by TSDB.compact, which also enforces
+retention. Range reads memory map the index, segment and rollup files and
+decode only the blocks overlapping the range, returning compact arrays.
+
+Appends only buffer samples in memory; TSDB.flush and TSDB.compact write them
+and are meant to run in a worker thread, serialized with appends and reads by
+TSDB.lock.
+
+Samples must be appended in time order per eid; older ones are ignored.
+Rollups are built for complete buckets only, samples arriving after their
+bucket was rolled up are kept as raw data only.
+"""
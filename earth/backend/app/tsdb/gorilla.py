@@ -0,0 +1,134 @@
+import struct
+
+"""
+Gorilla compression of (timestamp, value) blocks.
+
+Timestamps (integer milliseconds) are delta-of-delta encoded, values (float64)
+are XORed with their predecessor and only the meaningful bits are stored. See
+Pelkonen et al., "Gorilla: A Fast, Scalable, In-Memory Time Series Database".
+Regular samples cost 1 bit per timestamp, unchanged values 1 bit per value.
+"""
+
+_MASK64 = (1 << 64) - 1
+
+# delta-of-delta buckets: (prefix, prefix bits, value bits)
+_DOD = ((0b10, 2, 7), (0b110, 3, 9), (0b1110, 4, 12))
+
+
+def _f2i(x: float) -> int:
+    return struct.unpack("<Q", struct.pack("<d", x))[0]
+
+
+def _i2f(i: int) -> float:
+    return struct.unpack("<d", struct.pack("<Q", i))[0]
+
+
+class BitWriter:
+    def __init__(self):
+        self._acc = 0
+        self._n = 0
+
+    def write(self, value: int, nbits: int) -> None:
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._n += nbits
+
+    def getvalue(self) -> bytes:
+        pad = -self._n % 8
+        return (self._acc << pad).to_bytes((self._n + pad) // 8, "big")
+
+
+class BitReader:
+    def __init__(self, data: bytes):
+        self._acc = int.from_bytes(data, "big")
+        self._left = 8 * len(data)
+
+    def read(self, nbits: int) -> int:
+        self._left -= nbits
+        if self._left < 0:
+            raise ValueError("gorilla: truncated block")
+        return (self._acc >> self._left) & ((1 << nbits) - 1)
+
+
+def encode(timestamps, values) -> bytes:
+    """Compress timestamps [ms] (int, increasing) and values (float)."""
+    w = BitWriter()
+    prev_t = prev_delta = 0
+    prev_v = 0
+    lead = trail = -1
+    for k, (t, v) in enumerate(zip(timestamps, values)):
+        v = _f2i(float(v))
+        if k == 0:
+            w.write(t, 64)
+            w.write(v, 64)
+            prev_t, prev_v = t, v
+            continue
+        # timestamp
+        delta = t - prev_t
+        dod = delta - prev_delta
+        prev_t, prev_delta = t, delta
+        if dod == 0:
+            w.write(0, 1)
+        else:
+            for prefix, plen, vlen in _DOD:
+                half = 1 << (vlen - 1)
+                if -half < dod <= half:
+                    w.write(prefix, plen)
+                    w.write(dod + half - 1, vlen)
+                    break
+            else:
+                w.write(0b1111, 4)
+                w.write(dod & _MASK64, 64)
+        # value
+        x = v ^ prev_v
+        prev_v = v
+        if x == 0:
+            w.write(0, 1)
+            continue
+        lz = min(64 - x.bit_length(), 31)
+        tz = (x & -x).bit_length() - 1
+        if lead >= 0 and lz >= lead and tz >= trail:
+            w.write(0b10, 2)
+            w.write(x >> trail, 64 - lead - trail)
+        else:
+            lead, trail = lz, tz
+            w.write(0b11, 2)
+            w.write(lead, 5)
+            w.write(64 - lead - trail - 1, 6)
+            w.write(x >> trail, 64 - lead - trail)
+    return w.getvalue()
+
+
+def decode(data: bytes, n: int):
+    """Inverse of encode. Returns (timestamps, values) lists of length n."""
+    if n == 0:
+        return [], []
+    r = BitReader(data)
+    t = r.read(64)
+    v = r.read(64)
+    ts, vs = [t], [_i2f(v)]
+    delta = 0
+    lead = trail = 0
+    for _ in range(n - 1):
+        # timestamp
+        if r.read(1) == 0:
+            dod = 0
+        else:
+            for _, _, vlen in _DOD:
+                if r.read(1) == 0:
+                    dod = r.read(vlen) - (1 << (vlen - 1)) + 1
+                    break
+            else:
+                dod = r.read(64)
+                if dod >= 1 << 63:
+                    dod -= 1 << 64
+        delta += dod
+        t += delta
+        ts.append(t)
+        # value
+        if r.read(1) == 1:
+            if r.read(1) == 1:
+                lead = r.read(5)
+                trail = 64 - lead - r.read(6) - 1
+            v ^= r.read(64 - lead - trail) << trail
+        vs.append(_i2f(v))
+    return ts, vs
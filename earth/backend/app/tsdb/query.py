@@ -0,0 +1,183 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from eventbus.eid import eid_match
+
+from .series import HOUR, MINUTE
+from .tsdb import TSDB
+
+"""
+Chart-ready queries of stored history.
+
+A query names eid patterns, a time range and a target number of points. The
+range is divided into windows of a "nice" step (1 s, 2 s, 5 s, ... 1 h, 2 h,
+... days) with at most `points` windows, aligned to multiples of the step, and
+each eid is answered with either
+
+- AGGREGATE: per window min, max, mean, last and count, or
+- LTTB: at most `points` samples picked with Largest-Triangle-Three-Buckets.
+
+Windows of a minute or more are computed from the minute or hour rollups of
+app.tsdb, only the tail not rolled up yet is read from raw samples. A week of
+1 Hz data therefore costs ~10k rollup records rather than 600k samples.
+
+Results are cached per (eid, method, window, range). Ranges reaching the
+present expire after one window, older ranges stay until evicted (LRU).
+
+Queries block on file io, run them in a worker thread (asyncio.to_thread).
+Reads are serialized with the writer by TSDB.lock, the cache by its own lock.
+"""
+
+AGGREGATE = "aggregate"
+LTTB = "lttb"
+
+POINTS = 500  # default number of points
+MAX_POINTS = 5000
+CACHE_SIZE = 256
+
+# window steps [s]
+_STEPS = (1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400)
+
+
+def window(start: float, end: float, points: int) -> int:
+    """Smallest step [s] that divides start..end into at most `points` windows."""
+    w = (end - start) / max(1, points)
+    for step in _STEPS:
+        if step >= w:
+            return step
+    return 86400 * math.ceil(w / 86400)
+
+
+def lttb(t, v, n: int):
+    """Largest-Triangle-Three-Buckets downsampling of (t, v) to n points."""
+    size = len(t)
+    if n >= size or n < 3:
+        return list(t), list(v)
+    t_out, v_out = [t[0]], [v[0]]
+    every = (size - 2) / (n - 2)
+    a = 0
+    for i in range(n - 2):
+        # average of the next bucket
+        lo = int((i + 1) * every) + 1
+        hi = min(int((i + 2) * every) + 1, size)
+        avg_t = sum(t[lo:hi]) / (hi - lo)
+        avg_v = sum(v[lo:hi]) / (hi - lo)
+        # point of this bucket with the largest triangle
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        ta, va = t[a], v[a]
+        best, area = lo, -1.0
+        for k in range(lo, hi):
+            x = abs((ta - avg_t) * (v[k] - va) - (ta - t[k]) * (avg_v - va))
+            if x > area:
+                best, area = k, x
+        t_out.append(t[best])
+        v_out.append(v[best])
+        a = best
+    t_out.append(t[-1])
+    v_out.append(v[-1])
+    return t_out, v_out
+
+
+class QueryEngine:
+    def __init__(self, db: TSDB, cache_size: int = CACHE_SIZE):
+        self.db = db
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # key -> (expires, result)
+        self._lock = threading.Lock()  # guards _cache
+
+    def query(self, eids: list, start: float, end: float, points: int = POINTS, method: str = LTTB) -> dict:
+        """Results by eid for all stored eids matching the patterns in eids.
+
+        LTTB results are [[timestamp, value], ...], AGGREGATE results are
+        {"t": [...], "min": [...], "max": [...], "mean": [...], "last": [...], "count": [...]}
+        with t the start of each window. Timestamps are in seconds.
+        """
+        assert method in (AGGREGATE, LTTB), f"invalid method {method}"
+        points = max(1, min(int(points), MAX_POINTS))
+        w = window(start, end, points)
+        start = w * math.floor(start / w)
+        end = w * math.ceil(end / w)
+        now = time.time()
+        res = {}
+        for eid in self.db.eids():
+            if not any(eid_match(eid, p) for p in eids):
+                continue
+            key = (eid, method, w, start, end, points)
+            with self._lock:
+                hit = self._cache.get(key)
+                if hit is not None and hit[0] > now:
+                    self._cache.move_to_end(key)
+                    res[eid] = hit[1]
+                    continue
+            if method == AGGREGATE:
+                res[eid] = self._aggregate(eid, start, end, w)
+            else:
+                res[eid] = self._lttb(eid, start, end, w, points)
+            with self._lock:
+                self._cache[key] = (now + w if end > now - w else math.inf, res[eid])
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return res
+
+    def _aggregate(self, eid: str, start: float, end: float, w: int) -> dict:
+        w_ms, start_ms = 1000 * w, round(1000 * start)
+        windows = {}  # index -> [min, max, sum, count, last]
+
+        def add(k, lo, hi, sm, n, last):
+            acc = windows.get(k)
+            if acc is None:
+                windows[k] = [lo, hi, sm, n, last]
+            else:
+                acc[0] = min(acc[0], lo)
+                acc[1] = max(acc[1], hi)
+                acc[2] += sm
+                acc[3] += n
+                acc[4] = last
+
+        raw_from = start
+        resolution = self._resolution(w)
+        if resolution:
+            r = self.db.rollups(eid, resolution, start, end)
+            for k in range(len(r["t"])):
+                add((r["t"][k] - start_ms) // w_ms, r["min"][k], r["max"][k], r["sum"][k], r["count"][k], r["last"][k])
+            if len(r["t"]):
+                raw_from = (r["t"][-1] + (HOUR if resolution == "1h" else MINUTE)) / 1000
+        t, v = self.db.read(eid, raw_from, end)
+        for k in range(len(t)):
+            x = v[k]
+            add((t[k] - start_ms) // w_ms, x, x, x, 1, x)
+
+        out = {"t": [], "min": [], "max": [], "mean": [], "last": [], "count": []}
+        for k in sorted(windows):
+            lo, hi, sm, n, last = windows[k]
+            out["t"].append(start + k * w)
+            out["min"].append(lo)
+            out["max"].append(hi)
+            out["mean"].append(sm / n)
+            out["last"].append(last)
+            out["count"].append(n)
+        return out
+
+    def _lttb(self, eid: str, start: float, end: float, w: int, points: int) -> list:
+        resolution = self._resolution(w)
+        if resolution:
+            # downsample the means of the rollups (plus tail of raw samples)
+            agg = self._aggregate(eid, start, end, 60 if resolution == "1m" else 3600)
+            t, v = [x + (30 if resolution == "1m" else 1800) for x in agg["t"]], agg["mean"]
+        else:
+            t_ms, v = self.db.read(eid, start, end)
+            t = [x / 1000 for x in t_ms]
+        t, v = lttb(t, v, points)
+        return [[a, b] for a, b in zip(t, v)]
+
+    @staticmethod
+    def _resolution(w: int) -> str | None:
+        """Rollups usable for windows of w seconds."""
+        if w % 3600 == 0:
+            return "1h"
+        if w % 60 == 0:
+            return "1m"
+        return None
@@ -0,0 +1,230 @@
+import mmap
+import os
+import struct
+from array import array
+from time import gmtime, strftime
+
+from . import gorilla
+
+"""
+Storage of a single time series (eid) in a directory:
+
+- raw-YYYYMMDD.seg: append-only gorilla compressed blocks of the samples of a UTC day
+- raw-YYYYMMDD.idx: time index of the segment, one INDEX record per block
+- 1m.roll, 1h.roll: minute and hour rollups, one ROLLUP record per bucket
+
+Index and rollup records are fixed size and sorted by time, so range lookups are
+binary searches on memory mapped files. Only segments of days and blocks
+overlapping a range are read and decoded.
+"""
+
+MINUTE = 60_000  # [ms]
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+RESOLUTIONS = {"1m": MINUTE, "1h": HOUR}
+
+# t_first, t_last [ms], offset, length [bytes], n
+INDEX = struct.Struct("<qqQII")
+# bucket start [ms], min, max, sum, count, last
+ROLLUP = struct.Struct("<qdddId")
+ROLLUP_FIELDS = ("min", "max", "sum", "count", "last")
+
+
+def _day(t: int) -> str:
+    """UTC day (YYYYMMDD) of t [ms], clamped to years 1970 ... 9999."""
+    return strftime("%Y%m%d", gmtime(min(max(t, 0), 253402300799999) // 1000))
+
+
+def _mapped(path: str):
+    """Read-only memory map of path, None if empty or missing."""
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
+
+def _search(buf, rec: struct.Struct, t: int, field: int = 0) -> int:
+    """Index of the first record with record[field] >= t."""
+    lo, hi = 0, len(buf) // rec.size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if rec.unpack_from(buf, mid * rec.size)[field] < t:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _last(path: str, rec: struct.Struct):
+    """Last record of file path, None if empty."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell() - f.tell() % rec.size
+            if size == 0:
+                return None
+            f.seek(size - rec.size)
+            return rec.unpack(f.read(rec.size))
+    except FileNotFoundError:
+        return None
+
+
+class Series:
+    def __init__(self, path: str, block_size: int):
+        self.path = path
+        self.block_size = block_size
+        os.makedirs(path, exist_ok=True)
+        self._t = []  # samples not yet written [ms]
+        self._v = []
+        last = None
+        segments = self.segments()
+        if segments:
+            last = _last(self._file(segments[-1], "idx"), INDEX)
+        self._last_t = last[1] if last else None
+
+    def append(self, t: int, v: float) -> bool:
+        """Add sample (t in ms). Samples not newer than the last one are ignored (returns False)."""
+        if self._last_t is not None and t <= self._last_t:
+            return False
+        self._last_t = t
+        self._t.append(t)
+        self._v.append(v)
+        return True
+
+    def flush(self) -> None:
+        """Write pending samples as blocks of at most block_size samples, split at day boundaries."""
+        ts, vs = self._t, self._v
+        self._t, self._v = [], []
+        i = 0
+        while i < len(ts):
+            day = _day(ts[i])
+            j = min(i + self.block_size, len(ts))
+            while j > i + 1 and _day(ts[j - 1]) != day:
+                j -= 1
+            self._write(day, ts[i:j], vs[i:j])
+            i = j
+
+    def _write(self, day: str, ts: list, vs: list) -> None:
+        data = gorilla.encode(ts, vs)
+        with open(self._file(day, "seg"), "ab") as f:
+            offset = f.tell()
+            f.write(data)
+        with open(self._file(day, "idx"), "ab") as f:
+            f.write(INDEX.pack(ts[0], ts[-1], offset, len(data), len(ts)))
+
+    def segments(self) -> list:
+        """Days (YYYYMMDD) with raw data, oldest first."""
+        return sorted(f[4:12] for f in os.listdir(self.path) if f.startswith("raw-") and f.endswith(".idx"))
+
+    @staticmethod
+    def empty():
+        return array("q"), array("d")
+
+    @staticmethod
+    def empty_rollups() -> dict:
+        return {
+            "t": array("q"),
+            "min": array("d"),
+            "max": array("d"),
+            "sum": array("d"),
+            "count": array("L"),
+            "last": array("d"),
+        }
+
+    def read(self, start: int, end: int):
+        """Samples with start <= t < end [ms]. Returns (t, v) arrays."""
+        t_out, v_out = self.empty()
+        first_day, last_day = _day(start), _day(end - 1)
+        for day in self.segments():
+            if day < first_day:
+                continue
+            if day > last_day:
+                break
+            idx = _mapped(self._file(day, "idx"))
+            if idx is None:
+                continue
+            with idx:
+                # blocks ending before start are skipped, blocks are sorted by time
+                first = _search(idx, INDEX, start, field=1)
+                n = len(idx) // INDEX.size
+                if first == n:
+                    continue
+                seg = _mapped(self._file(day, "seg"))
+                if seg is None:
+                    continue
+                with seg:
+                    for k in range(first, n):
+                        t0, _, offset, length, count = INDEX.unpack_from(idx, k * INDEX.size)
+                        if t0 >= end:
+                            break
+                        ts, vs = gorilla.decode(seg[offset : offset + length], count)
+                        self._extend(t_out, v_out, ts, vs, start, end)
+        self._extend(t_out, v_out, self._t, self._v, start, end)
+        return t_out, v_out
+
+    def rollups(self, resolution: str, start: int, end: int) -> dict:
+        """Rollup records with start <= bucket < end. Returns {"t": array, "min": array, ...}."""
+        cols = self.empty_rollups()
+        buf = _mapped(self._file(resolution, "roll"))
+        if buf is None:
+            return cols
+        with buf:
+            lo = _search(buf, ROLLUP, start)
+            hi = _search(buf, ROLLUP, end)
+            for rec in ROLLUP.iter_unpack(buf[lo * ROLLUP.size : hi * ROLLUP.size]):
+                cols["t"].append(rec[0])
+                for name, x in zip(ROLLUP_FIELDS, rec[1:]):
+                    cols[name].append(x)
+        return cols
+
+    def last_rollup(self, resolution: str) -> int | None:
+        """Bucket of the most recent rollup record."""
+        rec = _last(self._file(resolution, "roll"), ROLLUP)
+        return rec[0] if rec else None
+
+    def append_rollups(self, resolution: str, records: list) -> None:
+        if records:
+            with open(self._file(resolution, "roll"), "ab") as f:
+                f.write(b"".join(ROLLUP.pack(*r) for r in records))
+
+    def expire(self, resolution: str | None, before: int) -> None:
+        """Delete raw segments (resolution None) or rollups with all data older than before [ms]."""
+        if resolution is None:
+            for day in self.segments():
+                last = _last(self._file(day, "idx"), INDEX)
+                if last is None or last[1] < before:
+                    for ext in ("seg", "idx"):
+                        try:
+                            os.remove(self._file(day, ext))
+                        except FileNotFoundError:
+                            pass
+            return
+        path = self._file(resolution, "roll")
+        buf = _mapped(path)
+        if buf is None:
+            return
+        with buf:
+            keep = _search(buf, ROLLUP, before) * ROLLUP.size
+            if keep == 0:
+                return
+            rest = buf[keep:]
+        # rewrite (rollup files are small)
+        with open(path + ".tmp", "wb") as f:
+            f.write(rest)
+        os.replace(path + ".tmp", path)
+
+    def _file(self, name: str, ext: str) -> str:
+        if ext in ("seg", "idx"):
+            name = f"raw-{name}"
+        return os.path.join(self.path, f"{name}.{ext}")
+
+    @staticmethod
+    def _extend(t_out, v_out, ts, vs, start, end):
+        for t, v in zip(ts, vs):
+            if start <= t < end:
+                t_out.append(t)
+                v_out.append(v)
@@ -0,0 +1,141 @@
+import logging
+import math
+import os
+import threading
+import time
+from urllib.parse import quote, unquote
+
+from .series import DAY, HOUR, MINUTE, RESOLUTIONS, Series
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BLOCK_SIZE = 120  # samples per compressed block
+
+# how long data is kept [ms], None: forever
+RETENTION = {"raw": 30 * DAY, "1m": 365 * DAY, "1h": None}
+
+
+class TSDB:
+    """Persistent store of numeric time series, one directory per eid under `root`.
+
+    append only buffers samples in memory, flush and compact write them (call
+    from a worker thread). All access to the series is serialized by `lock`.
+    """
+
+    def __init__(self, root: str, block_size: int = BLOCK_SIZE, retention: dict = RETENTION):
+        self.root = root
+        self.block_size = block_size
+        self.retention = retention
+        self._series = {}  # eid -> Series
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def eids(self) -> list:
+        return sorted(unquote(d) for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def series(self, eid: str, create: bool = True) -> Series | None:
+        s = self._series.get(eid)
+        if s is None:
+            path = os.path.join(self.root, quote(eid, safe=""))
+            if not create and not os.path.isdir(path):
+                return None
+            s = self._series[eid] = Series(path, self.block_size)
+        return s
+
+    def append(self, eid: str, timestamp: float, value: float) -> bool:
+        """Add sample, timestamp in seconds (stored with ms resolution)."""
+        with self.lock:
+            return self.series(eid).append(round(timestamp * 1000), float(value))  # type: ignore
+
+    def flush(self) -> None:
+        """Write buffered samples."""
+        for s in list(self._series.values()):
+            with self.lock:
+                s.flush()
+
+    def close(self) -> None:
+        self.flush()
+        with self.lock:
+            self._series = {}
+
+    def read(self, eid: str, start: float, end: float):
+        """Raw samples with start <= timestamp < end [s]. Returns (timestamps [ms], values) arrays."""
+        with self.lock:
+            s = self.series(eid, create=False)
+            if s is None:
+                return Series.empty()
+            return s.read(_ms(start), _ms(end))
+
+    def rollups(self, eid: str, resolution: str, start: float, end: float) -> dict:
+        """Rollups ("1m" or "1h") with start <= bucket < end [s], see Series.rollups."""
+        assert resolution in RESOLUTIONS, f"invalid resolution {resolution}"
+        with self.lock:
+            s = self.series(eid, create=False)
+            if s is None:
+                return Series.empty_rollups()
+            return s.rollups(resolution, _ms(start), _ms(end))
+
+    def compact(self, now: float | None = None) -> None:
+        """Flush, build rollups of complete minutes and hours, then enforce retention.
+
+        The lock is held per eid only, appends proceed between series.
+        """
+        now_ms = round(1000 * (time.time() if now is None else now))
+        for eid in self.eids():
+            try:
+                with self.lock:
+                    s = self.series(eid)
+                    s.flush()  # type: ignore
+                    self._rollup(s, now_ms)  # type: ignore
+                    for resolution, keep in self.retention.items():
+                        if keep is not None:
+                            s.expire(None if resolution == "raw" else resolution, now_ms - keep)  # type: ignore
+            except Exception as e:
+                logger.exception(f"compaction of {eid} failed: {e}", exc_info=e)
+
+    def _rollup(self, s: Series, now_ms: int) -> None:
+        # minutes from raw samples
+        last = s.last_rollup("1m")
+        start = 0 if last is None else last + MINUTE
+        end = now_ms - now_ms % MINUTE
+        if start < end:
+            t, v = s.read(start, end)
+            records = []
+            for k in range(len(t)):
+                bucket = t[k] - t[k] % MINUTE
+                x = v[k]
+                if records and records[-1][0] == bucket:
+                    b, lo, hi, sm, n, _ = records[-1]
+                    records[-1] = (b, min(lo, x), max(hi, x), sm + x, n + 1, x)
+                else:
+                    records.append((bucket, x, x, x, 1, x))
+            s.append_rollups("1m", records)
+        # hours from minutes
+        last = s.last_rollup("1h")
+        start = 0 if last is None else last + HOUR
+        end = now_ms - now_ms % HOUR
+        if start < end:
+            m = s.rollups("1m", start, end)
+            records = []
+            for k in range(len(m["t"])):
+                bucket = m["t"][k] - m["t"][k] % HOUR
+                if records and records[-1][0] == bucket:
+                    b, lo, hi, sm, n, _ = records[-1]
+                    records[-1] = (
+                        b,
+                        min(lo, m["min"][k]),
+                        max(hi, m["max"][k]),
+                        sm + m["sum"][k],
+                        n + m["count"][k],
+                        m["last"][k],
+                    )
+                else:
+                    records.append((bucket, m["min"][k], m["max"][k], m["sum"][k], m["count"][k], m["last"][k]))
+            s.append_rollups("1h", records)
+
+
+def _ms(t: float) -> int:
+    if math.isinf(t):
+        return (1 << 62) if t > 0 else -(1 << 62)
+    return round(t * 1000)
@@ -0,0 +1,412 @@
+"""Fleet simulator: load test earth with simulated gateways and browser clients.
+
+Simulated gateways speak the protocol of the tree gateway (trees/vm app.gateway):
+GET_AUTH/PUT_AUTH handshake, pings, bursts of STATE events (sent as list frames),
+log events, and replies to GET_STATE and GET_LOG. Simulated clients connect to
+/ws and receive the STATE events forwarded by earth.
+
+Faults injected on the gateway uplink:
+
+- --latency: one way delay [s] of frames sent by gateways
+- --drop: fraction of STATE and log frames dropped
+- --disconnect: rate of spontaneous disconnects [1/s per gateway]
+- --storm: time [s] at which all gateways disconnect at once (reconnect storm)
+
+Reported: connect (handshake) time, end-to-end STATE latency (gateway send to
+client receive), earth CPU and memory (psutil, if installed), and the time
+until all gateways are connected again after the reconnect storm.
+
+Trees sim_0000 ... are created as needed through the REST api. This requires
+an earth server running on localhost with ENVIRONMENT != prod (no Cloudflare
+authentication). --serve starts one (uvicorn app.main:app, ENVIRONMENT=dev):
+
+    cd earth/backend
+    PYTHONPATH=../../eventbus python bench/fleet.py --serve --gateways 200 --clients 20 --duration 60
+    python bench/fleet.py --url http://localhost:8001 --pid <earth pid> --storm 30
+
+Results are printed as JSON (--json to save them to a file).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+from eventbus import event_type
+from eventbus.event import bye, ping
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+TREE_PREFIX = "sim_"
+# STATE attributes sent by gateways, the value is the send time (for end-to-end latency)
+ATTRIBUTE = "sim.sent"
+
+
+def percentiles(samples: list, scale: float = 1) -> dict:
+    """Count, p50, p90, p99 and max of samples (times scale)."""
+    if not samples:
+        return {"count": 0}
+    s = sorted(samples)
+    res = {"count": len(s)}
+    for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        res[name] = round(scale * s[min(len(s) - 1, int(q * len(s)))], 3)
+    res["max"] = round(scale * s[-1], 3)
+    return res
+
+
+class Stats:
+    def __init__(self):
+        self.connect = []  # handshake durations [s]
+        self.latency = []  # gateway -> client STATE latency [s]
+        self.counts = {}
+        self.connected = set()  # names of connected gateways
+
+    def inc(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+
+class Node:
+    """Simulated websocket peer of earth, reconnects until `until`."""
+
+    path = "/ws"
+
+    def __init__(self, name: str, token: str, args, stats: Stats):
+        self.name = name
+        self.token = token
+        self.args = args
+        self.stats = stats
+        self.ws = None
+
+    async def run(self, session: aiohttp.ClientSession, base_url: str, until: float) -> None:
+        url = base_url.replace("http", "ws", 1) + self.path
+        while time.monotonic() < until:
+            t0 = time.monotonic()
+            try:
+                async with session.ws_connect(url) as ws:
+                    self.ws = ws
+                    hello = await self._handshake()
+                    if hello is not None:
+                        self.stats.connect.append(time.monotonic() - t0)
+                        await self._connected(hello, until)
+            except (aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+                self.stats.inc(f"error_{type(e).__name__}")
+            finally:
+                self.ws = None
+                self.stats.connected.discard(self.name)
+            if time.monotonic() < until:
+                await asyncio.sleep(random.uniform(0, self.args.reconnect_delay))
+
+    async def disconnect(self) -> None:
+        """Drop the connection without BYE."""
+        if self.ws is not None:
+            self.stats.inc("disconnects")
+            self.stats.connected.discard(self.name)
+            await self.ws.close()
+
+    async def _handshake(self) -> dict | None:
+        auth = await asyncio.wait_for(self.ws.receive_json(), timeout=self.args.timeout)  # type: ignore
+        if auth.get("type") != event_type.GET_AUTH:
+            self.stats.inc("handshake_failed")
+            return None
+        await self.ws.send_json({"type": event_type.PUT_AUTH, "token": self.token})  # type: ignore
+        hello = await asyncio.wait_for(self.ws.receive_json(), timeout=self.args.timeout)  # type: ignore
+        if hello.get("type") != event_type.HELLO_CONNECTED:
+            self.stats.inc(hello.get("type", "handshake_failed"))
+            return None
+        return hello
+
+    async def _connected(self, hello: dict, until: float) -> None:
+        tasks = [asyncio.create_task(t) for t in self._tasks(hello)]
+        tasks.append(asyncio.create_task(asyncio.sleep(max(0, until - time.monotonic()))))
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for t in tasks:
+                t.cancel()
+        if time.monotonic() >= until and not self.ws.closed:  # type: ignore
+            await self.ws.send_json(bye())  # type: ignore
+
+    def _tasks(self, hello: dict) -> list:
+        return [self._receiver(), self._pinger(hello["param"]["timeout_interval"])]
+
+    async def _pinger(self, interval: float) -> None:
+        while True:
+            await self.ws.send_json(ping)  # type: ignore
+            await asyncio.sleep(interval / 2)
+
+    async def _receiver(self) -> None:
+        async for msg in self.ws:  # type: ignore
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                return
+            frame = json.loads(msg.data)
+            for event in frame if isinstance(frame, list) else (frame,):
+                self.stats.inc(f"{type(self).__name__.lower()}_received")
+                await self.process(event)
+
+    async def process(self, event: dict) -> None:
+        pass
+
+
+class Gateway(Node):
+    """Simulated tree gateway (address = tree_id)."""
+
+    path = "/gateway/ws"
+
+    def __init__(self, tree_id: str, token: str, args, stats: Stats):
+        super().__init__(tree_id, token, args, stats)
+        self.values = {}  # eid -> [value, timestamp] reported in STATE_SNAPSHOT
+
+    def _tasks(self, hello: dict) -> list:
+        self.stats.connected.add(self.name)
+        tasks = super()._tasks(hello) + [self._states()]
+        if self.args.log_rate > 0:
+            tasks.append(self._logs())
+        if self.args.disconnect > 0:
+            tasks.append(self._disconnector())
+        return tasks
+
+    async def process(self, event: dict) -> None:
+        et = event.get("type")
+        if et == event_type.GET_STATE:
+            states = [[eid, v, t] for eid, (v, t) in self.values.items()]
+            await self._send(
+                {"type": event_type.STATE_SNAPSHOT, "src": self.name, "dst": event["src"], "states": states}
+            )
+        elif et == event_type.GET_LOG:
+            await self._send({"type": event_type.LOG_SNAPSHOT, "src": self.name, "dst": event["src"], "records": []})
+
+    async def _send(self, frame, faults: bool = False) -> None:
+        if faults and random.random() < self.args.drop:
+            self.stats.inc("dropped")
+            return
+        if faults and self.args.latency > 0:
+            # deliver later without holding back the sender
+            asyncio.create_task(self._delayed(frame))
+            return
+        await self.ws.send_json(frame)  # type: ignore
+
+    async def _delayed(self, frame) -> None:
+        await asyncio.sleep(self.args.latency)
+        try:
+            if self.ws is not None and not self.ws.closed:
+                await self.ws.send_json(frame)
+        except (aiohttp.ClientError, OSError, RuntimeError):
+            pass
+
+    async def _states(self) -> None:
+        burst = self.args.burst
+        interval = burst / self.args.state_rate
+        await asyncio.sleep(random.uniform(0, interval))
+        while True:
+            frame = []
+            now = time.time()
+            for k in range(burst):
+                eid = f"{self.name}:{ATTRIBUTE}_{k}"
+                self.values[eid] = [now, now]
+                frame.append(
+                    {
+                        "type": event_type.STATE,
+                        "src": self.name,
+                        "dst": "#clients",
+                        "eid": eid,
+                        "value": now,
+                        "timestamp": now,
+                    }
+                )
+            self.stats.inc("states_sent", burst)
+            await self._send(frame, faults=True)
+            await asyncio.sleep(interval)
+
+    async def _logs(self) -> None:
+        while True:
+            await asyncio.sleep(random.expovariate(self.args.log_rate))
+            event = {
+                "type": event_type.LOG,
+                "src": self.name,
+                "dst": "#clients",
+                "levelno": 40,
+                "levelname": "ERROR",
+                "timestamp": time.time(),
+                "name": "sim",
+                "funcName": "_logs",
+                "message": f"simulated error {random.randrange(10)}",
+            }
+            self.stats.inc("logs_sent")
+            await self._send(event, faults=True)
+
+    async def _disconnector(self) -> None:
+        await asyncio.sleep(random.expovariate(self.args.disconnect))
+        await self.disconnect()
+
+
+class Client(Node):
+    """Simulated browser client, measures the STATE latency."""
+
+    async def process(self, event: dict) -> None:
+        if event.get("type") == event_type.STATE and event.get("eid", "").partition(":")[2].startswith(ATTRIBUTE):
+            self.stats.latency.append(time.time() - event["value"])
+
+
+class Monitor:
+    """Samples CPU and memory of the earth process."""
+
+    def __init__(self, pid: int | None):
+        self.process = psutil.Process(pid) if psutil is not None and pid else None
+        self.cpu = []  # [%]
+        self.rss = []  # [MB]
+
+    async def run(self, interval: float = 1) -> None:
+        if self.process is None:
+            return
+        self.process.cpu_percent()
+        while True:
+            await asyncio.sleep(interval)
+            self.cpu.append(self.process.cpu_percent())
+            self.rss.append(self.process.memory_info().rss / 2**20)
+
+    def report(self) -> dict:
+        if self.process is None:
+            return {"error": "psutil not installed or earth pid unknown (--pid)"}
+        return {"cpu_percent": percentiles(self.cpu), "rss_mb": percentiles(self.rss)}
+
+
+async def tokens(session: aiohttp.ClientSession, url: str, gateways: int) -> tuple[list, str]:
+    """Create the simulated trees if needed, returns [(tree_id, gateway token), ...] and a client token."""
+    trees = {}
+    offset = 0
+    while True:
+        async with session.get(f"{url}/api/tree", params={"offset": offset, "limit": 100}) as resp:
+            resp.raise_for_status()
+            page = await resp.json()
+        trees.update((t["tree_id"], t) for t in page)
+        if len(page) < 100:
+            break
+        offset += 100
+    res = []
+    for i in range(gateways):
+        tree_id = f"{TREE_PREFIX}{i:04d}"
+        tree = trees.get(tree_id)
+        if tree is None:
+            body = {"tree_id": tree_id, "title": f"Simulated {i}", "description": "fleet simulator"}
+            async with session.post(f"{url}/api/tree", json=body) as resp:
+                resp.raise_for_status()
+                tree = await resp.json()
+        async with session.get(f"{url}/api/gateway_token/{tree['uuid']}") as resp:
+            resp.raise_for_status()
+            res.append((tree_id, await resp.json()))
+    async with session.get(f"{url}/api/client_token") as resp:
+        resp.raise_for_status()
+        client_token = await resp.json()
+    return res, client_token
+
+
+async def wait_ready(session: aiohttp.ClientSession, url: str, timeout: float = 30) -> None:
+    t0 = time.monotonic()
+    while True:
+        try:
+            async with session.get(f"{url}/api/tree/count") as resp:
+                if resp.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        if time.monotonic() - t0 > timeout:
+            raise TimeoutError(f"earth not ready at {url}")
+        await asyncio.sleep(0.5)
+
+
+async def storm(gateways: list, stats: Stats, at: float, timeout: float) -> dict:
+    """Disconnect all gateways at `at`, returns the time until all are connected again."""
+    await asyncio.sleep(at)
+    connected = len(stats.connected)
+    t0 = time.monotonic()
+    await asyncio.gather(*(g.disconnect() for g in gateways))
+    while len(stats.connected) < len(gateways):
+        if time.monotonic() - t0 > timeout:
+            return {"connected_before": connected, "recovered": False, "connected": len(stats.connected)}
+        await asyncio.sleep(0.05)
+    return {"connected_before": connected, "recovered": True, "recovery_s": round(time.monotonic() - t0, 3)}
+
+
+async def simulate(args, pid: int | None) -> dict:
+    stats = Stats()
+    monitor = Monitor(pid)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_ready(session, args.url)
+        gateway_tokens, client_token = await tokens(session, args.url, args.gateways)
+        gateways = [Gateway(tree_id, token, args, stats) for tree_id, token in gateway_tokens]
+        clients = [Client(f"client_{i}", client_token, args, stats) for i in range(args.clients)]
+        until = time.monotonic() + args.duration
+        monitor_task = asyncio.create_task(monitor.run())
+        nodes = [asyncio.create_task(n.run(session, args.url, until)) for n in clients + gateways]
+        storm_result = None
+        if args.storm is not None:
+            storm_result = await storm(gateways, stats, args.storm, max(0, until - time.monotonic()))
+        await asyncio.gather(*nodes)
+        monitor_task.cancel()
+    return {
+        "param": {k: v for k, v in vars(args).items() if k not in ("json",)},
+        "connect_ms": percentiles(stats.connect, 1e3),
+        "state_latency_ms": percentiles(stats.latency, 1e3),
+        "counts": stats.counts,
+        "earth": monitor.report(),
+        "storm": storm_result,
+    }
+
+
+def serve(port: int) -> subprocess.Popen:
+    """Start earth (uvicorn app.main:app) on localhost."""
+    env = {"ENVIRONMENT": "dev", **os.environ}
+    cmd = [sys.executable, "-m", "uvicorn", "--port", str(port), "--log-level", "error", "app.main:app"]
+    return subprocess.Popen(cmd, env=env, cwd=os.path.join(os.path.dirname(__file__), ".."))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="earth fleet simulator")
+    parser.add_argument("--url", default="http://localhost:8001", help="earth server")
+    parser.add_argument("--serve", action="store_true", help="start earth on the port of --url")
+    parser.add_argument("--pid", type=int, help="earth process id for CPU and memory (default: --serve)")
+    parser.add_argument("--gateways", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="[s]")
+    parser.add_argument("--state-rate", type=float, default=10, help="STATE events per second and gateway")
+    parser.add_argument("--burst", type=int, default=5, help="STATE events per frame")
+    parser.add_argument("--log-rate", type=float, default=0.1, help="log events per second and gateway")
+    parser.add_argument("--latency", type=float, default=0, help="injected uplink delay [s]")
+    parser.add_argument("--drop", type=float, default=0, help="fraction of STATE/log frames dropped")
+    parser.add_argument("--disconnect", type=float, default=0, help="disconnects per second and gateway")
+    parser.add_argument("--reconnect-delay", type=float, default=1, help="max random delay before reconnecting [s]")
+    parser.add_argument("--storm", type=float, help="disconnect all gateways at this time [s]")
+    parser.add_argument("--timeout", type=float, default=10, help="handshake timeout [s]")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    server = None
+    pid = args.pid
+    if args.serve:
+        server = serve(int(args.url.rsplit(":", 1)[-1]))
+        pid = pid or server.pid
+    try:
+        result = asyncio.run(simulate(args, pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(json.dumps(result, indent=1))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
+import os
+
 import pytest
+from app.dependencies.api_roles import Policy
 from httpx import AsyncClient
 from tests.api.conftest import override_user
 from tests.util import is_subset
@@ -109,3 +112,40 @@ async def test_gateway_token(async_client: AsyncClient, create_users, create_tre
             for tree in create_trees:
                 response = await async_client.get(f"/api/gateway_token/{tree['uuid']}")
                 assert response.status_code == 200 if "admin" in user["roles"] else 403
+
+
+def test_policy_reload(tmp_path):
+    path = tmp_path / "authorizations.yml"
+    path.write_text("/tree/*:\n  roles: [admin]\n  methods: [GET]\n")
+    policy = Policy(str(path))
+    admin, user = frozenset(["admin"]), frozenset(["user"])
+    assert policy.allowed(admin, "GET", "/api/tree/{uuid}")
+    assert not policy.allowed(admin, "PUT", "/api/tree/{uuid}")
+    assert not policy.allowed(user, "GET", "/api/tree/{uuid}")
+
+    # changes are picked up (at most every CHECK_INTERVAL seconds)
+    path.write_text("/tree/*:\n  roles: [admin, user]\n  methods: [GET, PUT]\n")
+    os.utime(path, (1, 1))
+    policy._checked = float("-inf")
+    assert policy.allowed(user, "GET", "/api/tree/{uuid}")
+    assert policy.allowed(admin, "PUT", "/api/tree/{uuid}")
+
+    # a broken file keeps the current policy
+    path.write_text("/tree/*: [")
+    os.utime(path, (2, 2))
+    policy._checked = float("-inf")
+    assert policy.allowed(user, "GET", "/api/tree/{uuid}")
+
+
+async def test_user_cache(async_client: AsyncClient, create_users):
+    user = create_users["user@x.y"]
+    async with override_user(user["email"]):
+        response = await async_client.put("/api/me", json={"name": "cached"})
+        assert response.status_code == 200
+
+    # writing the user invalidates the cached lookup
+    response = await async_client.put(f"/api/user/{user['uuid']}", json={"roles": []})
+    assert response.status_code == 200
+    async with override_user(user["email"]):
+        response = await async_client.put("/api/me", json={"name": "not cached"})
+        assert response.status_code == 403
@@ -1,3 +1,4 @@
+from app.api.tree import crud, registry
 from httpx import AsyncClient
 from tests.util import is_subset
 
@@ -36,3 +37,23 @@ async def test_delete_tree(create_trees, async_client: AsyncClient):
     assert response.status_code == 404
     # verify the branches are gone, too
     assert (await async_client.get("/api/branch/count")).json() == branch_count - len(tree["branches"])
+
+
+async def test_registry(create_trees, async_client: AsyncClient):
+    tree = create_trees[1]
+    branch = tree["branches"][1]
+    entry = await registry.get(tree_id=tree["tree_id"])
+    assert entry is await registry.get(uuid=tree["uuid"])
+    assert sorted(b.branch_id for b in entry.branches) == sorted(b["branch_id"] for b in tree["branches"])
+    branches = await crud.get_tree_branches(uuid=tree["uuid"], db_session=None)  # type: ignore
+    assert sorted(b.branch_id for b in branches) == sorted(b["branch_id"] for b in tree["branches"])
+    # same mac in both trees
+    assert sorted(e.tree.tree_id for e, _ in await registry.get_by_mac(branch["mac"])) == [
+        t["tree_id"] for t in create_trees
+    ]
+
+    # writing a branch invalidates the registry
+    response = await async_client.put(f"/api/branch/{branch['uuid']}", json={"description": "new_desc"})
+    assert response.status_code == 200
+    entry = await registry.get(tree_id=tree["tree_id"])
+    assert next(b for b in entry.branches if b.branch_id == branch["branch_id"]).description == "new_desc"
@@ -1,4 +1,7 @@
 import jwt
+import pytest
+from app.tokens import verify_gateway2earth
+from fastapi import HTTPException
 from tests.util import is_subset
 
 
@@ -17,3 +20,20 @@ async def test_client_token(async_client, create_trees):
             },
             jwt.decode(tree["client_token"], options={"verify_signature": False}),
         )
+
+
+async def test_token_cache(async_client, create_trees):
+    tree = create_trees[0]
+    response = await async_client.get(f"/api/gateway_token/{tree['uuid']}")
+    assert response.status_code == 200
+    token = response.json()
+    for _ in range(2):
+        # second call answered from the cache
+        assert (await verify_gateway2earth(token)).tree_id == tree["tree_id"]
+
+    # writing the tree invalidates the cache
+    response = await async_client.put(f"/api/tree/{tree['uuid']}", json={"disabled": True})
+    assert response.status_code == 200
+    with pytest.raises(HTTPException) as e:
+        await verify_gateway2earth(token)
+    assert e.value.status_code == 403
@@ -0,0 +1,21 @@
+import random
+
+from app.tsdb import gorilla
+
+
+def test_roundtrip():
+    rng = random.Random(1)
+    ts, vs = [1717000000000], [20.5]
+    for _ in range(1000):
+        ts.append(ts[-1] + rng.choice([1000, 1000, 1001, 999, 1500, 60_000, 10**9, 1]))
+        vs.append(rng.choice([vs[-1], vs[-1] + 0.1, rng.random() * 1e6, -3.0, 0.0, float("inf"), 5e-324]))
+    data = gorilla.encode(ts, vs)
+    assert gorilla.decode(data, len(ts)) == (ts, vs)
+    assert gorilla.decode(b"", 0) == ([], [])
+
+
+def test_compression():
+    ts = [1717000000000 + 1000 * i for i in range(120)]
+    vs = [20.0] * 120
+    # first sample and delta in full, then 1 bit per timestamp and value
+    assert len(gorilla.encode(ts, vs)) <= 16 + 9 + 120 // 4
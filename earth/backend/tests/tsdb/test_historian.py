@@ -0,0 +1,21 @@
+import asyncio
+
+from eventbus.event import State
+
+from app.bus.historian import Historian
+
+
+async def test_state_updates(tmp_path):
+    # State.update without timestamp, as sensor plugins call it
+    historian = Historian(str(tmp_path))
+    temp = State("historian.test.temp")
+    switch = State("historian.test.switch")
+    for v in range(5):
+        await temp.update(v)
+        await switch.update(v % 2 == 0)
+        await asyncio.sleep(0.002)  # stored with ms resolution
+    assert list(historian.db.read(temp.eid, 0, float("inf"))[1]) == list(range(5))
+    assert historian.db.series(switch.eid, create=False) is None
+    # written on close
+    historian.close()
+    assert list(historian.db.read(temp.eid, 0, float("inf"))[1]) == list(range(5))
@@ -0,0 +1,68 @@
+from app.tsdb import TSDB
+from app.tsdb.query import AGGREGATE, LTTB, QueryEngine, lttb, window
+
+T0 = 1717000000.0
+
+
+def test_window():
+    assert window(0, 100, 100) == 1
+    assert window(0, 7 * 86400, 500) == 1800
+    assert window(0, 3000 * 86400, 500) == 6 * 86400
+
+
+def test_lttb():
+    t = list(range(100))
+    v = [0.0] * 100
+    v[37] = 10
+    t2, v2 = lttb(t, v, 10)
+    assert len(t2) == 10 and t2[0] == 0 and t2[-1] == 99
+    assert 10 in v2  # peak is kept
+    assert lttb(t, v, 200) == (t, v)
+
+
+def test_query(tmp_path):
+    db = TSDB(str(tmp_path))
+    for i in range(7200):
+        db.append("dev.b:x.temp", T0 + i, i % 100)
+        db.append("dev.b:x.humidity", T0 + i, 50)
+    # rollups for the first hour only, the rest is read from raw samples
+    db.compact(now=T0 + 3600)
+    q = QueryEngine(db)
+
+    res = q.query(["temp"], T0, T0 + 7200, points=20, method=AGGREGATE)
+    assert list(res) == ["dev.b:x.temp"]
+    agg = res["dev.b:x.temp"]
+    assert sum(agg["count"]) == 7200
+    assert min(agg["min"]) == 0 and max(agg["max"]) == 99
+    assert agg["t"][1] - agg["t"][0] == 600
+
+    res = q.query(["*"], T0, T0 + 7200, points=100, method=LTTB)
+    assert len(res) == 2
+    assert len(res["dev.b:x.humidity"]) <= 100
+    assert all(v == 50 for _, v in res["dev.b:x.humidity"])
+
+    # raw samples for short ranges
+    res = q.query(["temp"], T0, T0 + 60, points=100, method=LTTB)
+    assert res["dev.b:x.temp"] == [[T0 + i, i] for i in range(60)]
+
+    # cached
+    assert q.query(["temp"], T0, T0 + 60, points=100)["dev.b:x.temp"] is res["dev.b:x.temp"]
+
+
+def test_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    db = TSDB(str(tmp_path))
+    q = QueryEngine(db, cache_size=4)
+    for i in range(3600):
+        db.append("dev.b:x.temp", T0 + i, i)
+
+    def work(k):
+        if k % 4 == 0:
+            db.compact(now=T0 + 3600)
+        return q.query(["temp"], T0, T0 + 600 + k, points=50, method=AGGREGATE)
+
+    with ThreadPoolExecutor(8) as pool:
+        for res in pool.map(work, range(32)):
+            assert sum(res["dev.b:x.temp"]["count"]) >= 600
+    assert len(q._cache) <= 4
@@ -0,0 +1,64 @@
+from app.tsdb import TSDB
+from app.tsdb.series import DAY
+
+T0 = 1717000000.0  # 2024-05-29T16:26:40Z
+EID = "dev.b:x.temp"
+
+
+def test_read_write(tmp_path):
+    db = TSDB(str(tmp_path), block_size=10)
+    for i in range(1000):
+        assert db.append(EID, T0 + 10 * i, i % 13)
+    assert not db.append(EID, T0, 1)
+    t, v = db.read(EID, T0 + 100, T0 + 200)
+    assert list(t) == [round(1000 * (T0 + 10 * i)) for i in range(10, 20)]
+    assert list(v) == [i % 13 for i in range(10, 20)]
+    assert len(db.read("unknown", 0, float("inf"))[0]) == 0
+
+    # survives restart, including samples not written as full block yet
+    db.close()
+    db = TSDB(str(tmp_path))
+    assert db.eids() == [EID]
+    t, v = db.read(EID, 0, float("inf"))
+    assert len(t) == 1000 and v[-1] == 999 % 13
+    assert not db.append(EID, T0 + 10 * 999, 1)
+
+
+def test_rollups(tmp_path):
+    db = TSDB(str(tmp_path))
+    for i in range(720):
+        db.append(EID, T0 + 10 * i, i)  # 2 hours, 6 samples per minute
+    db.compact(now=T0 + 7200 + 3600)
+    m = db.rollups(EID, "1m", 0, float("inf"))
+    h = db.rollups(EID, "1h", 0, float("inf"))
+    assert sum(m["count"]) == 720
+    assert m["min"][1] == 2 and m["max"][1] == 7 and m["last"][1] == 7 and m["sum"][1] == sum(range(2, 8))
+    assert sum(h["count"]) == 720
+    assert h["max"][-1] == 719
+    # nothing new to roll up
+    db.compact(now=T0 + 7200 + 3600)
+    assert len(db.rollups(EID, "1h", 0, float("inf"))["t"]) == len(h["t"])
+
+
+def test_retention(tmp_path):
+    db = TSDB(str(tmp_path), block_size=1, retention={"raw": DAY, "1m": 2 * DAY, "1h": None})
+    for d in range(4):
+        db.append(EID, T0 + d * 86400, d)
+    db.compact(now=T0 + 3 * 86400 - 60)
+    assert list(db.read(EID, 0, float("inf"))[1]) == [2, 3]
+    assert list(db.rollups(EID, "1m", 0, float("inf"))["last"]) == [1, 2]
+    assert list(db.rollups(EID, "1h", 0, float("inf"))["last"]) == [0, 1, 2]
+
+
+def test_segments(tmp_path):
+    db = TSDB(str(tmp_path), block_size=100)
+    for i in range(72):
+        db.append(EID, T0 + 3600 * i, i)  # 3 days, hourly
+    s = db.series(EID)
+    assert s.segments() == []  # buffered only
+    assert len(db.read(EID, 0, float("inf"))[0]) == 72
+    db.flush()
+    # one segment per day, blocks do not span days
+    assert s.segments() == ["20240529", "20240530", "20240531", "20240601"]
+    t, v = db.read(EID, T0 + 86400, T0 + 2 * 86400)
+    assert list(v) == list(range(24, 48))
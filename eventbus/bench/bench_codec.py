@@ -0,0 +1,97 @@
+"""Compare wire encodings for typical STATE traffic.
+
+Reports bytes per event and encode/decode time per event for single-event
+frames and for batched (list) frames, with and without interning of STATE
+events (eventbus.intern). Encoding time includes interning. Runs on CPython and MicroPython:
+
+    PYTHONPATH=. python bench/bench_codec.py
+    mpremote mount . run bench/bench_codec.py
+"""
+
+import json
+import time
+
+from eventbus.codec import ENCODINGS, dumps, loads
+from eventbus.intern import Interner
+
+try:
+    ticks_us = time.ticks_us  # type: ignore
+    ticks_diff = time.ticks_diff  # type: ignore
+except AttributeError:
+
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_diff(a, b):
+        return a - b
+
+
+N = 200  # events per run
+BATCH = 20  # events per list frame
+
+
+def state_events(n):
+    leaves = ("fridge_top", "fridge_bot", "freezer", "utility_bay", "soc", "mppt")
+    attrs = ("temperature", "humidity", "rssi", "voltage", "current", "battery")
+    events = []
+    for i in range(n):
+        eid = f"dev.branch_0:{leaves[i % len(leaves)]}.{attrs[(i // len(leaves)) % len(attrs)]}"
+        value = i if i % 3 == 0 else 20.0 + (i % 100) / 8
+        events.append(
+            {
+                "type": "state",
+                "src": "dev.branch_0",
+                "dst": "#clients",
+                "eid": eid,
+                "value": value,
+                "timestamp": 1717e6 + i,
+            }
+        )
+    return events
+
+
+def run(encoding, frames, intern):
+    tx, rx = Interner(), Interner()
+    t0 = ticks_us()
+    if intern:
+        data = [dumps(tx.pack(f), encoding) for f in frames]
+    else:
+        data = [dumps(f, encoding) for f in frames]
+    t1 = ticks_us()
+    for d in data:
+        if intern:
+            rx.unpack(loads(d, encoding))
+        else:
+            loads(d, encoding)
+    t2 = ticks_us()
+    return sum(len(d) for d in data), ticks_diff(t1, t0), ticks_diff(t2, t1)
+
+
+def main():
+    events = state_events(N)
+    results = []
+    for batched in (False, True):
+        frames = [events[i : i + BATCH] for i in range(0, N, BATCH)] if batched else events
+        for encoding in ENCODINGS:
+            for intern in (False, True):
+                size, t_enc, t_dec = run(encoding, frames, intern)
+                results.append(
+                    {
+                        "encoding": encoding,
+                        "intern": intern,
+                        "batch": BATCH if batched else 1,
+                        "bytes_per_event": size / N,
+                        "encode_us_per_event": t_enc / N,
+                        "decode_us_per_event": t_dec / N,
+                    }
+                )
+    print(f"{'encoding':10} {'intern':>6} {'batch':>5} {'bytes/ev':>9} {'enc us/ev':>10} {'dec us/ev':>10}")
+    for r in results:
+        print(
+            f"{r['encoding']:10} {str(r['intern']):>6} {r['batch']:5} {r['bytes_per_event']:9.1f} "
+            f"{r['encode_us_per_event']:10.2f} {r['decode_us_per_event']:10.2f}"
+        )
+    print(json.dumps(results))
+
+
+main()
@@ -0,0 +1,246 @@
+"""Microbenchmarks of the eventbus hot path.
+
+Cases:
+
+- emit: EventEmitter.emit throughput versus number of topic and "*" handlers
+- on_off: cost of registering and unregistering thousands of handlers
+- fan_out: Server fan-out of events to N in-memory transports
+- snapshot: CurrentState reply to GET_STATE versus number of stored states
+- encode: JSON and CBOR encoding of STATE events
+
+Results are printed as a table and as JSON records
+{"case", "params", "metric", "value", "unit"}. Save them as a baseline and
+compare later runs against it to catch regressions (exits with status 1):
+
+    PYTHONPATH=. python bench/bench_eventbus.py --json baseline.json
+    PYTHONPATH=. python bench/bench_eventbus.py --compare baseline.json --tolerance 0.25
+
+Metrics are either rates (higher is better) or times (lower is better), see
+HIGHER_IS_BETTER. Timings vary between machines, compare on the same host.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from eventbus import event_type, eventbus
+from eventbus.bus import CurrentState, Server, Transport
+from eventbus.codec import ENCODINGS, dumps
+from eventbus.event import get_state
+from eventbus.event_emitter import EventEmitter
+
+HIGHER_IS_BETTER = ("events_per_s",)
+
+N_EMIT = 20_000  # events per emit run
+N_FAN_OUT = 200  # events per fan-out run
+N_ENCODE = 5_000  # events per encode run
+
+
+def _now():
+    return time.perf_counter()
+
+
+def state_event(i: int) -> dict:
+    return {
+        "type": event_type.STATE,
+        "src": "dev.branch_0",
+        "dst": "#clients",
+        "eid": f"dev.branch_0:leaf_{i % 50}.temperature",
+        "value": 20.0 + (i % 100) / 8,
+        "timestamp": 1717e6 + i,
+    }
+
+
+class FakeTransport(Transport):
+    """In-memory transport, counts events sent to the client."""
+
+    def __init__(self, token):
+        self.token = token
+        self.events = 0
+        self.incoming = asyncio.Queue()
+
+    async def send_json(self, data):
+        if isinstance(data, dict) and data.get("type") == event_type.GET_AUTH:
+            await self.incoming.put({"type": event_type.PUT_AUTH, "token": self.token})
+        self.events += len(data) if isinstance(data, list) else 1
+
+    async def receive_json(self):
+        return await self.incoming.get()
+
+    async def send_bytes(self, data):
+        pass
+
+    async def receive_bytes(self):
+        return await self.incoming.get()
+
+
+async def _authenticate(token):
+    return token
+
+
+async def bench_emit(results):
+    for handlers in (1, 10, 100):
+        for star in (0, 1, 10):
+            em = EventEmitter()
+            for _ in range(handlers):
+                em.on("bench")(lambda **event: None)
+            for _ in range(star):
+                em.on("*")(lambda **event: None)
+            event = {"type": "bench", "value": 1}
+            t0 = _now()
+            for _ in range(N_EMIT):
+                await em.emit(event)
+            dt = _now() - t0
+            results.append(_result("emit", {"handlers": handlers, "star": star}, "events_per_s", N_EMIT / dt, "1/s"))
+
+
+async def bench_on_off(results):
+    for n in (1_000, 5_000):
+        em = EventEmitter()
+        topics = [f"topic_{i % 20}" for i in range(n)]
+        t0 = _now()
+        wrappers = [em.on(topic)(lambda **event: None) for topic in topics]
+        t1 = _now()
+        for w in wrappers:
+            em.off(w)
+        t2 = _now()
+        results.append(_result("on_off", {"handlers": n}, "on_us", 1e6 * (t1 - t0) / n, "us"))
+        results.append(_result("on_off", {"handlers": n}, "off_us", 1e6 * (t2 - t1) / n, "us"))
+
+
+async def bench_fan_out(results):
+    for n in (1, 10, 100):
+        Server.CONNECTIONS.clear()
+        transports = [FakeTransport(f"@bench_{i}") for i in range(n)]
+        tasks = [
+            asyncio.create_task(Server(transport=t, authenticate=_authenticate, param={}, timeout=60).run())
+            for t in transports
+        ]
+        await asyncio.sleep(0.05)
+        start = [t.events for t in transports]
+        t0 = _now()
+        for i in range(N_FAN_OUT):
+            await eventbus.emit({"type": "bench", "src": "#earth", "dst": "#clients", "i": i})
+        t1 = _now()
+        while any(t.events - s < N_FAN_OUT for t, s in zip(transports, start)):
+            await asyncio.sleep(0.001)
+            if _now() - t0 > 30:
+                raise TimeoutError(f"fan-out to {n} transports")
+        t2 = _now()
+        params = {"transports": n}
+        results.append(_result("fan_out", params, "emit_us", 1e6 * (t1 - t0) / N_FAN_OUT, "us"))
+        results.append(_result("fan_out", params, "delivered_us", 1e6 * (t2 - t0) / (N_FAN_OUT * n), "us"))
+        for t in transports:
+            await t.incoming.put({"type": event_type.BYE})
+        await asyncio.gather(*tasks)
+
+
+async def bench_snapshot(results):
+    cs = CurrentState()
+    replies = []
+
+    @eventbus.on(event_type.STATE_SNAPSHOT)
+    def snapshot(states, dst, **event):
+        if dst == "#bench":
+            replies.append(len(states))
+
+    try:
+        for n in (100, 1_000, 10_000):
+            cs._state.clear()
+            cs._changed.clear()
+            for i in range(n):
+                await eventbus.emit({**state_event(i), "eid": f"dev.branch_0:leaf_{i}.value"})
+            replies.clear()
+            t0 = _now()
+            await eventbus.emit(get_state(dst="#server") | {"src": "#bench"})
+            dt = _now() - t0
+            assert sum(replies) == n, (sum(replies), n)
+            results.append(_result("snapshot", {"states": n}, "get_state_ms", 1e3 * dt, "ms"))
+    finally:
+        eventbus.off(snapshot)
+
+
+async def bench_encode(results):
+    events = [state_event(i) for i in range(N_ENCODE)]
+    for encoding in ENCODINGS:
+        t0 = _now()
+        for ev in events:
+            dumps(ev, encoding)
+        dt = _now() - t0
+        results.append(_result("encode", {"encoding": encoding}, "encode_us", 1e6 * dt / N_ENCODE, "us"))
+
+
+CASES = {
+    "emit": bench_emit,
+    "on_off": bench_on_off,
+    "fan_out": bench_fan_out,
+    "snapshot": bench_snapshot,
+    "encode": bench_encode,
+}
+
+
+def _result(case, params, metric, value, unit):
+    return {"case": case, "params": params, "metric": metric, "value": value, "unit": unit}
+
+
+def _key(r):
+    return (r["case"], json.dumps(r["params"], sort_keys=True), r["metric"])
+
+
+def compare(results, baseline, tolerance) -> list:
+    """Results worse than baseline by more than tolerance (fraction)."""
+    base = {_key(r): r["value"] for r in baseline}
+    regressions = []
+    for r in results:
+        b = base.get(_key(r))
+        if b is None or b == 0:
+            continue
+        change = (b - r["value"]) / b if r["metric"] in HIGHER_IS_BETTER else (r["value"] - b) / b
+        if change > tolerance:
+            regressions.append({**r, "baseline": b, "change": change})
+    return regressions
+
+
+async def run(cases) -> list:
+    results = []
+    for name in cases:
+        await CASES[name](results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="eventbus microbenchmarks")
+    parser.add_argument("cases", nargs="*", help=f"cases to run, default: all of {', '.join(CASES)}")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results (JSON) to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression (fraction)")
+    args = parser.parse_args()
+    for name in args.cases:
+        if name not in CASES:
+            parser.error(f"unknown case {name}")
+
+    results = asyncio.run(run(args.cases or list(CASES)))
+
+    print(f"{'case':10} {'params':36} {'metric':14} {'value':>12}")
+    for r in results:
+        params = " ".join(f"{k}={v}" for k, v in r["params"].items())
+        print(f"{r['case']:10} {params:36} {r['metric']:14} {r['value']:12.2f} {r['unit']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+    else:
+        print(json.dumps(results))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['case']} {r['params']} {r['metric']}: {r['value']:.2f} vs {r['baseline']:.2f}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -50,7 +50,7 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 # singleton
-eventbus = EventEmitter(sync_queue_size=20, pause=0.05)
+eventbus = EventEmitter(sync_queue_size=50, burst=10)
 
 
 # circular import
@@ -58,12 +58,13 @@ from .bus import Server, Transport  # noqa: E402
 
 
 async def serve(
-    transport: Transport, authenticate: Callable[[str], Awaitable[str | None]], param, timeout=WS_TIMEOUT
+    transport: Transport, authenticate: Callable[[str], Awaitable[str | None]], param, timeout=WS_TIMEOUT, **queue
 ) -> None:
     # won't return until the connection is closed
+    # queue: send queue options (queue_size, policy, deadline, conflate), see eventbus.bus.Server
     try:
         logger.info(f"+++++ client connection {param.get('client')}")
-        server = Server(transport=transport, authenticate=authenticate, param=param, timeout=timeout)
+        server = Server(transport=transport, authenticate=authenticate, param=param, timeout=timeout, **queue)
         await server.run()
     finally:
         logger.info(f"----- client connection {param.get('client_addr') or param.get('client')}")
@@ -3,7 +3,9 @@
 from .config import Config
 from .counter import Counter
 from .current_state import CurrentState
+from .history import History
 from .log import Log
+from .metrics import Metrics
 from .printer import Printer
 from .reflect import Reflect
 from .server import Server, Transport
@@ -5,6 +5,7 @@ from eventbus.singleton import singleton
 
 from .. import event_type, eventbus
 from ..event import put_config
+from ..filters import filters
 
 
 @singleton
@@ -21,6 +22,7 @@ class Config:
             pass
         self._config_file = config_file
         self._config = config
+        filters.configure(config)
 
         @eventbus.on(event_type.GET_CONFIG)
         async def get(src, **event):
@@ -29,6 +31,7 @@ class Config:
         @eventbus.on(event_type.PUT_CONFIG)
         def put(data, **event):
             self._config = data
+            filters.configure(data)
             try:
                 import micropython  # type: ignore  # noqa: F401
 
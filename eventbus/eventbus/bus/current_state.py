@@ -1,29 +1,62 @@
+import time
+
 from .. import event_type, eventbus
-from ..event import State
+from ..event import get_src_addr, state_snapshot
 from ..singleton import singleton
 
+SNAPSHOT_SIZE = 200  # max number of states per STATE_SNAPSHOT event
+
 
 @singleton
 class CurrentState:
-    """Keep tack of state values."""
+    """Keep tack of state values.
+
+    Every change increments a sequence number. GET_STATE with a `since` cursor
+    returns only the values changed after it. The last STATE_SNAPSHOT event of
+    a reply carries the cursor (`epoch`, `seq`) for the next request. The epoch
+    changes when CurrentState is restarted, invalidating old cursors.
+    """
 
     def __init__(self):
         super().__init__()
         self._state = {}
+        self._changed = {}  # eid -> seq of last change
+        self._seq = 0
+        self._epoch = time.time_ns()
+
+        def update(eid, value, timestamp):
+            self._seq += 1
+            self._state[eid] = (value, timestamp)
+            self._changed[eid] = self._seq
 
         @eventbus.on(event_type.STATE)
         def state(eid, value, timestamp, **event):
-            self._state[eid] = (value, timestamp)
+            update(eid, value, timestamp)
+
+        @eventbus.on(event_type.STATE_SNAPSHOT)
+        def snapshot(states, src, **event):
+            if src == get_src_addr():
+                # our own reply to GET_STATE
+                return
+            for eid, value, timestamp in states:
+                update(eid, value, timestamp)
 
         @eventbus.on(event_type.GET_STATE)
-        async def get(src, **event):
-            """Send current values."""
-            dst = src
-            # make copy of keys to protect against co-modification
-            for eid in list(self._state.keys()):
-                value, ts = self._state[eid]
-                state = State(eid, dst=dst)
-                await state.update(value, timestamp=ts)
+        async def get(src, since=None, epoch=None, **event):
+            """Send current values in as few STATE_SNAPSHOT events as possible."""
+            if since is None or epoch != self._epoch:
+                since = 0
+            # make copy to protect against co-modification
+            changed = self._changed
+            states = [[eid, value, ts] for eid, (value, ts) in self._state.items() if changed[eid] > since]
+            cursor = {"epoch": self._epoch, "seq": self._seq}
+            n = len(states)
+            for i in range(0, max(n, 1), SNAPSHOT_SIZE):
+                chunk = states[i : i + SNAPSHOT_SIZE]
+                if i + SNAPSHOT_SIZE >= n:
+                    await eventbus.emit(state_snapshot(chunk, dst=src, **cursor))
+                else:
+                    await eventbus.emit(state_snapshot(chunk, dst=src))
 
     @property
     def state(self) -> dict:
@@ -32,3 +65,8 @@ class CurrentState:
             dict: Current state values. Do not modify!
         """
         return self._state
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the most recent change."""
+        return self._seq
@@ -0,0 +1,140 @@
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .. import event_type, eventbus
+from ..eid import eid_match
+from ..event import addressed_to_me, get_src_addr, history
+from ..singleton import singleton
+from .config import Config
+
+HISTORY_SIZE = 1000  # default number of samples per eid
+HISTORY_MEMORY = 32_000_000  # maximum memory for all ring buffers [bytes]
+SAMPLE_SIZE = 16  # bytes per sample (timestamp, value)
+
+logger = logging.getLogger(__name__)
+
+
+def _number(value) -> bool:
+    # bool is an int, but switch states are not recorded
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class Ring:
+    """Preallocated ring buffer of (timestamp, value) samples."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._t = array("d", bytes(8 * size))
+        self._v = array("d", bytes(8 * size))
+        self._n = 0  # number of samples
+        self._i = 0  # next write position
+
+    def __len__(self):
+        return self._n
+
+    def append(self, timestamp: float, value: float) -> bool:
+        """Add sample. Samples older than the latest are ignored (returns False)."""
+        if self._n and timestamp <= self._t[self._i - 1]:
+            return False
+        i = self._i
+        self._t[i] = timestamp
+        self._v[i] = value
+        self._i = (i + 1) % self.size
+        if self._n < self.size:
+            self._n += 1
+        return True
+
+    def query(self, since: float | None = None, until: float | None = None, limit: int | None = None) -> list:
+        """[[timestamp, value], ...] with since <= timestamp <= until, the most recent `limit` if specified."""
+        if self._n < self.size:
+            t, v = self._t[: self._n], self._v[: self._n]
+        else:
+            i = self._i
+            t, v = self._t[i:] + self._t[:i], self._v[i:] + self._v[:i]
+        lo = 0 if since is None else bisect_left(t, since)
+        hi = len(t) if until is None else bisect_right(t, until)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return [[t[k], v[k]] for k in range(lo, hi)]
+
+
+@singleton
+class History:
+    """Recent values of numeric STATE events, per eid.
+
+    Samples are kept in preallocated ring buffers (16 bytes per sample).
+    The number of samples per eid is HISTORY_SIZE, or configured with the
+    `history` field of the first matching pattern in the config.json
+    entities, e.g. "*.ram.*": {"history": 100}; 0 disables history.
+    New buffers are not allocated once `memory` bytes are in use.
+
+    Answers GET_HISTORY events with a HISTORY event to the requester. Requests
+    for downsampled data (with `points`) are left to the earth historian.
+    """
+
+    def __init__(self, size: int = HISTORY_SIZE, memory: int = HISTORY_MEMORY):
+        super().__init__()
+        self.size = size
+        self.memory = memory
+        self._rings = {}  # eid -> Ring, None if not recorded
+        self._bytes = 0
+
+        @eventbus.on(event_type.STATE)
+        def state(eid, value, timestamp, **event):
+            self._record(eid, value, timestamp)
+
+        @eventbus.on(event_type.STATE_SNAPSHOT)
+        def snapshot(states, src, **event):
+            if src == get_src_addr():
+                # replies of CurrentState
+                return
+            for eid, value, timestamp in states:
+                self._record(eid, value, timestamp)
+
+        @eventbus.on(event_type.GET_HISTORY)
+        async def get(src, dst, eid, since=None, until=None, limit=None, points=None, **event):
+            if points is not None or not addressed_to_me(dst):
+                # downsampled history (earth Historian) or request to another node
+                return
+            await eventbus.emit(history(eid, self.query(eid, since, until, limit), dst=src))
+
+    def query(self, eid: str, since: float | None = None, until: float | None = None, limit: int | None = None):
+        """[[timestamp, value], ...] of eid, see Ring.query."""
+        ring = self._rings.get(eid)
+        if ring is None:
+            return []
+        return ring.query(since, until, limit)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "eids": sum(1 for r in self._rings.values() if r is not None),
+            "bytes": self._bytes,
+            "memory": self.memory,
+        }
+
+    def _record(self, eid, value, timestamp) -> None:
+        if not _number(value) or not _number(timestamp):
+            return
+        try:
+            ring = self._rings[eid]
+        except KeyError:
+            ring = self._rings[eid] = self._allocate(eid)
+        if ring is not None:
+            ring.append(timestamp, value)
+
+    def _allocate(self, eid: str) -> Ring | None:
+        size = self.size
+        config = Config.instance  # type: ignore
+        for pattern, fields in ((config.get("entities") if config else None) or {}).items():
+            if isinstance(fields, dict) and "history" in fields and eid_match(eid, pattern):
+                size = int(fields["history"])
+                break
+        if size <= 0:
+            return None
+        if self._bytes + size * SAMPLE_SIZE > self.memory:
+            logger.error(f"history memory limit {self.memory} bytes reached, not recording {eid}")
+            return None
+        self._bytes += size * SAMPLE_SIZE
+        return Ring(size)
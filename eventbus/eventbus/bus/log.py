@@ -2,11 +2,13 @@
 
 import logging
 import time
-from collections import deque
+from bisect import bisect_left
 
 from eventbus import event_type, eventbus
+from eventbus.event import addressed_to_me, get_src_addr, log_snapshot
 from eventbus.singleton import singleton
 
+
 BLUE = "\x1b[38;5;4m"
 GREEN = "\x1b[38;5;2m"
 YELLOW = "\x1b[38;5;3m"
@@ -15,57 +17,163 @@ MAGENTA = "\x1b[38;5;5m"
 
 RESET = "\x1b[0m"
 
+COLORS = {
+    logging.DEBUG: BLUE,
+    logging.INFO: GREEN,
+    logging.WARNING: YELLOW,
+    logging.ERROR: RED,
+    logging.CRITICAL: MAGENTA,
+}
+
+RATE = 0.1  # sustained records per second and (src, logger, message)
+BURST = 5  # records of the same (src, logger, message) passed before rate limiting
+MAX_KEYS = 256  # (src, logger, message) keys tracked by RateLimit
+
+# fields of LOG events not kept in records
+_ENVELOPE = ("type", "dst")
+
+
+class RateLimit:
+    """Token bucket per (src, logger name, message) of LOG events.
+
+    Calling with an event returns 0 if the event should be dropped, else the
+    number of events it stands for (1 + repeats dropped since the last one of
+    the same key passed). The event is not changed. A storm on one node does
+    not suppress the same message from other nodes.
+    """
+
+    def __init__(self, rate: float = RATE, burst: int = BURST, keys: int = MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.keys = keys
+        self.suppressed = 0  # total dropped
+        self._buckets = {}  # (src, name, message) -> [tokens, last update, dropped]
+
+    def __call__(self, event: dict) -> int:
+        key = (event.get("src"), event.get("name"), event.get("message"))
+        now = time.time()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.keys:
+                self._buckets.clear()
+            bucket = self._buckets[key] = [self.burst, now, 0]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            bucket[2] += 1
+            self.suppressed += 1
+            return 0
+        bucket[0] = tokens - 1
+        dropped = bucket[2]
+        bucket[2] = 0
+        return 1 + dropped
+
+
+def format_record(record: dict) -> str:
+    levelno = record.get("levelno", 0)
+    color = COLORS.get(levelno, "")
+    funcName = record.get("funcName") or ""
+    t = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(record.get("timestamp", 0)))  # type: ignore
+    count = record.get("count")
+    repeat = f"[{count}] " if count is not None else ""
+    return f"{repeat}{t} {color}{record.get('levelname') or '':9}{RESET} {record.get('src') or '':12} {record.get('name') or '':20} {funcName:16} {record.get('message')}"
+
 
 @singleton
 class Log:
-    """Keep event history"""
+    """Recent log records.
+
+    All LOG events are printed if echo is set, those with levelno >= level are
+    also kept as records (events without type and dst), at most `size` per
+    level, ordered by timestamp. Repeats of the same (src, logger, message) are
+    rate limited with RateLimit(rate, burst) before they are kept or printed.
 
-    def __init__(self, size=100):
-        self.history = deque((), size)
-        self.last_event = None
+    GET_LOG addressed to this node is answered with a single LOG_SNAPSHOT event with the records
+    matching the optional filters `since` (timestamp), `min_level` and `limit`
+    (most recent). Snapshots received from other nodes (e.g. gateways answering
+    the GET_LOG sent by the server on connect) are merged, skipping records
+    already present.
+    """
 
-        print()
+    def __init__(self, size=100, level=logging.WARNING, echo=True, rate=RATE, burst=BURST):
+        self.size = size
+        self.level = level
+        self.echo = echo
+        self.limit = RateLimit(rate, burst)
+        self._records = {}  # levelno -> [record, ...] sorted by timestamp
+        self._timestamps = {}  # levelno -> [timestamp, ...] of _records
 
         @eventbus.on(event_type.LOG)
         async def log(**event):
-            # receive log message
-            # append to history and print to console
-            if self.last_event is not None:
-                last = self.last_event
-                if last.get("levelno") == event.get("levelno") and last.get("message") == event.get("message"):
-                    last["count"] = last.get("count", 1) + 1
-                    return
-            levelno = event.get("levelno", 0)
-            if levelno >= logging.ERROR:
-                self.history.appendleft(event)  # type: ignore
-            colors = {
-                logging.DEBUG: BLUE,
-                logging.INFO: GREEN,
-                logging.WARNING: YELLOW,
-                logging.ERROR: RED,
-                logging.CRITICAL: MAGENTA,
-            }
-            color = colors.get(levelno, "")
-            funcName = event.get("funcName") or ""
-            t = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(event.get("timestamp", 0)))  # type: ignore
-            count = event.get("count")
-            # BUG: count is never reported (see return above ...)
-            repeat = f"[{count}] " if count is not None else ""
-            print(
-                f"{repeat}{t} {color}{event.get('levelname'):9}{RESET} {event.get('src'):12} {event.get('name'):20} {funcName:16} {event.get('message')}"
-            )
-            tb = event.get("traceback")
-            if tb is not None:
-                print(tb)
+            n = self.limit(event)
+            if not n:
+                return
+            record = {k: v for k, v in event.items() if k not in _ENVELOPE}
+            if n > 1:
+                record["count"] = record.get("count", 1) + n - 1
+            if record.get("levelno", 0) >= self.level:
+                self._add(record)
+            if self.echo:
+                print(format_record(record))
+                tb = record.get("traceback")
+                if tb is not None:
+                    print(tb)
+
+        @eventbus.on(event_type.LOG_SNAPSHOT)
+        def snapshot(src, records, **event):
+            if src == get_src_addr():
+                # replies of this Log
+                return
+            for record in records:
+                if record.get("levelno", 0) >= self.level:
+                    self._add(record)
 
         @eventbus.on(event_type.GET_LOG)
-        async def get(src, **event):
-            # send logging history
-            history = self.history
-            dst = src
-            for i in range(len(history)):
-                ev = history.popleft()
-                history.append(ev)
-                # retarget event to requester
-                ev["dst"] = dst
-                await eventbus.emit(ev)
+        async def get(src, dst, since=None, min_level=None, limit=None, **event):
+            if not addressed_to_me(dst):
+                # request to another node
+                return
+            await eventbus.emit(log_snapshot(self.query(since, min_level, limit), dst=src))
+
+    def query(self, since: float | None = None, min_level: int | None = None, limit: int | None = None) -> list:
+        """Records with timestamp >= since and levelno >= min_level, the most recent `limit` if specified."""
+        res = []
+        for levelno, records in self._records.items():
+            if min_level is not None and levelno < min_level:
+                continue
+            lo = 0 if since is None else bisect_left(self._timestamps[levelno], since)
+            res.extend(records[lo:])
+        res.sort(key=lambda r: r.get("timestamp", 0))
+        if limit is not None:
+            res = res[-limit:] if limit > 0 else []
+        return res
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "records": {levelno: len(r) for levelno, r in self._records.items()},
+            "suppressed": self.limit.suppressed,
+        }
+
+    def _add(self, record: dict) -> None:
+        levelno = record.get("levelno", 0)
+        timestamp = record.get("timestamp", 0)
+        records = self._records.get(levelno)
+        if records is None:
+            records = self._records[levelno] = []
+            self._timestamps[levelno] = []
+        timestamps = self._timestamps[levelno]
+        i = bisect_left(timestamps, timestamp)
+        # duplicate (e.g. snapshot received again after reconnect)?
+        k = i
+        while k < len(timestamps) and timestamps[k] == timestamp:
+            r = records[k]
+            if r.get("src") == record.get("src") and r.get("message") == record.get("message"):
+                return
+            k += 1
+        records.insert(i, record)
+        timestamps.insert(i, timestamp)
+        if len(records) > self.size:
+            del records[0]
+            del timestamps[0]
@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+from .. import eventbus
+from ..event import EPOCH_OFFSET, State
+from ..event_emitter import LATENCY_BUCKETS
+from ..singleton import singleton
+
+"""
+Eventbus metrics as STATE entities of leaf `eventbus`, e.g.
+
+- eventbus.overflow: emit_sync events dropped because the queue was full
+- eventbus.overflow_<source>: same, per source (e.g. overflow_log)
+
+and, if instrumented (see EventEmitter.instrument),
+
+- eventbus.events_<topic>: events emitted
+- eventbus.calls_<topic>_<handler>: handler calls, handler is module.qualname of the function
+- eventbus.latency_<topic>_<handler>: mean handler latency [ms] since the last publication
+- eventbus.p90_<topic>_<handler>: 90th percentile (bucket bound, capped at 1 s) of the same [ms]
+
+Counts are cumulative. Values are published every `interval` seconds when changed.
+Metrics.prometheus() returns the same data in the Prometheus text format.
+"""
+
+
+def _attribute(name) -> str:
+    return "".join(c if c.isalpha() or c.isdigit() else "_" for c in str(name))
+
+
+def _name(func) -> str:
+    """module.qualname of handler func (e.g. eventbus.bus.history.History.__init__.state), __name__ on MicroPython."""
+    name = getattr(func, "__qualname__", None) or getattr(func, "__name__", "handler")
+    module = getattr(func, "__module__", None)
+    name = name.replace(".<locals>", "")
+    return f"{module}.{name}" if module else name
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _p90(buckets) -> float | None:
+    """90th percentile [ms] (upper bound of bucket, at most 1 s) of latency histogram, None if empty."""
+    n = sum(buckets)
+    if n == 0:
+        return None
+    k = 0
+    for i, count in enumerate(buckets):
+        k += count
+        if k >= 0.9 * n:
+            break
+    return LATENCY_BUCKETS[min(i, len(LATENCY_BUCKETS) - 1)] / 1000  # type: ignore
+
+
+@singleton
+class Metrics:
+    def __init__(self, interval: float = 60, instrument: bool = False):
+        super().__init__()
+        self.interval = interval
+        if instrument:
+            eventbus.instrument()
+        self._states = {}  # attribute -> State
+        self._published = {}  # attribute -> last published value
+        self._handlers = {}  # (topic, handler) -> handler stats at last publication
+
+    def values(self) -> dict:
+        """Current metrics by attribute (latency since the previous call)."""
+        overflow = eventbus.overflow
+        res = {"overflow": sum(overflow.values())}
+        for source, n in overflow.items():
+            res[f"overflow_{_attribute(source)}"] = n
+        stats = eventbus.stats
+        if stats is None:
+            return res
+        for topic, n in stats.emitted.items():
+            res[f"events_{_attribute(topic)}"] = n
+        for key, h in stats.handlers.items():
+            topic, func = key
+            name = f"{_attribute(topic)}_{_attribute(_name(func))}"
+            res[f"calls_{name}"] = h[0]
+            last = self._handlers.get(key)
+            delta = h if last is None else [a - b for a, b in zip(h, last)]
+            self._handlers[key] = list(h)
+            if delta[0]:
+                res[f"latency_{name}"] = round(delta[1] / delta[0] / 1000, 3)
+                res[f"p90_{name}"] = _p90(delta[2:])
+        return res
+
+    async def publish(self) -> None:
+        timestamp = time.time() + EPOCH_OFFSET
+        for attribute, value in self.values().items():
+            if self._published.get(attribute) == value:
+                continue
+            state = self._states.get(attribute)
+            if state is None:
+                state = self._states[attribute] = State(f"eventbus.{attribute}")
+            self._published[attribute] = value
+            await state.update(value, timestamp)
+
+    async def metrics_task(self):
+        while True:
+            await self.publish()
+            await asyncio.sleep(self.interval)
+
+    def prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def header(name, kind, help):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        header("eventbus_sync_overflow_total", "counter", "emit_sync events dropped because the queue was full")
+        for source, n in eventbus.overflow.items():
+            lines.append(f'eventbus_sync_overflow_total{{source="{_label(source)}"}} {n}')
+        stats = eventbus.stats
+        if stats is not None:
+            header("eventbus_events_total", "counter", "Events emitted")
+            for topic, n in stats.emitted.items():
+                lines.append(f'eventbus_events_total{{topic="{_label(topic)}"}} {n}')
+            header("eventbus_handler_latency_seconds", "histogram", "Handler latency, including awaited coroutines")
+            for (topic, func), h in stats.handlers.items():
+                labels = f'topic="{_label(topic)}",handler="{_label(_name(func))}"'
+                k = 0
+                for bound, count in zip(LATENCY_BUCKETS, h[2:]):
+                    k += count
+                    lines.append(f'eventbus_handler_latency_seconds_bucket{{{labels},le="{bound / 1e6:g}"}} {k}')
+                lines.append(f'eventbus_handler_latency_seconds_bucket{{{labels},le="+Inf"}} {h[0]}')
+                lines.append(f"eventbus_handler_latency_seconds_sum{{{labels}}} {h[1] / 1e6:g}")
+                lines.append(f"eventbus_handler_latency_seconds_count{{{labels}}} {h[0]}")
+        return "\n".join(lines) + "\n"
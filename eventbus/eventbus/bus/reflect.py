@@ -1,19 +1,121 @@
 import asyncio
+import logging
 import time
 
-from eventbus.event import State, get_src_addr
+from eventbus.event import EPOCH_OFFSET, State, get_src_addr
 from eventbus.singleton import singleton
 
 from .. import eventbus
 
+logger = logging.getLogger(__name__)
+
+"""
+Round trip latency probes.
+
+Every `interval` seconds Reflect sends a probe ("reflect?" with a sequence
+number in `id`) to #clients and #branches. Responders echo it ("reflect!").
+Each responder is a path (earth to a branch, earth to a client, ...) with
+
+- a sliding window of the round trip times [ms] of the last `window` replies
+- the outcome (replied or lost) of the last `window` probes, a probe is lost
+  if its reply has not arrived when the next probe is sent
+
+Every `publish` probes the following STATE entities are updated per path
+(`path` is the responder address with non-alphanumeric characters replaced by `_`):
+
+- reflect.<path>_p50, _p90, _p99, _max: round trip time [ms]
+- reflect.<path>_loss: fraction of probes lost
+- reflect.<path>_up: False after `alert_after` consecutive losses
+
+Going down and recovering is logged (error and info) for branches, i.e.
+responders that are not clients (@...). Paths without replies for `forget`
+probes (e.g. closed browser tabs) are dropped.
+"""
+
+PERCENTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))
+
+
+def _attribute(name) -> str:
+    return "".join(c if c.isalpha() or c.isdigit() else "_" for c in str(name))
+
+
+def percentile(samples: list, q: float) -> float:
+    """Nearest rank percentile of sorted samples."""
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class Path:
+    """Probe statistics of one responder."""
+
+    def __init__(self, addr: str, window: int):
+        self.addr = addr
+        self.window = window
+        self.rtt = []  # ring buffer of round trip times [ms]
+        self._i = 0
+        self.lost = []  # ring buffer of probe outcomes (1: lost)
+        self._j = 0
+        self.last_seq = 0  # latest probe answered
+        self.misses = 0  # consecutive probes lost
+        self.up = True
+        self._states = {}
+
+    def reply(self, seq: int, rtt: float) -> None:
+        if seq <= self.last_seq:
+            # duplicate or late
+            return
+        self.last_seq = seq
+        self._i = self._append(self.rtt, self._i, rtt)
+
+    def outcome(self, seq: int) -> bool:
+        """Record whether probe seq was answered, returns True if answered."""
+        ok = self.last_seq >= seq
+        self._j = self._append(self.lost, self._j, 0 if ok else 1)
+        self.misses = 0 if ok else self.misses + 1
+        return ok
+
+    def stats(self) -> dict:
+        res = {}
+        if self.rtt:
+            rtt = sorted(self.rtt)
+            for name, q in PERCENTILES:
+                res[name] = percentile(rtt, q)
+            res["max"] = rtt[-1]
+        if self.lost:
+            res["loss"] = sum(self.lost) / len(self.lost)
+        res["up"] = self.up
+        return res
+
+    async def publish(self, timestamp: float) -> None:
+        prefix = f"reflect.{_attribute(self.addr)}_"
+        for name, value in self.stats().items():
+            state = self._states.get(name)
+            if state is None:
+                state = self._states[name] = State(prefix + name)
+            await state.update(value, timestamp)
+
+    def _append(self, ring: list, i: int, value) -> int:
+        if len(ring) < self.window:
+            ring.append(value)
+        else:
+            ring[i] = value
+        return (i + 1) % self.window
+
 
 @singleton
 class Reflect:
-    """Resettable counter"""
+    """Round trip latency probes"""
 
-    def __init__(self, interval: float = 0):
+    def __init__(
+        self, interval: float = 0, window: int = 100, publish: int = 6, alert_after: int = 3, forget: int = 30
+    ):
         super().__init__()
         self.interval = interval
+        self.window = window
+        self.publish = publish
+        self.alert_after = alert_after
+        self.forget = forget
+        self.paths = {}  # responder addr -> Path
+        self.seq = 0  # last probe sent
 
         @eventbus.on("reflect?")
         async def reflect_echo(
@@ -37,27 +139,50 @@ class Reflect:
             timestamp,
             id,
         ):
-            if not id.startswith(get_src_addr()):
+            addr, _, seq = id.rpartition(":")
+            if addr != get_src_addr():
                 return
-            dt = time.time_ns() - timestamp
-            dt = dt / 1e6
-            s = State(f"reflect.{src}")
-            await s.update(dt)
+            path = self.paths.get(src)
+            if path is None:
+                path = self.paths[src] = Path(src, self.window)
+                # count probes from this one
+                path.last_seq = int(seq) - 1
+            path.reply(int(seq), (time.time_ns() - timestamp) / 1e6)
+
+    async def probe(self) -> None:
+        """Evaluate replies to the previous probe, publish statistics and send the next probe."""
+        seq = self.seq
+        if seq > 0:
+            for addr, path in list(self.paths.items()):
+                if path.outcome(seq):
+                    if not path.up:
+                        path.up = True
+                        if not addr.startswith("@"):
+                            logger.info(f"reflect: {addr} is back")
+                elif path.misses >= self.forget:
+                    del self.paths[addr]
+                elif path.misses >= self.alert_after and path.up:
+                    path.up = False
+                    if not addr.startswith("@"):
+                        logger.error(f"reflect: no reply from {addr} to the last {path.misses} probes")
+            if seq % self.publish == 0:
+                timestamp = time.time() + EPOCH_OFFSET
+                for path in list(self.paths.values()):
+                    await path.publish(timestamp)
+        self.seq = seq = seq + 1
+        event = {
+            "type": "reflect?",
+            "timestamp": time.time_ns(),
+            "src": get_src_addr(),
+            "dst": "#clients",
+            "id": f"{get_src_addr()}:{seq}",
+        }
+        await eventbus.emit(event)
+        await eventbus.emit(dict(event, dst="#branches"))
 
     async def emitter_task(self):
         if self.interval < 1e-3:
             return
-        seq = 1
         while True:
-            event = {
-                "type": "reflect?",
-                "timestamp": time.time_ns(),
-                "src": get_src_addr(),
-                "dst": "#clients",
-                "id": f"{get_src_addr()}:{seq}",
-            }
-            seq += 1
-            await eventbus.emit(event)
-            event["dst"] = "#branches"
-            await eventbus.emit(event)
+            await self.probe()
             await asyncio.sleep(self.interval)
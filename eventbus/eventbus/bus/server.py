@@ -1,5 +1,4 @@
 import asyncio
-import json
 import logging
 import time
 from abc import abstractmethod
@@ -11,7 +10,7 @@ except ImportError:
     WebSocketDisconnect = Exception
 
 from eventbus import event_type
-from eventbus.event import get_auth
+from eventbus.event import get_auth, get_src_addr
 
 from .. import Event, eventbus
 from ..event import (
@@ -24,6 +23,11 @@ from ..event import (
     hello_invalid_token,
     pong,
 )
+from ..codec import CBOR, ENCODINGS, JSON, dumps, loads
+from ..intern import Interner
+from ..outbox import CONFLATE, QUEUE_DEADLINE, QUEUE_SIZE, Outbox, batch_param
+from .config import Config
+from .subscriptions import Subscriptions, view_eids
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -42,12 +46,86 @@ class Transport:
     async def receive_json(self) -> Any:
         pass
 
+    @abstractmethod
+    async def send_bytes(self, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    async def receive_bytes(self) -> bytes:
+        pass
+
+
+class Routes:
+    """Index of open connections by destination address.
+
+    Keys:
+    - client connections: `#clients` and `@<client_id>`
+    - gateway connections: `#branches`, their own address, and `<tree_id>.*` if the
+      gateway serves all branches of a tree (address `<tree_id>`). A gateway serving a
+      single branch (address `<tree_id>.<branch_id>`) does not receive events addressed
+      to the whole tree.
+
+    Looking up a destination costs one or two dict accesses, regardless of the number of connections.
+    """
+
+    def __init__(self):
+        self._routes = {}
+
+    def __len__(self):
+        return sum(len(v) for k, v in self._routes.items() if k in ("#clients", "#branches"))
+
+    @staticmethod
+    def keys(addr: str, gateway: bool) -> tuple:
+        """Destination addresses routed to a connection with address `addr`."""
+        if not gateway:
+            return ("#clients", addr)
+        if "." not in addr:
+            return ("#branches", addr, f"{addr}.*")
+        return ("#branches", addr)
+
+    def add(self, addr: str, gateway: bool, connection) -> None:
+        for key in self.keys(addr, gateway):
+            # copy on write: lookup results remain valid while connections come and go
+            self._routes[key] = self._routes.get(key, ()) + (connection,)
+
+    def remove(self, addr: str, gateway: bool, connection) -> None:
+        for key in self.keys(addr, gateway):
+            connections = tuple(c for c in self._routes.get(key, ()) if c is not connection)
+            if connections:
+                self._routes[key] = connections
+            else:
+                self._routes.pop(key, None)
+
+    def lookup(self, dst: str) -> tuple:
+        """Connections to which events addressed to `dst` are forwarded."""
+        connections = self._routes.get(dst, ())
+        if "." in dst and dst[0] not in "@#":
+            # <tree_id>.<branch_id>: also the gateway serving the whole tree
+            tree = self._routes.get(f"{dst.split('.')[0]}.*")
+            if tree:
+                connections += tree
+        return connections
+
+    def clear(self) -> None:
+        self._routes = {}
+
 
 class Server:
     CONNECTIONS = {}
+    ROUTES = Routes()
+    _router = None
 
     def __init__(
-        self, *, transport: Transport, authenticate: Callable[[str], Awaitable[str | None]], param: dict, timeout
+        self,
+        *,
+        transport: Transport,
+        authenticate: Callable[[str], Awaitable[str | None]],
+        param: dict,
+        timeout,
+        queue_size: int = QUEUE_SIZE,
+        policy: str = CONFLATE,
+        deadline: float = QUEUE_DEADLINE,
+        conflate: bool = True,
     ):
         """Create a Server instance.
 
@@ -56,9 +134,18 @@ class Server:
             authenticate (Callable[[str], Awaitable[str | None]]): The authentication function.
                 Returns client address or None if authentication fails.
             param (dict, optional): The parameters to pass to the client. Defaults to {}.
+            queue_size (int): Maximum number of events waiting to be sent to the client.
+            policy (str): What to do when the queue is full, see eventbus.outbox.
+            deadline (float): Time the queue may remain full with the DISCONNECT policy [seconds].
+            conflate (bool): Send only the latest value of STATE events still waiting in the queue.
         """
 
         self.closed = False
+        self.encoding = JSON
+        self.outbox = None
+        self.interner = None
+        self.subscriptions = None
+        self.queue = {"maxsize": queue_size, "policy": policy, "deadline": deadline, "conflate": conflate}
         self.transport = transport
         self.timeout = timeout
         self.authenticate = authenticate
@@ -80,6 +167,16 @@ class Server:
                 await self.transport.send_json(hello_invalid_token())
                 return
             self.gateway = not client_addr.startswith("@")
+            # optional: coalesce outgoing events into list frames
+            batch = batch_param(event.get("batch"))
+            if batch:
+                self.param["batch"] = batch
+            # optional: binary encoding of frames following hello_connected
+            if event.get("encoding") in ENCODINGS:
+                self.param["encoding"] = event["encoding"]
+            # optional: compact STATE events, see eventbus.intern
+            if event.get("intern"):
+                self.param["intern"] = True
         except (WebSocketDisconnect, RuntimeError, asyncio.TimeoutError) as e:
             logger.exception(f"handshake failed: {e} {self.param}", exc_info=e)
             self.closed = True
@@ -97,16 +194,21 @@ class Server:
                 "param": self.param,
                 "connected_at": time.time(),
                 "connected": True,
+                # get_state cursor of the gateway, fetch only changes on reconnect
+                "state_cursor": connection.get("state_cursor", {}) if connection else {},
             }
             # send greeting
             await self.transport.send_json(hello_connected(self.param))
+            self.encoding = self.param.get("encoding", JSON)
+            if self.param.get("intern"):
+                self.interner = Interner()
             # ready for events
             logger.debug(f"listening for events from {client_addr}")
             self.sender()
             # update gateway connection state
             if self.gateway:
                 await connect_event.update(True)
-                await eventbus.emit(get_state(dst=client_addr))
+                await eventbus.emit(get_state(dst=client_addr, **Server.CONNECTIONS[client_addr]["state_cursor"]))
                 await eventbus.emit(get_log(dst=client_addr))
             # won't return until the connection is closed
             await self.receiver_task()
@@ -114,6 +216,7 @@ class Server:
             # client disconnected without sending BYE
             self.closed = True
         finally:
+            self._unroute()
             connection = Server.CONNECTIONS.get(client_addr) or {}
             connection["connected"] = False
             connection["disconnected_at"] = time.time()
@@ -123,38 +226,76 @@ class Server:
                 del Server.CONNECTIONS[self.param.get("client_addr")]
                 pass
 
-    def addr_filter(self, dst: str) -> bool:
-        client_addr = self.param["client_addr"]
-        if self.gateway:
-            return dst == "#branches" or dst.startswith(client_addr)
+    def sender(self):
+        """Forward events addressed to this connection to the client."""
+        # events are sent by the outbox writer task, the emitter does not wait for the transport
+        self.outbox = Outbox(
+            self._send_frame, **(self.param.get("batch") or {}), **self.queue, disconnect=self._slow_consumer
+        )
+        Server.CONNECTIONS[self.param["client_addr"]]["queue"] = self.outbox.stats
+        self.subscriptions = Subscriptions(self.outbox.put)
+        if Server._router is None:
+            # a single handler routes events to all connections
+            Server._router = eventbus.on("*")(Server._route)
+        Server.ROUTES.add(self.param["client_addr"], self.gateway, self)
+
+    def _unroute(self):
+        if self not in Server.ROUTES.lookup(self.param["client_addr"]):
+            return
+        Server.ROUTES.remove(self.param["client_addr"], self.gateway, self)
+        if self.outbox is not None:
+            self.outbox.close()
+        if self.subscriptions is not None:
+            self.subscriptions.close()
+        if not Server.ROUTES and Server._router is not None:
+            eventbus.off(Server._router)
+            Server._router = None
+
+    @staticmethod
+    async def _route(**event):
+        dst = event.get("dst")
+        if not dst:
+            return
+        for connection in Server.ROUTES.lookup(dst):
+            await connection.send(event)
+
+    async def send(self, event: Event) -> None:
+        if self.closed:
+            # no more events, please ...
+            self._unroute()
+            return
+        if DEBUG:
+            print(f"Server.sender: -> {self.param.get('client_addr')}: {event}")
+        self.subscriptions.put(event)  # type: ignore
+
+    async def _send_frame(self, frame: Event | list[Event]) -> None:
+        try:
+            if self.interner is not None:
+                frame = self.interner.pack(frame)
+            await self._send(frame)
+        except (RuntimeError, OSError, WebSocketDisconnect) as e:
+            logger.error(f"Server.sender: Transport error {type(e)} {e}")
+            self.closed = True
+            self._unroute()
+
+    def _slow_consumer(self):
+        logger.error(f"{self.param.get('client_addr')}: send queue full for {self.queue['deadline']}s, disconnecting")
+        self.closed = True
+        self._unroute()
+        close = getattr(self.transport, "close", None)
+        if close is not None:
+            asyncio.create_task(close())
+
+    async def _send(self, frame: Event | list[Event]) -> None:
+        if self.encoding == CBOR:
+            await self.transport.send_bytes(dumps(frame, CBOR))  # type: ignore
         else:
-            return dst in ("#clients", client_addr)
+            await self.transport.send_json(frame)
 
-    def sender(self):
-        @eventbus.on("*")
-        async def all_events(**event):
-            nonlocal self
-            # forward event to client
-            if self.closed:
-                # no more events, please ...
-                print(f"Server.sender: off {self.param}")
-                eventbus.off(all_events)
-                return
-            # address filter
-            dst = event.get("dst", "")
-            if self.addr_filter(dst):
-                try:
-                    # TODO: batch send events as lists
-                    # print(f"Server.sender: -> {self.param.get('client_addr')}: {event}")
-                    if DEBUG:
-                        print(f"Server.sender: -> {self.param.get('client_addr')}: {event}")
-                    await self.transport.send_json(event)
-                except (RuntimeError, Exception) as e:
-                    logger.error(f"Server.sender: Transport error {type(e)} {e}")
-                    self.closed = True
-            else:
-                pass
-                # logger.debug(f"addr_filter not posted: type={event.get('type')} dst={dst} (client_addr={self.param.get("client_addr")})")
+    async def _receive(self) -> Event | list[Event]:
+        if self.encoding == CBOR:
+            return loads(await self.transport.receive_bytes(), CBOR)
+        return await self.transport.receive_json()
 
     async def process_event(self, event: Event) -> None:
         et = event.get("type")
@@ -162,7 +303,9 @@ class Server:
             logger.error(f"Invalid event - no type (ignored) {event}")
             return
         if et == event_type.PING:
-            await self.transport.send_json(pong)
+            await self._send(pong)
+        elif et in (event_type.SUBSCRIBE, event_type.UNSUBSCRIBE):
+            self._subscribe(event)
         elif et == event_type.BYE:
             logger.debug("got bye, closing connection")
             self.closed = True
@@ -173,14 +316,31 @@ class Server:
             if "dst" in event:
                 if not self.gateway:
                     event["src"] = self.param["client_addr"]
+                elif et == event_type.STATE_SNAPSHOT and "seq" in event and event["dst"] == get_src_addr():
+                    # last part of the reply to our get_state
+                    connection = Server.CONNECTIONS[self.param["client_addr"]]
+                    connection["state_cursor"] = {"since": event["seq"], "epoch": event.get("epoch")}
                 await eventbus.emit(event)
             else:
                 logger.error(f"Invalid event - no dst (ignored) {event}")
 
+    def _subscribe(self, event: Event) -> None:
+        eids = event.get("eids")
+        views = event.get("views")
+        if views:
+            config = Config.instance  # type: ignore
+            eids = (eids or []) + view_eids(config.get() if config else {}, views)
+        if event["type"] == event_type.SUBSCRIBE:
+            self.subscriptions.subscribe(eids or [], event.get("rate"))  # type: ignore
+        else:
+            self.subscriptions.unsubscribe(None if eids is None and views is None else eids)  # type: ignore
+
     async def receiver_task(self):
         while not self.closed:
             try:
-                event = await asyncio.wait_for(self.transport.receive_json(), timeout=self.timeout + 100)
+                event = await asyncio.wait_for(self._receive(), timeout=self.timeout + 100)
+                if self.interner is not None:
+                    event = self.interner.unpack(event)
                 if isinstance(event, list):
                     for e in event:
                         await self.process_event(e)
@@ -190,8 +350,9 @@ class Server:
                 logger.debug(f"Timeout {self.param}")
                 await eventbus.emit(bye_timeout())
                 self.closed = True
-            except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON {e}")
+            except ValueError as e:
+                # json.JSONDecodeError, invalid cbor or unknown interned id
+                logger.error(f"Invalid {self.encoding} {e}")
             except WebSocketDisconnect as e:
                 logger.debug(f"WebSocketDisconnect {e}")
                 self.closed = True
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+
+from .. import event_type
+from ..eid import eid_match
+
+"""
+Subscriptions of a connection.
+
+Without subscriptions a connection receives all events routed to it. After a
+SUBSCRIBE, STATE events (and the states in STATE_SNAPSHOT events) are limited
+to the subscribed eids, optionally at a maximum rate per eid. Other events are
+not affected.
+
+    {"type": "subscribe", "eids": ["*.temperature"], "views": ["Climate"], "rate": 2}
+    {"type": "unsubscribe", "eids": ["*.temperature"]}
+    {"type": "unsubscribe"}  # all, i.e. receive everything again
+
+eids are patterns (see eventbus.eid.eid_match), views are titles of views in
+config.json and stand for the entity_ids of their cards. rate is the maximum
+number of updates per second and eid. Updates exceeding the rate are held back
+and the latest is sent when the interval has passed.
+
+Patterns are indexed by their literal attribute (e.g. `temperature` in
+`*.temperature`), so an event is compared only with the patterns that can match.
+Results are cached per eid until the subscriptions change.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def view_eids(config: dict, views: list) -> list:
+    """entity_id patterns of the named views in config."""
+    eids = []
+    for name in views:
+        view = next((v for v in config.get("views", []) if v.get("title") == name), None)
+        if view is None:
+            logger.error(f"subscribe: no view {name}")
+            continue
+        for card in view.get("cards", []):
+            eids.extend(e["entity_id"] for e in card.get("entities", []) if "entity_id" in e)
+    return eids
+
+
+class Subscriptions:
+    def __init__(self, put):
+        """Create Subscriptions.
+
+        Args:
+            put: Function called with the events passing the subscriptions.
+        """
+        self._put = put
+        self._patterns = {}  # pattern -> min interval between updates [seconds]
+        self._by_attr = {}  # attribute -> [(pattern, interval), ...]
+        self._other = []  # [(pattern, interval), ...] patterns with wildcard attribute
+        self._cache = {}  # eid -> interval, None if not subscribed
+        self._sent = {}  # eid -> time of last update sent
+        self._held = {}  # eid -> latest update waiting for its interval to pass
+        self._tasks = {}  # eid -> task sending the held update
+
+    def __bool__(self):
+        return bool(self._patterns)
+
+    def subscribe(self, eids: list, rate: float | None = None) -> None:
+        interval = 1 / rate if rate else 0
+        for pattern in eids:
+            self._patterns[pattern] = interval
+        self._compile()
+
+    def unsubscribe(self, eids: list | None = None) -> None:
+        """Remove subscriptions to eids, all if eids is None."""
+        if eids is None:
+            self._patterns = {}
+        for pattern in eids or []:
+            self._patterns.pop(pattern, None)
+        self._compile()
+
+    def close(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks = {}
+        self._held = {}
+
+    def match(self, eid: str) -> float | None:
+        """Minimum interval between updates of eid, None if not subscribed."""
+        try:
+            return self._cache[eid]
+        except KeyError:
+            pass
+        attr = eid.rsplit(".", 1)[-1]
+        res = None
+        for pattern, interval in self._by_attr.get(attr, []) + self._other:
+            if (res is None or interval < res) and eid_match(eid, pattern):
+                res = interval
+        self._cache[eid] = res
+        return res
+
+    def put(self, event) -> None:
+        """Forward event to put, if it passes the subscriptions."""
+        et = event.get("type")
+        if not self._patterns:
+            self._put(event)
+        elif et == event_type.STATE:
+            eid = event.get("eid", "")
+            interval = self.match(eid)
+            if interval is None:
+                return
+            if interval > 0 and not self._admit(eid, event, interval):
+                return
+            self._put(event)
+        elif et == event_type.STATE_SNAPSHOT:
+            event = dict(event)
+            event["states"] = [s for s in event.get("states", []) if self.match(s[0]) is not None]
+            self._put(event)
+        else:
+            self._put(event)
+
+    def _compile(self) -> None:
+        by_attr = {}
+        other = []
+        for pattern, interval in self._patterns.items():
+            p = pattern.replace(":", ".")
+            attr = p.rsplit(".", 1)[-1]
+            if "*" in attr:
+                other.append((pattern, interval))
+            else:
+                by_attr.setdefault(attr, []).append((pattern, interval))
+        self._by_attr = by_attr
+        self._other = other
+        self._cache = {}
+
+    def _admit(self, eid: str, event, interval: float) -> bool:
+        """Rate limit: True if event may be sent now, otherwise it is held back."""
+        if eid in self._held:
+            self._held[eid] = event
+            return False
+        now = time.time()
+        wait = self._sent.get(eid, 0) + interval - now
+        if wait <= 0:
+            self._sent[eid] = now
+            return True
+        self._held[eid] = event
+        self._tasks[eid] = asyncio.create_task(self._release(eid, wait))
+        return False
+
+    async def _release(self, eid: str, wait: float) -> None:
+        await asyncio.sleep(wait)
+        self._tasks.pop(eid, None)
+        event = self._held.pop(eid, None)
+        if event is not None and self.match(eid) is not None:
+            self._sent[eid] = time.time()
+            self._put(event)
@@ -0,0 +1,167 @@
+import struct
+
+"""
+Compact binary encoding of events (RFC 8949 CBOR subset).
+
+Supported types: None, bool, int (64 bit), float, str, bytes, list, tuple, dict.
+Floats are sent in single precision if that is lossless. Pure Python for
+CPython and MicroPython alike; decodes definite-length items only.
+Malformed input raises ValueError.
+"""
+
+# MicroPython raises ValueError for short buffers and has no struct.error
+_STRUCT_ERROR = getattr(struct, "error", ValueError)
+
+
+def dumps(obj) -> bytes:
+    buf = bytearray()
+    _encode(buf, obj)
+    return bytes(buf)
+
+
+def loads(data):
+    try:
+        obj, pos = _decode(data, 0)
+    except (_STRUCT_ERROR, IndexError):
+        raise ValueError("cbor: truncated")
+    except TypeError:
+        # e.g. list as map key
+        raise ValueError("cbor: invalid map key")
+    if pos != len(data):
+        raise ValueError("cbor: extra data")
+    return obj
+
+
+def _head(buf, major, n):
+    major <<= 5
+    if n < 24:
+        buf.append(major | n)
+    elif n < 0x100:
+        buf.append(major | 24)
+        buf.append(n)
+    elif n < 0x10000:
+        buf.append(major | 25)
+        buf.extend(struct.pack(">H", n))
+    elif n < 0x100000000:
+        buf.append(major | 26)
+        buf.extend(struct.pack(">I", n))
+    else:
+        buf.append(major | 27)
+        buf.extend(struct.pack(">Q", n))
+
+
+def _encode(buf, obj):
+    if obj is None:
+        buf.append(0xF6)
+    elif obj is True:
+        buf.append(0xF5)
+    elif obj is False:
+        buf.append(0xF4)
+    elif isinstance(obj, str):
+        b = obj.encode()
+        _head(buf, 3, len(b))
+        buf.extend(b)
+    elif isinstance(obj, int):
+        if obj >= 0:
+            _head(buf, 0, obj)
+        else:
+            _head(buf, 1, -1 - obj)
+    elif isinstance(obj, float):
+        try:
+            f = struct.pack(">f", obj)
+            single = struct.unpack(">f", f)[0] == obj or obj != obj
+        except OverflowError:
+            single = False
+        if single:
+            buf.append(0xFA)
+            buf.extend(f)
+        else:
+            buf.append(0xFB)
+            buf.extend(struct.pack(">d", obj))
+    elif isinstance(obj, dict):
+        _head(buf, 5, len(obj))
+        for k, v in obj.items():
+            _encode(buf, k)
+            _encode(buf, v)
+    elif isinstance(obj, (list, tuple)):
+        _head(buf, 4, len(obj))
+        for v in obj:
+            _encode(buf, v)
+    elif isinstance(obj, (bytes, bytearray)):
+        _head(buf, 2, len(obj))
+        buf.extend(obj)
+    else:
+        raise TypeError(f"cbor: cannot encode {type(obj)}")
+
+
+def _half(h):
+    exp = (h >> 10) & 0x1F
+    mant = h & 0x3FF
+    if exp == 0:
+        val = mant * 2.0**-24
+    elif exp == 31:
+        val = float("nan") if mant else float("inf")
+    else:
+        val = (mant + 1024) * 2.0 ** (exp - 25)
+    return -val if h & 0x8000 else val
+
+
+def _decode(data, pos):
+    ib = data[pos]
+    pos += 1
+    major = ib >> 5
+    info = ib & 0x1F
+    if major == 7:
+        if info == 20:
+            return False, pos
+        if info == 21:
+            return True, pos
+        if info == 22 or info == 23:
+            return None, pos
+        if info == 25:
+            return _half(struct.unpack_from(">H", data, pos)[0]), pos + 2
+        if info == 26:
+            return struct.unpack_from(">f", data, pos)[0], pos + 4
+        if info == 27:
+            return struct.unpack_from(">d", data, pos)[0], pos + 8
+        raise ValueError(f"cbor: unsupported simple value {info}")
+    if info < 24:
+        n = info
+    elif info == 24:
+        n = data[pos]
+        pos += 1
+    elif info == 25:
+        n = struct.unpack_from(">H", data, pos)[0]
+        pos += 2
+    elif info == 26:
+        n = struct.unpack_from(">I", data, pos)[0]
+        pos += 4
+    elif info == 27:
+        n = struct.unpack_from(">Q", data, pos)[0]
+        pos += 8
+    else:
+        raise ValueError("cbor: indefinite length items are not supported")
+    if major == 0:
+        return n, pos
+    if major == 1:
+        return -1 - n, pos
+    if major in (2, 3) and pos + n > len(data):
+        raise ValueError("cbor: truncated")
+    if major == 2:
+        return bytes(data[pos : pos + n]), pos + n
+    if major == 3:
+        return bytes(data[pos : pos + n]).decode(), pos + n
+    if major == 4:
+        res = []
+        for _ in range(n):
+            v, pos = _decode(data, pos)
+            res.append(v)
+        return res, pos
+    if major == 5:
+        res = {}
+        for _ in range(n):
+            k, pos = _decode(data, pos)
+            res[k], pos = _decode(data, pos)
+        return res, pos
+    # major == 6: tag, ignored
+    return _decode(data, pos)
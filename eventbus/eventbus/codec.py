@@ -0,0 +1,31 @@
+import json
+
+from . import cbor
+
+"""
+Wire encodings of eventbus frames.
+
+The server offers ENCODINGS in get_auth, the client picks one in put_auth,
+and the server confirms it in hello_connected (param["encoding"]). All
+subsequent frames, in both directions, use the agreed encoding: text frames
+for JSON, binary frames for CBOR. JSON is used if the client does not ask.
+"""
+
+JSON = "json"
+CBOR = "cbor"
+
+ENCODINGS = (CBOR, JSON)
+
+
+def dumps(frame, encoding: str = JSON):
+    """Encode frame (event or list of events). Returns str (JSON) or bytes (CBOR)."""
+    if encoding == CBOR:
+        return cbor.dumps(frame)
+    return json.dumps(frame)
+
+
+def loads(data, encoding: str = JSON):
+    """Decode frame. Raises ValueError for invalid data."""
+    if encoding == CBOR:
+        return cbor.loads(data)
+    return json.loads(data)
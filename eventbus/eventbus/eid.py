@@ -27,3 +27,30 @@ def eid2lid(eid):
 def eid2addr(eid):
     """<addr>"""
     return eid.split(":")[0]
+
+
+def eid_match(eid, pattern):
+    """fnmatch with `*` only.
+
+    The `:` after the address counts as `.`, and patterns without `.` match the
+    attribute: `*.ram.*` matches `dev.branch:ram.free`, `temperature` matches
+    `dev.branch:fridge.temperature`.
+    """
+    pattern = pattern.replace(":", ".")
+    if "." not in pattern:
+        pattern = "*." + pattern
+    eid = eid.replace(":", ".")
+    parts = pattern.split("*")
+    if len(parts) == 1:
+        return eid == pattern
+    first, last = parts[0], parts[-1]
+    if len(eid) < len(first) + len(last) or not eid.startswith(first) or not eid.endswith(last):
+        return False
+    pos = len(first)
+    end = len(eid) - len(last)
+    for part in parts[1:-1]:
+        pos = eid.find(part, pos, end)
+        if pos < 0:
+            return False
+        pos += len(part)
+    return True
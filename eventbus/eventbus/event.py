@@ -1,7 +1,9 @@
 import time
 
 from . import Addr, event_type, eventbus
+from .codec import ENCODINGS
 from .eid import eid2addr, eid2eid
+from .filters import SUPPRESS, filters
 
 """
 Events are dicts communicated by EventBus.
@@ -34,6 +36,11 @@ def get_src_addr():
     return _SRC_ADDR
 
 
+def addressed_to_me(dst) -> bool:
+    """True if requests sent to dst are to be answered by this node."""
+    return dst == "#server" or dst == _SRC_ADDR
+
+
 def make_event(type, dst, **args):
     args["type"] = type
     args["dst"] = dst
@@ -48,7 +55,8 @@ pong = {"type": event_type.PONG}
 
 # authentication
 def get_auth():
-    return {"type": event_type.GET_AUTH, "src": "#server"}
+    # encodings: supported wire encodings, see eventbus.codec
+    return {"type": event_type.GET_AUTH, "src": "#server", "encodings": list(ENCODINGS)}
 
 
 def put_auth(get_auth, token: str):
@@ -78,16 +86,52 @@ def put_cert(get_cert, cert: dict):
 
 
 # current values
-def get_state(dst="#server"):
-    return make_event(event_type.GET_STATE, dst)
+def get_state(dst="#server", since=None, epoch=None):
+    """Request current values, only those changed after `since` if `epoch` is that of the responder."""
+    if since is None:
+        return make_event(event_type.GET_STATE, dst)
+    return make_event(event_type.GET_STATE, dst, since=since, epoch=epoch)
+
+
+def state_snapshot(states: list, dst: str, **cursor):
+    # cursor (last event of a reply only): epoch, seq
+    return make_event(event_type.STATE_SNAPSHOT, dst, states=states, **cursor)
+
+
+# recent values of an eid (see eventbus.bus.History)
+# with points: downsampled stored history of all eids matching pattern eid (see earth app.tsdb.query)
+def get_history(eid: str, since=None, until=None, limit=None, dst="#server", points=None, method=None):
+    if points is None:
+        return make_event(event_type.GET_HISTORY, dst, eid=eid, since=since, until=until, limit=limit)
+    return make_event(event_type.GET_HISTORY, dst, eid=eid, since=since, until=until, points=points, method=method)
+
+
+def history(eid: str, data, dst: str):
+    return make_event(event_type.HISTORY, dst, eid=eid, data=data)
+
+
+# subscriptions (handled by the connection, see eventbus.bus.subscriptions)
+def subscribe(eids: list | None = None, views: list | None = None, rate: float | None = None):
+    return make_event(event_type.SUBSCRIBE, "#server", eids=eids or [], views=views or [], rate=rate)
+
+
+def unsubscribe(eids: list | None = None, views: list | None = None):
+    # no eids and views: unsubscribe all
+    if eids is None and views is None:
+        return make_event(event_type.UNSUBSCRIBE, "#server")
+    return make_event(event_type.UNSUBSCRIBE, "#server", eids=eids or [], views=views or [])
 
 
 def get_config(dst="#server"):
     return make_event(event_type.GET_CONFIG, dst)
 
 
-def get_log(dst="#server"):
-    return make_event(event_type.GET_LOG, dst)
+def get_log(dst="#server", since=None, min_level=None, limit=None):
+    return make_event(event_type.GET_LOG, dst, since=since, min_level=min_level, limit=limit)
+
+
+def log_snapshot(records: list, dst: str):
+    return make_event(event_type.LOG_SNAPSHOT, dst, records=records)
 
 
 def put_config(data: dict, dst: str = "#server"):
@@ -140,7 +184,16 @@ class State:
     def event(self):
         return self._event
 
-    async def update(self, value, timestamp: float = time.time() + EPOCH_OFFSET):
+    async def update(self, value, timestamp: float | None = None):
+        """Emit new value, filtered per config (see eventbus.filters). Returns None if suppressed.
+
+        timestamp defaults to now.
+        """
+        if timestamp is None:
+            timestamp = time.time() + EPOCH_OFFSET
+        value = filters.apply(self._eid, value)
+        if value is SUPPRESS:
+            return None
         ev = self._event
         ev["value"] = value
         ev["timestamp"] = timestamp
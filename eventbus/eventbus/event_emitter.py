@@ -1,9 +1,30 @@
 import asyncio
 import functools
 
+try:
+    from asyncio import Queue, QueueEmpty, QueueFull
+except ImportError:
+    # MicroPython asyncio misses Queue
+    from asyncio_extra import Queue, QueueEmpty, QueueFull  # type: ignore
+
+try:
+    from time import ticks_diff, ticks_us  # type: ignore
+except ImportError:
+    from time import perf_counter_ns
+
+    def ticks_us():
+        return perf_counter_ns() // 1000
+
+    def ticks_diff(a, b):
+        return a - b
+
+
 ALL_HANDLER = "*"
 NO_HANDLER = "!"
 
+# upper bounds of handler latency buckets [us], last bucket is unbounded
+LATENCY_BUCKETS = (10, 30, 100, 300, 1_000, 3_000, 10_000, 30_000, 100_000, 300_000, 1_000_000)
+
 
 async def _g():
     pass
@@ -12,6 +33,28 @@ async def _g():
 type_coro = type(_g())
 
 
+class EmitterStats:
+    """Event and handler statistics of an EventEmitter (see EventEmitter.instrument)."""
+
+    def __init__(self):
+        self.emitted = {}  # topic -> number of events emitted
+        self.handlers = {}  # (topic, handler) -> [calls, total latency us, count per LATENCY_BUCKETS ..., overflow]
+
+    def record(self, topic, func, us):
+        key = (topic, func)
+        h = self.handlers.get(key)
+        if h is None:
+            h = self.handlers[key] = [0, 0] + [0] * (len(LATENCY_BUCKETS) + 1)
+        h[0] += 1
+        h[1] += us
+        i = 0
+        for bound in LATENCY_BUCKETS:
+            if us <= bound:
+                break
+            i += 1
+        h[2 + i] += 1
+
+
 class EventEmitter:
     """
     A class that represents an event emitter.
@@ -19,18 +62,20 @@ class EventEmitter:
     The EventEmitter class allows registering event handlers for specific topics and emitting events to those handlers.
     """
 
-    def __init__(self, sync_queue_size=20, pause=0.1):
+    def __init__(self, sync_queue_size=20, burst=10):
         """
         Initializes the event emitter object.
 
         Args:
             sync_queue_size (int): The maximum size of the emit_sync queue.
-            pause (float): Delay between submission of sync events.
+            burst (int): Maximum number of sync events emitted before yielding to other tasks.
         """
         self.event_map = {}
         self.event_queue = None
         self.sync_queue_size = sync_queue_size
-        self.pause = pause
+        self.burst = burst
+        self.overflow = {}  # source -> number of emit_sync events dropped
+        self.stats = None  # EmitterStats if instrumented
 
     def on(self, *topics):
         """
@@ -64,7 +109,8 @@ class EventEmitter:
 
             for k, v in self.event_map.items():
                 if k in topics:
-                    v[-1] = (v[-1], id(wrapper_on))
+                    # the wrapper identifies the handler in off (an id could be reused once it is freed)
+                    v[-1] = (v[-1], wrapper_on)
 
             return wrapper_on
 
@@ -77,10 +123,13 @@ class EventEmitter:
         Args:
             func: The previously registered (with @on ...) handler to be unregistered.
         """
+        stats = self.stats
         for k, v in self.event_map.items():
             for i, f in enumerate(v):
-                if f[-1] == id(func):
+                if f[-1] is func:
                     v.pop(i)
+                    if stats is not None:
+                        stats.handlers.pop((k, f[0]), None)
                     break
 
     def clear(self):
@@ -89,6 +138,18 @@ class EventEmitter:
         """
         self.event_map = {}
 
+    def instrument(self, enable=True):
+        """
+        Count emitted events per topic and handler calls and latency (see EmitterStats).
+
+        Latency is measured from calling a handler until it returns, including awaiting
+        coroutine handlers. Statistics are reset each time instrumentation is enabled.
+
+        Args:
+            enable (bool): False to stop instrumentation.
+        """
+        self.stats = EmitterStats() if enable else None
+
     async def emit(self, event):
         """
         Emits an event to all registered event handlers for the given topic.
@@ -97,46 +158,69 @@ class EventEmitter:
             event (dict)
         """
         topic = event.get("topic", event.get("type"))
+        stats = self.stats
+        if stats is not None:
+            stats.emitted[topic] = stats.emitted.get(topic, 0) + 1
         if topic in self.event_map:
             for func in self.event_map[topic]:
-                await self._call_handler(func, event)
+                await self._call_handler(func, event, topic)
         else:
             for func in self.event_map.get(NO_HANDLER, ()):
-                await self._call_handler(func, event)
+                await self._call_handler(func, event, NO_HANDLER)
         for func in self.event_map.get(ALL_HANDLER, ()):
-            await self._call_handler(func, event)
+            await self._call_handler(func, event, ALL_HANDLER)
 
-    def emit_sync(self, event):
+    def emit_sync(self, event, source=None):
         """
         Emit event from synchronous code.
 
+        Events are queued and emitted by a background task. If the queue is full,
+        the event is dropped and counted in overflow[source] (source defaults to
+        the topic of the event).
+
         Args:
-            topic (str): The topic of the event.
-            **args: Additional keyword arguments to pass along with the event.
+            event (dict)
+            source (str): Producer of the event, e.g. "log".
         """
         if self.event_queue is None:
-            try:
-                self.event_queue = asyncio.Queue(maxsize=self.sync_queue_size)
-            except AttributeError:
-                from asyncio_extra import queue
-
-                self.event_queue = queue.Queue(maxsize=self.sync_queue_size)
-            asyncio.create_task(self._sync_emit_task(self.pause))
+            self.event_queue = Queue(maxsize=self.sync_queue_size)
+            asyncio.create_task(self._sync_emit_task())
 
         try:
             self.event_queue.put_nowait(event)
-        except asyncio.QueueFull:
-            pass
+        except QueueFull:
             # Note: no log message - as that would generate another emit_sync event!
-            print("***** sync event queue overflow")
+            if source is None:
+                source = event.get("topic", event.get("type"))
+            self.overflow[source] = self.overflow.get(source, 0) + 1
 
-    async def _sync_emit_task(self, pause):
+    async def _sync_emit_task(self):
+        queue = self.event_queue
         while True:
-            event = await self.event_queue.get()  # type: ignore
-            await self.emit(event)
-            await asyncio.sleep(pause)
-
-    async def _call_handler(self, func, event):
+            # wait for an event, then emit what is queued (at most burst events) before yielding
+            batch = [await queue.get()]  # type: ignore
+            while len(batch) < self.burst:
+                try:
+                    batch.append(queue.get_nowait())  # type: ignore
+                except QueueEmpty:
+                    break
+            for event in batch:
+                try:
+                    await self.emit(event)
+                except Exception as e:
+                    # keep draining
+                    print(f"***** emit_sync {event.get('type')}: {e}")
+            await asyncio.sleep(0)
+
+    async def _call_handler(self, func, event, topic=None):
+        stats = self.stats
+        if stats is None:
+            res = func[0](**event)
+            if isinstance(res, type_coro):
+                await res
+            return
+        t0 = ticks_us()
         res = func[0](**event)
         if isinstance(res, type_coro):
             await res
+        stats.record(topic, func[0], ticks_diff(ticks_us(), t0))
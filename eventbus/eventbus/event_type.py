@@ -5,10 +5,18 @@ PONG = "pong"
 # state update, action
 STATE = "state"
 STATE_ACTION = "action"
+STATE_SNAPSHOT = "state_snapshot"  # reply to GET_STATE, states = [[eid, value, timestamp], ...]
+
+# limit STATE events sent to a connection, see eventbus.bus.subscriptions
+SUBSCRIBE = "subscribe"
+UNSUBSCRIBE = "unsubscribe"
 
 # get/set state, log, config, ...
 GET_STATE = "get_state"
+GET_HISTORY = "get_history"
+HISTORY = "history"  # reply to GET_HISTORY, data = [[timestamp, value], ...]
 GET_LOG = "get_log"
+LOG_SNAPSHOT = "log_snapshot"  # reply to GET_LOG, records = [{levelno, levelname, timestamp, message, ...}, ...]
 GET_CONFIG = "get_config"
 PUT_CONFIG = "put_config"
 
@@ -0,0 +1,158 @@
+import logging
+
+from .eid import eid_match
+
+"""
+Entity filters - suppress or transform STATE updates at the source.
+
+Filters are declared per eid pattern in the "entities" section of config.json:
+
+    "humidity": { "filter": [ {"lpf": 5}, {"abstol": 0.3} ] },
+    "*.ram.*":  { "filter": [ {"scale": 0.001}, {"abstol": 10} ] },
+    "*":        { "filter": [ "duplicate" ] }
+
+Patterns are matched with eventbus.eid.eid_match, e.g. `humidity` matches the
+humidity of all leaves. The first pattern (in config order) with a "filter"
+determines the chain of an eid.
+
+Filters are applied in order:
+
+- scale: multiply by the parameter
+- offset: add the parameter
+- lpf: first order low pass, y += (x - y) / parameter
+- abstol: suppress values within +/- parameter of the last value sent
+- duplicate: suppress values equal to the last value sent
+
+Numeric filters pass non-numeric values unchanged; abstol then acts like duplicate.
+
+Specs are compiled once per config version. Chains are resolved lazily, on the
+first update of an eid, and cached with their state (last value sent, lpf output).
+"""
+
+logger = logging.getLogger(__name__)
+
+SUPPRESS = object()  # returned by Filters.apply for suppressed values
+
+
+def _number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _scale(k):
+    def f(value):
+        return value * k if _number(value) else value
+
+    return f
+
+
+def _offset(k):
+    def f(value):
+        return value + k if _number(value) else value
+
+    return f
+
+
+def _lpf(n):
+    y = None
+
+    def f(value):
+        nonlocal y
+        if not _number(value):
+            return value
+        y = value if y is None else y + (value - y) / n
+        return y
+
+    return f
+
+
+def _abstol(tol):
+    last = SUPPRESS
+
+    def f(value):
+        nonlocal last
+        if last is not SUPPRESS:
+            if _number(value) and _number(last):
+                if abs(value - last) < tol:
+                    return SUPPRESS
+            elif value == last:
+                return SUPPRESS
+        last = value
+        return value
+
+    return f
+
+
+def _duplicate(_=None):
+    last = SUPPRESS
+
+    def f(value):
+        nonlocal last
+        if value == last:
+            return SUPPRESS
+        last = value
+        return value
+
+    return f
+
+
+_FILTERS = {"scale": _scale, "offset": _offset, "lpf": _lpf, "abstol": _abstol, "duplicate": _duplicate}
+
+
+def _compile(spec) -> tuple:
+    """Validated ((factory, param), ...) of a "filter" spec."""
+    stages = []
+    for item in spec if isinstance(spec, list) else [spec]:
+        for name, param in item.items() if isinstance(item, dict) else [(item, None)]:
+            factory = _FILTERS.get(name)
+            if factory is None or (name != "duplicate" and not _number(param)) or (name == "lpf" and param < 1):
+                logger.error(f"invalid filter {name}: {param} (ignored)")
+                continue
+            stages.append((factory, param))
+    return tuple(stages)
+
+
+class Filters:
+    def __init__(self):
+        self._version = None
+        self._patterns = ()  # ((pattern, stages), ...)
+        self._chains = {}  # eid -> tuple of filter functions (empty if unfiltered)
+
+    def configure(self, config: dict) -> None:
+        """Compile the filter specs in config["entities"], unless already done for this config version."""
+        version = config.get("version")
+        if version is not None and version == self._version:
+            return
+        patterns = []
+        for pattern, fields in (config.get("entities") or {}).items():
+            spec = fields.get("filter") if isinstance(fields, dict) else None
+            if spec:
+                patterns.append((pattern, _compile(spec)))
+        self._version = version
+        self._patterns = tuple(patterns)
+        self._chains = {}
+
+    def chain(self, eid: str) -> tuple:
+        """Filter functions of eid, created on first use."""
+        chain = self._chains.get(eid)
+        if chain is None:
+            chain = ()
+            for pattern, stages in self._patterns:
+                if eid_match(eid, pattern):
+                    chain = tuple(factory(param) for factory, param in stages)
+                    break
+            self._chains[eid] = chain
+        return chain
+
+    def apply(self, eid: str, value):
+        """Filtered value, or SUPPRESS if the update is not to be sent."""
+        if not self._patterns:
+            return value
+        for f in self.chain(eid):
+            value = f(value)
+            if value is SUPPRESS:
+                break
+        return value
+
+
+# singleton, configured by eventbus.bus.Config
+filters = Filters()
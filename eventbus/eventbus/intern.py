@@ -0,0 +1,69 @@
+from . import event_type
+
+"""
+Per-connection interning of STATE events.
+
+STATE events repeat type, src, dst and a long eid with every update. With
+interning (requested with "intern": true in put_auth, granted in
+hello_connected param["intern"]), the sender assigns a small integer id to
+each (eid, src, dst) on first use and sends that event in full with an
+additional "iid" field. Later STATE events with the same (eid, src, dst) are
+sent as [iid, value, timestamp] in a list frame.
+
+Each direction of a connection has its own table. Tables are discarded when
+the connection closes and rebuilt after reconnecting.
+"""
+
+INTERN_SIZE = 500  # max interned (eid, src, dst), further ones are sent in full
+
+_FIELDS = ("type", "src", "dst", "eid", "value", "timestamp")
+
+
+class Interner:
+    def __init__(self, maxsize: int = INTERN_SIZE):
+        self.maxsize = maxsize
+        self._ids = {}  # outgoing: (eid, src, dst) -> iid
+        self._keys = {}  # incoming: iid -> (eid, src, dst)
+
+    def pack(self, frame):
+        """Outgoing frame (event or list of events) with STATE events in compact form."""
+        packed = []
+        for event in frame if isinstance(frame, list) else [frame]:
+            if event.get("type") == event_type.STATE and len(event) == 6 and all(k in event for k in _FIELDS):
+                key = (event["eid"], event["src"], event["dst"])
+                iid = self._ids.get(key)
+                if iid is not None:
+                    packed.append([iid, event["value"], event["timestamp"]])
+                    continue
+                if len(self._ids) < self.maxsize:
+                    iid = self._ids[key] = len(self._ids)
+                    # copy, the event is shared with other connections
+                    event = dict(event)
+                    event["iid"] = iid
+            packed.append(event)
+        if len(packed) == 1 and isinstance(packed[0], dict):
+            return packed[0]
+        return packed
+
+    def unpack(self, frame) -> list:
+        """Events in incoming frame, compact STATE events expanded. Raises ValueError for unknown ids."""
+        events = []
+        for event in frame if isinstance(frame, list) else [frame]:
+            if isinstance(event, list):
+                try:
+                    eid, src, dst = self._keys[event[0]]
+                    value, timestamp = event[1], event[2]
+                except (KeyError, IndexError, TypeError):
+                    raise ValueError(f"invalid interned event {event}")
+                event = {
+                    "type": event_type.STATE,
+                    "src": src,
+                    "dst": dst,
+                    "eid": eid,
+                    "value": value,
+                    "timestamp": timestamp,
+                }
+            elif "iid" in event:
+                self._keys[event.pop("iid")] = (event.get("eid"), event.get("src"), event.get("dst"))
+            events.append(event)
+        return events
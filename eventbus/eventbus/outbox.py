@@ -0,0 +1,195 @@
+import asyncio
+import time
+
+from . import event_type
+
+"""
+Outbox - bounded queue of outgoing events of a connection.
+
+Events are sent by a dedicated writer task, so posting an event never
+waits for the transport: a slow connection does not hold up the
+emitter or other connections.
+
+With `conflate`, a STATE event replaces the pending STATE of the same
+eid and destination in place: a connection that cannot keep up with
+fast sensors receives only their latest values, and the queue holds at
+most one STATE per eid. All other events keep strict ordering.
+
+Events are coalesced into list frames. A frame is sent when `size`
+events are pending or `window` seconds after the first event of the
+frame was posted, whichever comes first. Receivers (eventbus.bus.Server,
+app.gateway.Gateway, ui eventbus) accept both single events and lists
+of events in one frame.
+
+When `maxsize` events are pending, `policy` decides what happens to
+new events:
+
+- DROP_OLDEST: discard the oldest pending event.
+- CONFLATE: a STATE event replaces the pending STATE of the same eid
+  (even if `conflate` is off); other events discard the oldest pending event.
+- DISCONNECT: discard new events; call `disconnect` once the queue
+  has been full for `deadline` seconds.
+"""
+
+BATCH_SIZE = 50  # max events per frame
+BATCH_WINDOW = 0.1  # max delay before a partial frame is sent [seconds]
+
+QUEUE_SIZE = 1000  # max pending events per connection
+QUEUE_DEADLINE = 10  # DISCONNECT policy: max time the queue may remain full [seconds]
+
+# overflow policies
+DROP_OLDEST = "drop_oldest"
+CONFLATE = "conflate"
+DISCONNECT = "disconnect"
+
+
+def batch_param(requested) -> dict | None:
+    """Batch parameters granted for the `requested` ones (from put_auth), None if not requested or invalid."""
+    if not isinstance(requested, dict):
+        return None
+    try:
+        size = int(requested.get("size", BATCH_SIZE))
+        window = float(requested.get("window", BATCH_WINDOW))
+    except (ValueError, TypeError, OverflowError):
+        return None
+    if window != window:
+        # nan
+        return None
+    return {
+        "size": max(1, min(size, BATCH_SIZE)),
+        "window": max(0, min(window, BATCH_WINDOW)),
+    }
+
+
+class Outbox:
+    def __init__(
+        self,
+        send,
+        size: int = 1,
+        window: float = 0,
+        maxsize: int = QUEUE_SIZE,
+        policy: str = DROP_OLDEST,
+        deadline: float = QUEUE_DEADLINE,
+        disconnect=None,
+        conflate: bool = False,
+    ):
+        """Create an Outbox.
+
+        Args:
+            send: Coroutine function that sends a frame (an event or a list of events).
+            size (int): Maximum number of events per frame.
+            window (float): Maximum delay before a partial frame is sent [seconds].
+            maxsize (int): Maximum number of pending events, 0 for unbounded.
+            policy (str): Overflow policy, DROP_OLDEST, CONFLATE, or DISCONNECT.
+            deadline (float): DISCONNECT policy: time the queue may remain full [seconds].
+            disconnect: DISCONNECT policy: function called when the deadline is exceeded.
+            conflate (bool): Replace pending STATE events by newer ones for the same eid.
+        """
+        assert policy in (DROP_OLDEST, CONFLATE, DISCONNECT), f"invalid policy {policy}"
+        self._send = send
+        self.size = size
+        self.window = window
+        self.maxsize = maxsize
+        self.policy = policy
+        self.deadline = deadline
+        self._disconnect = disconnect
+        self.conflate = conflate
+        self._full_since = None
+        self._events = []
+        # (dst, eid) -> absolute position of pending STATE events
+        self._pending = {}
+        self._base = 0  # absolute position of self._events[0]
+        self._ready = asyncio.Event()
+        self._full = asyncio.Event()
+        # queue depth metrics (updated in place, e.g. for /api/connections)
+        self.stats = {"depth": 0, "max_depth": 0, "dropped": 0, "conflated": 0}
+        self._task = asyncio.create_task(self._writer_task())
+
+    def __len__(self):
+        return len(self._events)
+
+    def put(self, event) -> None:
+        """Queue a (shallow) copy of event for sending. Does not block.
+
+        Emitters may reuse or change the event after put returns (e.g. State.update).
+        """
+        event = dict(event)
+        events = self._events
+        full = len(events) >= self.maxsize > 0
+        key = None
+        if event.get("type") == event_type.STATE:
+            key = (event.get("dst"), event.get("eid"))
+            if self.conflate or (full and self.policy == CONFLATE):
+                pos = self._pending.get(key)
+                if pos is not None:
+                    events[pos - self._base] = event
+                    self.stats["conflated"] += 1
+                    return
+        if full and not self._overflow():
+            return
+        if key is not None:
+            self._pending[key] = self._base + len(events)
+        events.append(event)
+        stats = self.stats
+        stats["depth"] = depth = len(events)
+        if depth > stats["max_depth"]:
+            stats["max_depth"] = depth
+        self._ready.set()
+        if depth >= self.size:
+            self._full.set()
+
+    def close(self) -> None:
+        """Stop the writer task. Pending events are discarded."""
+        self._task.cancel()
+        self._events = []
+        self._pending = {}
+        self.stats["depth"] = 0
+
+    def _take(self, n: int) -> list:
+        """Remove and return the first `n` pending events."""
+        events = self._events
+        taken = events[:n]
+        del events[:n]
+        pending = self._pending
+        pos = self._base
+        for event in taken:
+            if event.get("type") == event_type.STATE:
+                key = (event.get("dst"), event.get("eid"))
+                if pending.get(key) == pos:
+                    del pending[key]
+            pos += 1
+        self._base = pos
+        self.stats["depth"] = len(events)
+        return taken
+
+    def _overflow(self) -> bool:
+        """Apply the overflow policy. Returns True if the new event is to be queued."""
+        if self.policy == DISCONNECT:
+            self.stats["dropped"] += 1
+            now = time.time()
+            if self._full_since is None:
+                self._full_since = now
+            elif now - self._full_since > self.deadline and self._disconnect is not None:
+                self._disconnect()
+                self._disconnect = None
+            return False
+        self._take(1)
+        self.stats["dropped"] += 1
+        return True
+
+    async def _writer_task(self):
+        while True:
+            await self._ready.wait()
+            if self.window > 0 and not self._full.is_set():
+                # collect more events for this frame
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+            self._ready.clear()
+            self._full.clear()
+            while self._events:
+                frame = self._take(self.size)
+                if len(self._events) < self.maxsize:
+                    self._full_since = None
+                await self._send(frame[0] if len(frame) == 1 else frame)
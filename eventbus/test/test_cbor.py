@@ -0,0 +1,79 @@
+import json
+import math
+
+import pytest
+
+from eventbus import cbor
+
+
+def test_roundtrip():
+    values = [
+        None,
+        True,
+        False,
+        0,
+        23,
+        24,
+        255,
+        256,
+        65536,
+        2**32,
+        2**63,
+        -1,
+        -24,
+        -25,
+        -(2**40),
+        0.5,
+        1.1,
+        -2.75e-10,
+        1e300,
+        math.inf,
+        "",
+        "tree.branch:fridge_top.temperature",
+        "ünïcödé",
+        b"\x00\x01",
+        [],
+        [1, [2, [3]]],
+        {"type": "state", "eid": "a.b:c.d", "value": 21.5, "timestamp": 1717171717.123},
+    ]
+    for v in values:
+        assert cbor.loads(cbor.dumps(v)) == v
+    assert math.isnan(cbor.loads(cbor.dumps(math.nan)))
+    assert cbor.loads(cbor.dumps((1, 2))) == [1, 2]
+
+
+def test_known():
+    # RFC 8949, appendix A
+    assert cbor.dumps(100) == bytes.fromhex("1864")
+    assert cbor.dumps(-1000) == bytes.fromhex("3903e7")
+    assert cbor.dumps("IETF") == bytes.fromhex("6449455446")
+    assert cbor.dumps([1, [2, 3]]) == bytes.fromhex("8201820203")
+    assert cbor.dumps({"a": 1}) == bytes.fromhex("a1616101")
+    assert cbor.dumps(1.5) == bytes.fromhex("fa3fc00000")
+    assert cbor.loads(bytes.fromhex("f93c00")) == 1.0
+    assert cbor.loads(bytes.fromhex("f9c400")) == -4.0
+    assert cbor.loads(bytes.fromhex("c11a514b67b0")) == 1363896240
+
+
+def test_size():
+    event = {"type": "state", "src": "t.b", "dst": "#clients", "eid": "t.b:x.temperature", "value": 21.5}
+    assert len(cbor.dumps(event)) < len(json.dumps(event))
+
+
+def test_errors():
+    with pytest.raises(TypeError):
+        cbor.dumps(object())
+    with pytest.raises(ValueError):
+        cbor.loads(bytes.fromhex("9f01ff"))
+    with pytest.raises(ValueError):
+        cbor.loads(bytes.fromhex("0101"))
+
+
+def test_truncated():
+    data = cbor.dumps({"type": "state", "eid": "t.b:x.temperature", "value": 21.5, "timestamp": 1717000000})
+    for n in range(len(data)):
+        with pytest.raises(ValueError):
+            cbor.loads(data[:n])
+    for data in (b"\x19\x01", b"\xfb\x00", b"\x65ab", b"\xa1\x81\x01\x01"):
+        with pytest.raises(ValueError):
+            cbor.loads(data)
@@ -2,19 +2,26 @@ import asyncio
 
 from eventbus import event_type, eventbus
 from eventbus.bus import CurrentState
-from eventbus.event import State, get_state
+from eventbus.bus.current_state import SNAPSHOT_SIZE
+from eventbus.event import State, get_state, state_snapshot
 
 
 async def test_current_state():
     asyncio.new_event_loop()
     states = []
+    snapshots = []
 
     @eventbus.on(event_type.STATE)
     def s(value, **event):
         nonlocal states
         states.append(value)
 
-    CurrentState()
+    @eventbus.on(event_type.STATE_SNAPSHOT)
+    def snapshot(states, **event):
+        snapshots.append(states)
+
+    current_state = CurrentState()
+    current_state.state.clear()
     for i in range(3):
         x = State(f"a.b{i}")
         await x.update(i)
@@ -24,4 +31,55 @@ async def test_current_state():
 
     await eventbus.emit(get_state())
     await asyncio.sleep(0.1)
-    assert states == list(range(3))
+    assert states == []
+    assert len(snapshots) == 1
+    assert [value for eid, value, ts in snapshots[0]] == list(range(3))
+
+    # snapshots update the current state
+    await eventbus.emit(
+        state_snapshot([["#earth:a.b0", 10, 0], ["#earth:a.c", 11, 0]], dst="#earth") | {"src": "tree.branch"}
+    )
+    assert current_state.state["#earth:a.b0"] == (10, 0)
+    assert current_state.state["#earth:a.c"] == (11, 0)
+
+    # large stores are sent in chunks
+    states = [[f"#earth:x.y{i}", i, 0] for i in range(SNAPSHOT_SIZE + 1)]
+    await eventbus.emit(state_snapshot(states, dst="#earth") | {"src": "tree.branch"})
+    snapshots.clear()
+    await eventbus.emit(get_state())
+    assert [len(s) for s in snapshots] == [SNAPSHOT_SIZE, 5]
+    eventbus.off(s)
+    eventbus.off(snapshot)
+
+
+async def test_resync():
+    replies = []
+
+    @eventbus.on(event_type.STATE_SNAPSHOT)
+    def snapshot(**event):
+        if event["dst"] == "@resync" and "seq" in event:
+            # last (or only) part of a reply
+            replies.append(event)
+
+    current_state = CurrentState()
+    await State("r.a").update(1)
+    await State("r.b").update(2)
+
+    await eventbus.emit(get_state(dst="#server") | {"src": "@resync"})
+    assert len(replies) == 1
+    cursor = {"since": replies[0]["seq"], "epoch": replies[0]["epoch"]}
+    assert cursor["since"] == current_state.seq
+
+    # nothing changed
+    await eventbus.emit(get_state(**cursor) | {"src": "@resync"})
+    assert replies[-1]["states"] == []
+
+    # only changes after the cursor
+    await State("r.b").update(3)
+    await eventbus.emit(get_state(**cursor) | {"src": "@resync"})
+    assert [(eid, value) for eid, value, ts in replies[-1]["states"]] == [("#earth:r.b", 3)]
+
+    # stale epoch: everything
+    await eventbus.emit(get_state(since=cursor["since"], epoch=0) | {"src": "@resync"})
+    assert len(replies[-1]["states"]) == len(current_state.state) % SNAPSHOT_SIZE
+    eventbus.off(snapshot)
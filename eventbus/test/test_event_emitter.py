@@ -1,3 +1,5 @@
+import asyncio
+
 from eventbus.event_emitter import EventEmitter
 
 
@@ -58,3 +60,45 @@ async def test_all():
 
     await em.emit({"type": "type2", "b": 2})
     assert event_stack == [{"type": "type2", "b": 2}, ("all", {"type": "type2", "b": 2})]
+
+
+async def test_emit_sync():
+    em = EventEmitter(sync_queue_size=5, burst=2)
+    received = []
+
+    @em.on("log")
+    def listener(**event):
+        received.append(event["i"])
+
+    for i in range(8):
+        em.emit_sync({"type": "log", "i": i})
+    em.emit_sync({"type": "state", "i": 8}, source="sensor")
+    assert em.overflow == {"log": 3, "sensor": 1}
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert received == [0, 1, 2, 3, 4]
+
+
+async def test_instrument():
+    em = EventEmitter()
+
+    @em.on("a")
+    async def slow(**event):
+        await asyncio.sleep(0.002)
+
+    @em.on("*")
+    def fast(**event):
+        pass
+
+    await em.emit({"type": "a"})
+    assert em.stats is None
+    em.instrument()
+    for _ in range(3):
+        await em.emit({"type": "a"})
+    await em.emit({"type": "b"})
+    assert em.stats.emitted == {"a": 3, "b": 1}  # type: ignore
+    handlers = {(topic, func.__name__): h for (topic, func), h in em.stats.handlers.items()}  # type: ignore
+    h = handlers[("a", "slow")]
+    assert h[0] == 3 and h[1] >= 6000
+    assert sum(h[2:]) == 3 and sum(h[2:6]) == 0
+    assert handlers[("*", "fast")][0] == 4
@@ -0,0 +1,73 @@
+import pytest
+
+from eventbus import event_type, eventbus
+from eventbus.event import State
+from eventbus.eid import eid_match
+from eventbus.filters import SUPPRESS, Filters, filters
+
+CONFIG = {
+    "version": "1",
+    "entities": {
+        "dev.soc.temperature": {"name": "SOC temperature"},
+        "temperature": {"filter": [{"abstol": 0.3}]},
+        "humidity": {"filter": [{"lpf": 2}, {"abstol": 1}]},
+        "farenheit": {"filter": [{"scale": 1.8}, {"offset": 32}]},
+        "*.ram.*": {"filter": [{"scale": 0.001}, {"abstol": 10}]},
+        "*": {"filter": ["duplicate"]},
+    },
+}
+
+
+def run(f, eid, values):
+    return [v for v in (f.apply(eid, x) for x in values) if v is not SUPPRESS]
+
+
+def test_match():
+    assert eid_match("dev.b:x.temperature", "*.temperature")
+    assert eid_match("dev.b:x.temperature", "temperature")
+    assert eid_match("dev.b:ram.free", "*.ram.*")
+    assert eid_match("dev.b:ram.free", "dev.b:ram.free")
+    assert eid_match("a.abc", "a.a*b*c")
+    assert not eid_match("a.ac", "a.a*c*c")
+    assert not eid_match("dev.b:x.temperature2", "*.temperature")
+    assert eid_match("a:b.c", "*")
+
+
+def test_filters():
+    f = Filters()
+    assert run(f, "a:b.c", [1, 1, 2]) == [1, 1, 2]
+    f.configure(CONFIG)
+    assert run(f, "dev.b:x.temperature", [20, 20.1, 20.2, 20.3, 20, "off", "off", 20]) == [20, 20.3, 20, "off", 20]
+    assert run(f, "dev.b:x.humidity", [50, 54, 52]) == [50, 52]
+    assert run(f, "dev.b:x.farenheit", [0, 100]) == [32, 212]
+    assert run(f, "dev.b:ram.free", [100_000, 105_000, 111_000]) == [100, 111]
+    assert run(f, "dev.b:x.other", [1, 1, True, True, None]) == [1, None]
+
+    # compiled once per version, chain state is kept
+    f.configure(CONFIG)
+    assert run(f, "dev.b:x.temperature", [20.1]) == []
+    f.configure({**CONFIG, "version": "2"})
+    assert run(f, "dev.b:x.temperature", [20.1]) == [20.1]
+
+
+def test_invalid():
+    f = Filters()
+    f.configure({"entities": {"*": {"filter": [{"abstol": "x"}, {"lpf": 0}, "unknown", {"scale": 2}]}}})
+    assert run(f, "a:b.c", [1, 1]) == [2, 2]
+
+
+@pytest.fixture
+def configured():
+    filters.configure(CONFIG)
+    yield
+    filters.configure({})
+
+
+async def test_state_update(configured):
+    values = []
+    handler = eventbus.on(event_type.STATE)(lambda value, **event: values.append(value))
+    s = State("dev.b1:x.temperature")
+    for v in (20, 20.1, 21):
+        await s.update(v)
+    eventbus.off(handler)
+    assert values == [20, 21]
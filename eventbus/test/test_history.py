@@ -0,0 +1,67 @@
+import asyncio
+
+from eventbus import event_type, eventbus
+from eventbus.bus import History
+from eventbus.bus.history import SAMPLE_SIZE, Ring
+from eventbus.event import State, get_history
+
+
+def test_ring():
+    r = Ring(4)
+    assert r.query() == []
+    for t in range(1, 4):
+        r.append(t, t * 10)
+    assert r.query() == [[1, 10], [2, 20], [3, 30]]
+    assert not r.append(2, 0)
+    for t in range(4, 7):
+        r.append(t, t * 10)
+    assert len(r) == 4
+    assert r.query() == [[3, 30], [4, 40], [5, 50], [6, 60]]
+    assert r.query(since=4, until=5) == [[4, 40], [5, 50]]
+    assert r.query(limit=1) == [[6, 60]]
+    assert r.query(until=4.5, limit=3) == [[3, 30], [4, 40]]
+
+
+async def test_history():
+    h = History()
+    h._rings.clear()
+    h._bytes = 0
+    for t in range(1, 6):
+        await eventbus.emit(
+            {"type": "state", "src": "a", "dst": "#clients", "eid": "a:x.t", "value": t, "timestamp": t}
+        )
+    await eventbus.emit({"type": "state", "src": "a", "dst": "#clients", "eid": "a:x.s", "value": "on", "timestamp": 1})
+    await eventbus.emit(
+        {"type": "state_snapshot", "src": "a", "dst": "#clients", "states": [["a:x.t", 6, 6], ["a:x.u", 1, 1]]}
+    )
+    assert h.query("a:x.t", since=5) == [[5, 5], [6, 6]]
+    assert h.query("a:x.s") == []
+    await eventbus.emit({"type": "state", "src": "a", "dst": "#clients", "eid": "a:x.b", "value": True, "timestamp": 1})
+    assert h.query("a:x.b") == []
+    assert h.stats["eids"] == 2
+    assert h.stats["bytes"] == 2 * h.size * SAMPLE_SIZE
+
+    replies = []
+    handler = eventbus.on(event_type.HISTORY)(lambda **event: replies.append(event))
+    await eventbus.emit(get_history("a:x.t", limit=2) | {"src": "@1"})
+    await asyncio.sleep(0.01)
+    eventbus.off(handler)
+    assert replies[0]["dst"] == "@1"
+    assert replies[0]["data"] == [[5, 5], [6, 6]]
+
+    # requests to other nodes are not answered
+    replies.clear()
+    handler = eventbus.on(event_type.HISTORY)(lambda **event: replies.append(event))
+    await eventbus.emit(get_history("a:x.t", dst="tree.branch") | {"src": "@1"})
+    await asyncio.sleep(0.01)
+    eventbus.off(handler)
+    assert replies == []
+
+
+async def test_update_timestamp():
+    # State.update without timestamp records every value
+    h = History()
+    temp = State("history.test.temp")
+    for v in range(5):
+        await temp.update(v)
+    assert [v for _, v in h.query(temp.eid)] == list(range(5))
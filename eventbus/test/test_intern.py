@@ -0,0 +1,45 @@
+from eventbus.intern import Interner
+
+
+def state(eid, value, src="dev.b1", dst="#clients"):
+    return {"type": "state", "src": src, "dst": dst, "eid": eid, "value": value, "timestamp": 1.5}
+
+
+def test_intern():
+    tx, rx = Interner(), Interner()
+    a1 = state("dev.b1:fridge.temperature", 1)
+    a2 = state("dev.b1:fridge.temperature", 2)
+    b1 = state("dev.b1:fridge.humidity", 50)
+    other = {"type": "log", "src": "dev.b1", "dst": "#clients", "message": "hi"}
+
+    # first use: full event with id, original event not modified
+    frame = tx.pack(a1)
+    assert frame == {**a1, "iid": 0} and "iid" not in a1
+    assert rx.unpack(frame) == [a1]
+
+    # later uses: compact
+    frame = tx.pack([a2, other, b1, a2])
+    assert frame == [[0, 2, 1.5], other, {**b1, "iid": 1}, [0, 2, 1.5]]
+    assert rx.unpack(frame) == [a2, other, b1, a2]
+    assert tx.pack(a2) == [[0, 2, 1.5]]
+    assert rx.unpack(tx.pack(a2)) == [a2]
+
+    # different dst is a different entry
+    assert tx.pack(state("dev.b1:fridge.temperature", 3, dst="@1"))["iid"] == 2
+
+    # extra fields are sent in full
+    c = {**a1, "extra": 1}
+    assert tx.pack(c) == c
+
+
+def test_intern_limits():
+    tx, rx = Interner(maxsize=1), Interner()
+    a = state("a", 1)
+    b = state("b", 1)
+    assert rx.unpack(tx.pack([a, b, a, b])) == [a, b, a, b]
+    assert tx.pack([a, b]) == [[0, 1, 1.5], b]
+    try:
+        Interner().unpack([[7, 1, 1.5]])
+        assert False
+    except ValueError:
+        pass
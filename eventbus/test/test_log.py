@@ -1,21 +1,86 @@
+import logging
+
 from eventbus import event_type, eventbus
 from eventbus.bus import Log
+from eventbus.bus.log import RateLimit
 from eventbus.event import get_log, log_event
 
 
-async def test_current_state():
-    rec = []
-    proto = []
+def record(message, levelno=logging.ERROR, timestamp=0, src="test"):
+    event = log_event(
+        message=message,
+        levelno=levelno,
+        levelname=logging.getLevelName(levelno),
+        timestamp=timestamp,
+        name="name",
+        funcName="func",
+    )
+    event["src"] = src
+    return event
+
+
+def test_rate_limit():
+    limit = RateLimit(rate=0, burst=2)
+    events = [record("storm") for _ in range(5)]
+    assert [limit(ev) for ev in events] == [1, 1, 0, 0, 0]
+    assert limit(record("other"))
+    # same message from another node
+    assert limit(record("storm", src="gw"))
+    assert limit.suppressed == 3
+    # dropped repeats are counted in the next one passed
+    limit.rate = 1e6
+    ev = record("storm")
+    assert limit(ev) == 4
+    assert "count" not in ev
+
+
+async def test_log(capsys):
+    snapshots = []
 
-    @eventbus.on(event_type.LOG)
-    def lh(**event):
-        rec.append(event)
+    @eventbus.on(event_type.LOG_SNAPSHOT)
+    def lh(records, **event):
+        snapshots.append(records)
 
-    Log()
-    for i in range(3):
-        lg = log_event(message=f"test {i}", levelno=10, levelname="INFO", src="test", name="name", funcName="func")
-        await eventbus.emit(lg)
-        proto.append(lg)
+    log = Log()
+    log._records.clear()
+    log._timestamps.clear()
+    log.echo = False
+    log.limit = RateLimit(rate=0, burst=3)
+    for i in range(5):
+        await eventbus.emit(record("storm", timestamp=i))
+    await eventbus.emit(record("info", logging.INFO, timestamp=1))
+    await eventbus.emit(record("warning", logging.WARNING, timestamp=1.5))
+    await eventbus.emit(record("critical", logging.CRITICAL, timestamp=10))
+
+    # printed (echo) regardless of level, but not kept
+    log.echo = True
+    await eventbus.emit(record("debug", logging.DEBUG, timestamp=1))
+    log.echo = False
+    assert "debug" in capsys.readouterr().out
 
     await eventbus.emit(get_log())
-    assert rec == proto
+    assert len(snapshots) == 1
+    assert [r["message"] for r in snapshots[0]] == ["storm", "storm", "warning", "storm", "critical"]
+    assert "type" not in snapshots[0][0] and "dst" not in snapshots[0][0]
+    assert log.stats["suppressed"] == 2
+
+    assert [r["timestamp"] for r in log.query(since=2, min_level=logging.ERROR)] == [2, 10]
+    assert [r["message"] for r in log.query(limit=2)] == ["storm", "critical"]
+
+    # requests to other nodes are not answered
+    await eventbus.emit(get_log(dst="gw"))
+    assert len(snapshots) == 1
+
+    # dropped repeats are counted in the record, the event is unchanged
+    log.limit.rate = 1e6
+    ev = record("storm", timestamp=11)
+    await eventbus.emit(ev)
+    assert "count" not in ev
+    assert log.query(limit=1)[0]["count"] == 3
+
+    # snapshot from a gateway, merged without duplicates
+    gateway = [{"message": "gw", "levelno": logging.ERROR, "timestamp": 5, "src": "gw"}]
+    for _ in range(2):
+        await eventbus.emit({"type": event_type.LOG_SNAPSHOT, "src": "gw", "dst": "#earth", "records": gateway})
+    assert [r["message"] for r in log.query(since=5)] == ["gw", "critical", "storm"]
+    eventbus.off(lh)
@@ -0,0 +1,71 @@
+from eventbus import event_type, eventbus
+from eventbus.bus import Metrics
+from eventbus.bus.metrics import _name
+
+
+async def test_metrics():
+    states = {}
+
+    @eventbus.on(event_type.STATE)
+    def state(eid, value, **event):
+        states[eid.split(":")[1]] = value
+
+    metrics = Metrics()
+    eventbus.overflow.clear()
+    eventbus.overflow.update({"log": 3, "#x": 1})
+    await metrics.publish()
+    assert states == {"eventbus.overflow": 4, "eventbus.overflow_log": 3, "eventbus.overflow__x": 1}
+    # unchanged values are not published again
+    states.clear()
+    eventbus.overflow["log"] = 4
+    await metrics.publish()
+    assert states == {"eventbus.overflow": 5, "eventbus.overflow_log": 4}
+    eventbus.overflow.clear()
+    eventbus.off(state)
+
+
+async def test_instrumented():
+    @eventbus.on("ping_metrics")
+    def ping(**event):
+        pass
+
+    metrics = Metrics()
+    eventbus.instrument()
+    try:
+        for _ in range(2):
+            await eventbus.emit({"type": "ping_metrics"})
+        values = metrics.values()
+        name = f"{ping.__module__}.test_instrumented.ping"
+        attr = "ping_metrics_" + name.replace(".", "_")
+        assert values["events_ping_metrics"] == 2
+        assert values[f"calls_{attr}"] == 2
+        assert values[f"p90_{attr}"] <= 1
+        # latency is reported for calls since the last call of values()
+        assert f"latency_{attr}" not in metrics.values()
+
+        text = metrics.prometheus()
+        assert 'eventbus_events_total{topic="ping_metrics"} 2' in text
+        labels = f'topic="ping_metrics",handler="{name}"'
+        assert f'eventbus_handler_latency_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+        assert f"eventbus_handler_latency_seconds_count{{{labels}}} 2" in text
+
+        # removed handlers are no longer reported
+        eventbus.off(ping)
+        assert f"calls_{attr}" not in metrics.values()
+    finally:
+        eventbus.instrument(False)
+        eventbus.off(ping)
+
+
+def test_name():
+    class A:
+        def state(self):
+            pass
+
+    class B:
+        def state(self):
+            pass
+
+    # handlers of different components with the same function name are distinct
+    assert _name(A.state) == f"{__name__}.test_name.A.state"
+    assert _name(A.state) != _name(B.state)
@@ -24,3 +24,19 @@ async def test_off():
         {"type": "test", "item": "two"},
         {"type": "test", "item": "three"},
     ]
+
+
+async def test_off_discarded():
+    # handlers registered without keeping the wrapper are not removed by off of others
+    seq = []
+
+    def register():
+        @eventbus.on("test_discarded")
+        def kept(**event):
+            seq.append(1)
+
+    register()
+    for _ in range(100):
+        eventbus.off(eventbus.on("test_discarded")(lambda **event: None))
+    await eventbus.emit({"type": "test_discarded"})
+    assert seq == [1]
@@ -0,0 +1,121 @@
+import asyncio
+
+from eventbus import event_type
+from eventbus.outbox import BATCH_SIZE, CONFLATE, DISCONNECT, DROP_OLDEST, Outbox, batch_param
+
+
+class Link:
+    """Transport that stalls until opened."""
+
+    def __init__(self):
+        self.frames = []
+        self.open = asyncio.Event()
+
+    async def send(self, frame):
+        await self.open.wait()
+        self.frames.append(frame)
+
+
+def state(eid, value):
+    return {"type": event_type.STATE, "src": "#earth", "dst": "#clients", "eid": eid, "value": value}
+
+
+async def test_drop_oldest():
+    link = Link()
+    outbox = Outbox(link.send, maxsize=3, policy=DROP_OLDEST)
+    outbox.put({"type": "test", "i": 0})
+    await asyncio.sleep(0)
+    for i in range(1, 6):
+        outbox.put({"type": "test", "i": i})
+    # event 0 is held by the writer, 1 and 2 were dropped
+    assert outbox.stats == {"depth": 3, "max_depth": 3, "dropped": 2, "conflated": 0}
+    link.open.set()
+    await asyncio.sleep(0.01)
+    assert [e["i"] for e in link.frames] == [0, 3, 4, 5]
+    assert outbox.stats["depth"] == 0
+    outbox.close()
+
+
+async def test_conflate():
+    link = Link()
+    outbox = Outbox(link.send, maxsize=3, policy=CONFLATE)
+    outbox.put({"type": "test"})
+    await asyncio.sleep(0)
+    outbox.put(state("a", 1))
+    outbox.put(state("b", 1))
+    outbox.put({"type": "log"})
+    outbox.put(state("a", 2))
+    outbox.put(state("c", 1))
+    assert outbox.stats["conflated"] == 1
+    assert outbox.stats["dropped"] == 1
+    link.open.set()
+    await asyncio.sleep(0.01)
+    assert [(e.get("eid"), e.get("value")) for e in link.frames[1:]] == [("b", 1), (None, None), ("c", 1)]
+    outbox.close()
+
+
+async def test_reused_event():
+    # emitters such as State.update change the same dict for every update
+    link = Link()
+    outbox = Outbox(link.send, conflate=False)
+    event = state("a", 0)
+    for i in range(3):
+        event["value"] = i
+        outbox.put(event)
+    event["dst"] = "#branches"
+    link.open.set()
+    await asyncio.sleep(0.01)
+    assert [(e["dst"], e["value"]) for e in link.frames] == [("#clients", 0), ("#clients", 1), ("#clients", 2)]
+    outbox.close()
+
+
+async def test_disconnect():
+    link = Link()
+    disconnected = []
+    outbox = Outbox(link.send, maxsize=2, policy=DISCONNECT, deadline=0.01, disconnect=lambda: disconnected.append(1))
+    outbox.put({"type": "test"})
+    await asyncio.sleep(0)
+    for i in range(5):
+        outbox.put({"type": "test", "i": i})
+    await asyncio.sleep(0.02)
+    assert not disconnected
+    outbox.put({"type": "test"})
+    assert disconnected == [1]
+    outbox.close()
+
+
+async def test_conflate_latest():
+    link = Link()
+    outbox = Outbox(link.send, conflate=True)
+    outbox.put({"type": "test", "i": 0})
+    await asyncio.sleep(0)
+    for value in range(100):
+        outbox.put(state("a", value))
+        outbox.put(state("b", -value))
+        if value == 50:
+            outbox.put({"type": "test", "i": 1})
+    # only the latest values remain, in the position of the first pending update
+    assert len(outbox) == 3
+    assert outbox.stats["conflated"] == 198
+    link.open.set()
+    await asyncio.sleep(0.01)
+    assert [(e.get("eid"), e.get("value"), e.get("i")) for e in link.frames] == [
+        (None, None, 0),
+        ("a", 99, None),
+        ("b", -99, None),
+        (None, None, 1),
+    ]
+
+    # sent events are not replaced
+    outbox.put(state("a", 100))
+    await asyncio.sleep(0.01)
+    assert link.frames[-1]["value"] == 100
+    outbox.close()
+
+
+def test_batch_param():
+    assert batch_param(None) is None
+    assert batch_param({"size": 1000, "window": -1}) == {"size": BATCH_SIZE, "window": 0}
+    # invalid values from the client are ignored
+    for requested in ({"size": "x"}, {"window": None}, {"size": [1]}, {"size": float("inf")}, {"window": "nan"}):
+        assert batch_param(requested) is None
@@ -0,0 +1,57 @@
+import time
+
+from eventbus import event_type, eventbus
+from eventbus.bus import Reflect
+from eventbus.bus.reflect import Path, percentile
+from eventbus.event import get_src_addr
+
+
+def test_path():
+    p = Path("tree.branch", window=4)
+    for seq, rtt in enumerate((5, 1, 3, 2, 4), start=1):
+        p.reply(seq, rtt)
+        assert p.outcome(seq)
+    p.reply(3, 100)  # late, ignored
+    assert not p.outcome(6)
+    assert p.misses == 1
+    assert p.stats() == {"p50": 3, "p90": 4, "p99": 4, "max": 4, "loss": 0.25, "up": True}
+    assert percentile([1], 0.99) == 1
+
+
+async def test_reflect():
+    probes, states = [], {}
+
+    @eventbus.on("reflect?")
+    def probe(dst, id, timestamp, **event):
+        probes.append((dst, id, timestamp))
+
+    @eventbus.on(event_type.STATE)
+    def state(eid, value, **event):
+        states[eid.split(":")[1]] = value
+
+    async def reply(src, id, timestamp):
+        await eventbus.emit({"type": "reflect!", "src": src, "dst": get_src_addr(), "id": id, "timestamp": timestamp})
+
+    r = Reflect()
+    r.publish, r.alert_after, r.forget = 1, 2, 4
+    await r.probe()
+    assert [p[0] for p in probes] == ["#clients", "#branches"]
+    _, id, timestamp = probes[-1]
+    await reply("t.b", id, timestamp - 2_000_000)
+    await reply("@c", id, timestamp)
+    await r.probe()
+    assert states["reflect.t_b_up"] is True and states["reflect.t_b_max"] >= 2
+    assert states["reflect._c_loss"] == 0
+
+    # t.b stops replying
+    for _ in range(3):
+        _, id, timestamp = probes[-1]
+        await reply("@c", id, time.time_ns())
+        await r.probe()
+    assert r.paths["t.b"].misses == 3 and not r.paths["t.b"].up
+    assert states["reflect.t_b_up"] is False
+    assert states["reflect.t_b_loss"] == 0.75
+    await r.probe()
+    assert "t.b" not in r.paths and "@c" in r.paths
+    eventbus.off(probe)
+    eventbus.off(state)
@@ -0,0 +1,195 @@
+import asyncio
+
+from eventbus import event_type, eventbus
+from eventbus.bus.server import Routes, Server, Transport
+from eventbus.codec import CBOR, dumps, loads
+from eventbus.event import bye, ping, pong, subscribe, unsubscribe
+
+
+class FakeTransport(Transport):
+    def __init__(self, token, **auth):
+        self.token = token
+        self.auth = auth
+        self.sent = []
+        self.incoming = asyncio.Queue()
+
+    async def send_json(self, data):
+        self.sent.append(data)
+        if isinstance(data, dict) and data.get("type") == event_type.GET_AUTH:
+            await self.incoming.put({"type": event_type.PUT_AUTH, "token": self.token, **self.auth})
+
+    async def receive_json(self):
+        return await self.incoming.get()
+
+    def received(self, type="test"):
+        events = []
+        for frame in self.sent:
+            events.extend(frame if isinstance(frame, list) else [frame])
+        return [e for e in events if e.get("type") == type]
+
+
+async def authenticate(token):
+    return token
+
+
+async def connect(*addrs, **auth):
+    transports = [FakeTransport(addr, **auth) for addr in addrs]
+    tasks = [
+        asyncio.create_task(Server(transport=t, authenticate=authenticate, param={}, timeout=5).run())
+        for t in transports
+    ]
+    await asyncio.sleep(0.01)
+    return transports, tasks
+
+
+async def disconnect(transports, tasks):
+    for t in transports:
+        await t.incoming.put(bye())
+    await asyncio.gather(*tasks)
+
+
+def test_routes():
+    routes = Routes()
+    routes.add("dev", True, "dev")
+    routes.add("dev2", True, "dev2")
+    routes.add("tree.b1", True, "tree.b1")
+    routes.add("@1", False, "@1")
+    assert routes.lookup("dev") == ("dev",)
+    assert routes.lookup("dev.b1") == ("dev",)
+    assert routes.lookup("dev2.b1") == ("dev2",)
+    # branch gateways do not receive events addressed to the whole tree
+    assert routes.lookup("tree") == ()
+    assert routes.lookup("tree.b1") == ("tree.b1",)
+    assert routes.lookup("tree.b2") == ()
+    assert routes.lookup("#branches") == ("dev", "dev2", "tree.b1")
+    assert routes.lookup("#clients") == ("@1",)
+    assert routes.lookup("@1") == ("@1",)
+    assert routes.lookup("@2") == ()
+    assert len(routes) == 4
+    routes.remove("dev", True, "dev")
+    assert routes.lookup("dev.b1") == ()
+    assert routes.lookup("#branches") == ("dev2", "tree.b1")
+    assert len(routes) == 3
+
+
+async def test_fan_out():
+    Server.CONNECTIONS.clear()
+    transports, tasks = await connect("dev", "dev2", "@1", "@2")
+    dev, dev2, c1, c2 = transports
+
+    for dst in ("#clients", "#branches", "dev", "dev.b1", "dev2", "@2"):
+        await eventbus.emit({"type": "test", "src": "#earth", "dst": dst})
+    await asyncio.sleep(0.01)
+
+    assert [e["dst"] for e in dev.received()] == ["#branches", "dev", "dev.b1"]
+    assert [e["dst"] for e in dev2.received()] == ["#branches", "dev2"]
+    assert [e["dst"] for e in c1.received()] == ["#clients"]
+    assert [e["dst"] for e in c2.received()] == ["#clients", "@2"]
+
+    await disconnect(transports, tasks)
+    assert not Server.ROUTES
+    await eventbus.emit({"type": "test", "src": "#earth", "dst": "#clients"})
+    assert len(c1.received()) == 1
+
+
+async def test_batch():
+    Server.CONNECTIONS.clear()
+    transports, tasks = await connect("@1", batch={"size": 4, "window": 1000})
+    c1 = transports[0]
+    hello = c1.sent[1]
+    assert hello["type"] == event_type.HELLO_CONNECTED
+    assert hello["param"]["batch"] == {"size": 4, "window": 0.1}
+
+    # partial frame: sent when the window expires
+    for i in range(2):
+        await eventbus.emit({"type": "test", "src": "#earth", "dst": "#clients", "i": i})
+    await asyncio.sleep(0.01)
+    assert len(c1.sent) == 2
+    await asyncio.sleep(0.15)
+    assert [len(f) for f in c1.sent[2:]] == [2]
+
+    # full frame: sent right away
+    for i in range(2, 12):
+        await eventbus.emit({"type": "test", "src": "#earth", "dst": "#clients", "i": i})
+    await asyncio.sleep(0.01)
+    assert [len(f) for f in c1.sent[2:]] == [2, 4, 4, 2]
+    assert [e["i"] for e in c1.received()] == list(range(12))
+
+    await disconnect(transports, tasks)
+
+
+class BinaryTransport(FakeTransport):
+    async def send_bytes(self, data):
+        self.sent.append(loads(data, CBOR))
+
+    async def receive_bytes(self):
+        return dumps(await self.incoming.get(), CBOR)
+
+
+async def test_cbor():
+    Server.CONNECTIONS.clear()
+    t = BinaryTransport("@1", encoding=CBOR)
+    task = asyncio.create_task(Server(transport=t, authenticate=authenticate, param={}, timeout=5).run())
+    await asyncio.sleep(0.01)
+    assert CBOR in t.sent[0]["encodings"]
+    assert t.sent[1]["param"]["encoding"] == CBOR
+
+    event = {"type": "test", "src": "#earth", "dst": "#clients", "value": 1.5, "data": [None, True, -3, "x"]}
+    await eventbus.emit(event)
+    await t.incoming.put(ping)
+    await asyncio.sleep(0.01)
+    assert t.received() == [event]
+    assert t.received(event_type.PONG) == [pong]
+
+    await t.incoming.put(bye())
+    await task
+
+
+async def test_intern():
+    Server.CONNECTIONS.clear()
+    transports, tasks = await connect("dev", intern=True)
+    dev = transports[0]
+    assert dev.sent[1]["param"]["intern"] is True
+
+    received = []
+    handler = eventbus.on(event_type.STATE)(lambda **event: received.append(event))
+    # from the gateway: interned on first use, then compact
+    await dev.incoming.put({**state("dev.b1:x.temp", 1), "iid": 0})
+    await dev.incoming.put([[0, 2, 1.5]])
+    # to the gateway
+    await eventbus.emit(state("dev.b1:x.temp", 3, src="#earth", dst="dev"))
+    await asyncio.sleep(0.01)
+    await eventbus.emit(state("dev.b1:x.temp", 4, src="#earth", dst="dev"))
+    await asyncio.sleep(0.01)
+    eventbus.off(handler)
+
+    assert [e for e in received if e["src"] == "dev.b1"] == [state("dev.b1:x.temp", 1), state("dev.b1:x.temp", 2)]
+    frames = [f for f in dev.sent if isinstance(f, list) or f.get("type") == event_type.STATE]
+    assert frames == [{**state("dev.b1:x.temp", 3, src="#earth", dst="dev"), "iid": 0}, [[0, 4, 1.5]]]
+
+    await disconnect(transports, tasks)
+
+
+def state(eid, value, src="dev.b1", dst="#clients"):
+    return {"type": "state", "src": src, "dst": dst, "eid": eid, "value": value, "timestamp": 1.5}
+
+
+async def test_subscribe():
+    Server.CONNECTIONS.clear()
+    transports, tasks = await connect("@1")
+    c1 = transports[0]
+    await c1.incoming.put(subscribe(eids=["temperature"]))
+    await asyncio.sleep(0.01)
+
+    await eventbus.emit(state("dev.b1:x.temperature", 1))
+    await eventbus.emit(state("dev.b1:x.humidity", 2))
+    await asyncio.sleep(0.01)
+    assert [e["eid"] for e in c1.received(event_type.STATE)] == ["dev.b1:x.temperature"]
+
+    await c1.incoming.put(unsubscribe())
+    await asyncio.sleep(0.01)
+    await eventbus.emit(state("dev.b1:x.humidity", 3))
+    await asyncio.sleep(0.01)
+    assert [e["value"] for e in c1.received(event_type.STATE)] == [1, 3]
+
+    await disconnect(transports, tasks)
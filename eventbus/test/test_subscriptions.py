@@ -0,0 +1,61 @@
+import asyncio
+
+from eventbus.bus.subscriptions import Subscriptions, view_eids
+
+
+def state(eid, value=1):
+    return {"type": "state", "src": "dev.b", "dst": "#clients", "eid": eid, "value": value, "timestamp": 1}
+
+
+def test_match():
+    sent = []
+    s = Subscriptions(sent.append)
+    s.put(state("dev.b:x.humidity"))
+    assert len(sent) == 1  # no subscriptions: everything
+
+    s.subscribe(["temperature", "dev.b:ram.*", "dev.b:x.rssi"])
+    assert s.match("dev.b:x.temperature") == 0
+    assert s.match("dev.b:ram.free") == 0
+    assert s.match("dev.b:x.rssi") == 0
+    assert s.match("dev.c:x.rssi") is None
+    assert s.match("dev.b:x.humidity") is None
+
+    sent.clear()
+    for eid in ("dev.b:x.temperature", "dev.b:x.humidity", "dev.b:ram.free"):
+        s.put(state(eid))
+    s.put({"type": "log", "dst": "#clients"})
+    s.put({"type": "state_snapshot", "states": [["dev.b:x.temperature", 1, 1], ["dev.b:x.humidity", 1, 1]]})
+    assert [e.get("eid") for e in sent] == ["dev.b:x.temperature", "dev.b:ram.free", None, None]
+    assert sent[-1]["states"] == [["dev.b:x.temperature", 1, 1]]
+
+    s.unsubscribe(["temperature"])
+    assert s.match("dev.b:x.temperature") is None
+    s.unsubscribe()
+    assert not s
+
+
+async def test_rate():
+    sent = []
+    s = Subscriptions(sent.append)
+    s.subscribe(["temperature"], rate=20)
+    for i in range(5):
+        s.put(state("dev.b:x.temperature", i))
+    assert [e["value"] for e in sent] == [0]
+    await asyncio.sleep(0.07)
+    # latest value sent after the interval
+    assert [e["value"] for e in sent] == [0, 4]
+    s.close()
+
+
+def test_views():
+    config = {
+        "views": [
+            {
+                "title": "Climate",
+                "cards": [{"entities": [{"entity_id": "*.temperature"}, {"entity_id": "*.humidity"}]}],
+            },
+            {"title": "All", "cards": [{"entities": [{"entity_id": "*"}]}]},
+        ]
+    }
+    assert view_eids(config, ["Climate"]) == ["*.temperature", "*.humidity"]
+    assert view_eids(config, ["nope"]) == []
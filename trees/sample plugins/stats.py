@@ -2,8 +2,15 @@ import asyncio
 import logging
 from time import ticks_ms, ticks_add, ticks_diff   # type: ignore
 
-from app import event_bus
-update = event_bus.post_state_update
+from eventbus import eventbus
+from eventbus.event import State
+
+# count emitted events (see eventbus.bus.metrics for per topic and handler metrics)
+eventbus.instrument()
+
+
+async def update(leaf, attribute, value):
+    await State(f"{leaf}.{attribute}").update(value)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -35,7 +42,7 @@ async def send_stats(period):
         t = ticks_ms()
         dt = 0.001 * ticks_diff(t, last_call_ms)
         last_call_ms = t
-        events = event_bus.total_events
+        events = sum(eventbus.stats.emitted.values())
         await update('stats', 'events', (events-last_event_total)/dt)
         last_event_total = events
 
@@ -0,0 +1,92 @@
+"""Appends per second and range query latency of the flash TSDB (plugins.history.tsdb).
+
+Runs against a file backed block device on CPython, or on the flash partition
+`data_1` on the ESP32 (erases it!):
+
+    PYTHONPATH=src/freeze:../../eventbus python bench/bench_tsdb.py
+"""
+
+import os
+import time
+
+from plugins.history.tsdb import TSDB, FileBlockDevice
+
+try:
+    ticks_us = time.ticks_us  # type: ignore
+    ticks_diff = time.ticks_diff  # type: ignore
+except AttributeError:
+
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_diff(a, b):
+        return a - b
+
+
+PATH = "/tmp/bench_tsdb.bin"
+NBLOCKS = 1024
+BLOCK_SIZE = 4096
+RECORDS = 8
+CAPACITY = 20_000  # items per record
+N = 50_000  # appends per record
+QUERIES = 100
+
+
+def block_device():
+    try:
+        from esp32 import Partition  # type: ignore
+
+        return Partition.find(type=Partition.TYPE_DATA, label="data_1")[0]
+    except ImportError:
+        try:
+            os.remove(PATH)
+        except OSError:
+            pass
+        return FileBlockDevice(PATH, NBLOCKS, BLOCK_SIZE)
+
+
+def bench(bdev, buffer_size):
+    TSDB.make_db(bdev, 64)
+    db = TSDB(bdev, buffer_size=buffer_size)
+    keys = [f"dev.leaf.sensor_{i}" for i in range(RECORDS)]
+    for key in keys:
+        db.create_record(key, CAPACITY)
+    erases = db.erases
+
+    t0 = ticks_us()
+    for k in range(N):
+        for key in keys:
+            db.append(key, 1_000_000 + k, k / 8)
+    db.flush()
+    append_us = ticks_diff(ticks_us(), t0)
+    erases = db.erases - erases
+
+    # reopen: directory and circular buffer positions from flash
+    t0 = ticks_us()
+    db = TSDB(bdev, buffer_size=buffer_size)
+    open_us = ticks_diff(ticks_us(), t0)
+
+    ranges = ((60, "1 min"), (3600, "1 hour"), (CAPACITY, "all"))
+    latency = {}
+    for span, name in ranges:
+        t0 = ticks_us()
+        n = 0
+        for q in range(QUERIES):
+            key = keys[q % RECORDS]
+            since = 1_000_000 + N - span - (q * 37) % (CAPACITY - span + 1)
+            n += len(db.values(key, since, since + span - 1)["timestamps"])
+        latency[name] = (ticks_diff(ticks_us(), t0) / QUERIES, n // QUERIES)
+
+    print(
+        f"buffer {buffer_size:6} bytes: {RECORDS * N * 1e6 / append_us:9.0f} appends/s, "
+        f"{erases} erases, open {open_us / 1000:.1f} ms"
+    )
+    for name, (us, n) in latency.items():
+        print(f"    query {name:7} {us / 1000:8.2f} ms ({n} items)")
+
+
+if __name__ == "__main__":
+    bdev = block_device()
+    print(f"{RECORDS} records x {N} appends, {QUERIES} range queries each")
+    for buffer_size in (0, 16384):
+        bench(bdev, buffer_size)
@@ -7,6 +7,7 @@ from os.path import isfile
 import machine  # type: ignore
 
 from eventbus.bus import Config, CurrentState, Log
+from eventbus.bus.log import RateLimit
 from eventbus.event import set_src_addr
 
 from .led import led, set_color  # noqa: F401
@@ -27,6 +28,9 @@ if not isfile("/secrets.json") or not isfile("/config.json"):
 # logging must be configured before any actual logging
 def configure_logging():
     class LogHandler(logging.Handler):
+        # drop repeats before they are sent to earth
+        limit = RateLimit()
+
         def emit(self, record):
             from eventbus import eventbus
             from eventbus.event import log_event
@@ -38,7 +42,12 @@ def configure_logging():
                 name=record.name,
                 message=record.message,
             )
-            eventbus.emit_sync(event)
+            n = self.limit(event)
+            if n:
+                if n > 1:
+                    # repeats dropped since the last one sent
+                    event["count"] = n
+                eventbus.emit_sync(event)
             # print("app.__init__ LOG", event)
 
     root_logger = logging.getLogger()
@@ -1,12 +1,14 @@
 import asyncio
-import json
 import logging
 import os
 
 import aiohttp
 
 from eventbus import Event, event_type, eventbus
+from eventbus.codec import CBOR, JSON, dumps, loads
 from eventbus.event import get_cert, get_config, get_secrets, ping
+from eventbus.intern import Interner
+from eventbus.outbox import Outbox
 
 from . import CERT_DIR, config, led, secrets
 from .wifi import wifi
@@ -16,10 +18,25 @@ logger.setLevel(logging.DEBUG)
 
 DEBUG = False
 
+# coalesce events into list frames (earth may grant smaller values)
+BATCH = {"size": 20, "window": 0.05}
+
+# wire encoding requested from earth (JSON or CBOR, see eventbus.codec and bench/bench_codec.py)
+ENCODING = JSON
+
+# send STATE events as [iid, value, timestamp] after first use (see eventbus.intern)
+INTERN = True
+
+# events waiting to be sent to earth (pending STATE events are replaced by newer values)
+QUEUE_SIZE = 100
+
 
 class Gateway:
     def __init__(self):
         self.connected = False
+        self._outbox = None
+        self._encoding = JSON
+        self._interner = None
 
     async def connnect(self, ws_url) -> str:
         """Connect to earth. Returns when the connection is closed.
@@ -51,13 +68,21 @@ class Gateway:
         auth_msg = await ws.receive_json()
         logger.debug(f"Received auth request - {auth_msg}")
         if auth_msg["type"] == event_type.GET_AUTH:
-            await ws.send_json({"type": event_type.PUT_AUTH, "token": gateway_token})
+            put_auth = {"type": event_type.PUT_AUTH, "token": gateway_token, "batch": BATCH, "intern": INTERN}
+            if ENCODING in auth_msg.get("encodings", ()):
+                put_auth["encoding"] = ENCODING
+            await ws.send_json(put_auth)
         hello_msg = await ws.receive_json()
         if hello_msg["type"] == event_type.HELLO_CONNECTED:
             # send pings and receive messages
             self._ws = ws
             logger.info(f"Connected - {hello_msg}")
             led.pattern = led.GREEN
+            self._encoding = hello_msg["param"].get("encoding", JSON)
+            # new table for each connection
+            self._interner = Interner() if hello_msg["param"].get("intern") else None
+            batch = hello_msg["param"].get("batch") or {}
+            self._outbox = Outbox(self._send_frame, **batch, maxsize=QUEUE_SIZE, conflate=True)
 
             @eventbus.on("*")
             async def emitter(**event):
@@ -71,26 +96,36 @@ class Gateway:
                 self._receiver_task(),
                 self._update_task(hello_msg["param"]["versions"]),
             ]
-            await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                if self._outbox is not None:
+                    self._outbox.close()
+                    self._outbox = None
             return "connection closed"
         else:
             return f"connection failed: {hello_msg}"
 
     async def _ping_task(self, interval):
-        ws = self._ws
         while self.connected:
-            # errors handled in connect_task by gather
-            await ws.send_json(ping)
+            await self._send_frame(ping)
             await asyncio.sleep(interval)
 
     async def _receiver_task(self):
         async for msg in self._ws:
             if not self.connected:
                 return
-            if msg.type == aiohttp.WSMsgType.TEXT:
+            if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
                 if DEBUG:
                     print(f"received msg-type={msg.type}: {str(msg.data)}")
-                await eventbus.emit(json.loads(msg.data))
+                event = loads(msg.data, CBOR if msg.type == aiohttp.WSMsgType.BINARY else JSON)
+                if self._interner is not None:
+                    event = self._interner.unpack(event)
+                if isinstance(event, list):
+                    for e in event:
+                        await eventbus.emit(e)
+                else:
+                    await eventbus.emit(event)
             elif msg.type == aiohttp.WSMsgType.ERROR:
                 print(f"receiver_task: ws returned error {msg}")
                 self.connected = False
@@ -116,17 +151,25 @@ class Gateway:
             await self.emit_to_ws(get_cert())
 
     async def emit_to_ws(self, event: Event) -> None:
-        if not self.connected:
+        if not self.connected or self._outbox is None:
             return
         dst = event.get("dst", "")
         if dst in ("#clients", "#earth") or dst.startswith("@"):
             if DEBUG:
                 print(f"sending {event}")
-            try:
-                await self._ws.send_json(event)
-            except OSError as e:
-                self.connected = False
-                print(f"failed send_json: {e}")
+            self._outbox.put(event)
         else:
             if DEBUG and event.get("type", "") not in (event_type.PING, event_type.PONG):
                 (f"skipping {event}")
+
+    async def _send_frame(self, frame) -> None:
+        try:
+            if self._interner is not None:
+                frame = self._interner.pack(frame)
+            if self._encoding == CBOR:
+                await self._ws.send_bytes(dumps(frame, CBOR))
+            else:
+                await self._ws.send_json(frame)
+        except OSError as e:
+            self.connected = False
+            print(f"failed send_json: {e}")
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+
+from eventbus import event_type, eventbus
+from eventbus.eid import eid_match
+from eventbus.event import addressed_to_me, history
+
+from .tsdb import DIR_RECORD_SIZE, TSDB, TSDBException
+
+"""
+History of selected eids in flash, e.g. in config.json:
+
+    "plugins": {
+        "plugins.history": { "eids": ["*.temperature", "*.battery_level"] }
+    }
+
+Numeric STATE values of eids matching one of the patterns (see eid_match) are
+stored in a TSDB record per eid on partition `partition` (created if needed).
+Samples are buffered in RAM by the TSDB and written a flash block at a time
+(or every `interval` seconds) to limit flash wear and write latency.
+Timestamps are stored with 1 s resolution.
+
+Answers GET_HISTORY for recorded eids with a single HISTORY event, i.e. a
+branch keeps data through disconnects and serves backfill in bulk.
+"""
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+KEY_SIZE = DIR_RECORD_SIZE - 12  # max bytes of a record key
+
+db = None
+
+
+class Recorder:
+    def __init__(self, db: TSDB, eids: list, capacity: int):
+        self.db = db
+        self.eids = eids
+        self.capacity = capacity
+        self._last = {}  # eid -> timestamp of latest sample, None if not recorded
+
+    def record(self, eid: str, value, timestamp) -> None:
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or not isinstance(timestamp, (int, float)):
+            return
+        try:
+            last = self._last[eid]
+        except KeyError:
+            last = self._last[eid] = self._create(eid)
+        if last is None:
+            return
+        timestamp = int(timestamp)
+        if timestamp <= last:
+            # keep the first sample of each second
+            return
+        self._last[eid] = timestamp
+        try:
+            self.db.append(eid, timestamp, value)
+        except Exception as e:
+            logger.error(f"write {eid}: {e}")
+
+    def flush(self) -> None:
+        """Write buffered samples to flash."""
+        try:
+            self.db.flush()
+        except Exception as e:
+            logger.error(f"flush: {e}")
+
+    def query(self, eid: str, since=None, until=None, limit=None, points=None) -> list | None:
+        """[[timestamp, value], ...] of eid, None if eid is not recorded."""
+        if eid not in self.db:
+            return None
+        d = self.db.values(eid, since, until)
+        ts, vs = d["timestamps"], d["values"]
+        lo, hi = 0, len(ts)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        step = max(1, -(-(hi - lo) // points)) if points else 1
+        return [[ts[k], vs[k]] for k in range(lo, hi, step)]
+
+    def _create(self, eid: str):
+        if not any(eid_match(eid, p) for p in self.eids):
+            return None
+        if len(eid.encode()) > KEY_SIZE:
+            logger.error(f"not recording {eid}: longer than {KEY_SIZE} bytes")
+            return None
+        try:
+            self.db.create_record(eid, self.capacity)
+        except TSDBException as e:
+            logger.error(f"not recording {eid}: {e}")
+            return None
+        logger.info(f"recording {eid}, capacity {self.db.record_capacity(eid)}")
+        return -1
+
+
+async def init(
+    eids: list | None = None, partition: str = "data_1", records: int = 256, capacity: int = 4095, interval: float = 600
+):
+    """Record eids matching patterns in eids, `capacity` samples per eid (rounded up to whole blocks)."""
+    global db
+    from esp32 import Partition  # type: ignore
+
+    bdev = Partition.find(type=Partition.TYPE_DATA, label=partition)[0]
+    try:
+        db = TSDB(bdev)
+    except Exception as e:
+        logger.error(f"no tsdb on {partition} ({e}), creating new one")
+        TSDB.make_db(bdev, records)
+        db = TSDB(bdev)
+    recorder = Recorder(db, eids or [], capacity)
+
+    @eventbus.on(event_type.STATE)
+    def state(eid, value, timestamp, **event):
+        recorder.record(eid, value, timestamp)
+
+    @eventbus.on(event_type.GET_HISTORY)
+    async def get(src, dst, eid, since=None, until=None, limit=None, points=None, **event):
+        if not addressed_to_me(dst):
+            return
+        data = recorder.query(eid, since, until, limit, points)
+        if data is not None:
+            await eventbus.emit(history(eid, data, dst=src))
+
+    while True:
+        await asyncio.sleep(interval)
+        recorder.flush()
@@ -0,0 +1,467 @@
+import json
+import io
+import logging
+import math
+import os
+import struct
+from array import array
+
+try:
+    from micropython import const  # type: ignore
+except ImportError:
+    def const(x):
+        return x
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+VERSION = "1.0"
+MAGIC   = const(0x07fdabbc)
+
+# type, block_addr, nblocks, key
+DIR_RECORD_SIZE = const(64)           # size of directory records in bytes
+DIR_RECORD_FMT  = f"3I{DIR_RECORD_SIZE-12}s"    # 12 accounts for 3I header
+DIR_TYPE_BLANK  = const(0xffffffff)   # available
+DIR_TYPE_CBUF   = const(0x01a2b3c4)   # allocated (for circular buffer)
+DIR_TYPE_DEL    = const(0x00000000)   # deleted
+
+ITEM_FMT        = "If"                # timestamp (uint), value (float)
+ITEM_SIZE       = const(8)            # bytes
+BLANK_ITEM      = b'\xff' * ITEM_SIZE
+
+BUFFER_SIZE     = const(16384)        # default RAM for write-behind buffers (bytes, all records)
+
+
+class TSDBException(Exception):
+    pass
+
+
+class FileBlockDevice:
+    """Block device stored in a file, e.g. to run the TSDB on CPython.
+    Implements the subset of the extended block device protocol used by TSDB."""
+
+    def __init__(self, path: str, nblocks: int, block_size: int = 4096):
+        self.nblocks = nblocks
+        self.block_size = block_size
+        try:
+            os.stat(path)
+        except OSError:
+            with open(path, 'wb') as f:
+                blank = b'\xff' * block_size
+                for _ in range(nblocks):
+                    f.write(blank)
+        self._f = open(path, 'r+b')
+
+    def readblocks(self, block_num, buf, offset=0):
+        self._f.seek(block_num*self.block_size + offset)
+        self._f.readinto(buf)
+
+    def writeblocks(self, block_num, buf, offset=0):
+        self._f.seek(block_num*self.block_size + offset)
+        self._f.write(buf)
+
+    def ioctl(self, op, arg):
+        if op == 3:     # sync
+            self._f.flush()
+        elif op == 4:   # number of blocks
+            return self.nblocks
+        elif op == 5:   # block size
+            return self.block_size
+        elif op == 6:   # erase
+            self.writeblocks(arg, b'\xff' * self.block_size)
+        return 0
+
+    def close(self):
+        self._f.close()
+
+
+class TSDB:
+
+    @classmethod
+    def make_db(cls, block_dev, capacity: int, config: dict | None = None):
+        """Erase create empty db (erases existing data)
+        @param capacity: Maximum number of records the db can hold
+        @param config: optional configuration data"""
+        BLOCK_SIZE = block_dev.ioctl(5, None)
+        assert is_power_of_2(ITEM_SIZE), f"ITEM_SIZE ({ITEM_SIZE}) must be a power of two"
+        assert is_power_of_2(BLOCK_SIZE), f"block size ({BLOCK_SIZE}) must be a power of two"
+        assert BLOCK_SIZE >= DIR_RECORD_SIZE, f"block size must be equal or greater than {DIR_RECORD_SIZE}"
+
+        # write configuration to block[0]
+        _erase_block(block_dev, 0)
+        config = dict(config or {})
+        config['description'] = "Time Series DataBase"
+        config['version'] = VERSION
+        config['magic'] = MAGIC
+        config['block_size'] = BLOCK_SIZE
+        config['num_dir_blocks'] = int(math.ceil(capacity*DIR_RECORD_SIZE/BLOCK_SIZE))
+        j = json.dumps(config).encode()
+        assert len(j) <= BLOCK_SIZE, f"configuration data ({len(j)}) exceeds BLOCK_SIZE ({BLOCK_SIZE})"
+        block_dev.writeblocks(0, j, 0)
+        # erase directory blocks
+        buf = bytearray(BLOCK_SIZE)
+        for i in range(1, config['num_dir_blocks']+1):
+            _erase_block(block_dev, i, buf)
+
+    def __init__(self, block_dev, buffer_size: int = BUFFER_SIZE):
+        """Open a database previously created with TSDB.make_db.
+        @param buffer_size: RAM (bytes) for items not yet written to block_dev, 0 to write through
+        @exception TSDBException for corrupted database
+
+        Example:
+            bdev = Partition.find(type=Partition.TYPE_DATA, label='data_1')[0]
+            TSDB.make_db(bdev, 256)
+            db = TSDB(bdev)
+            db.create_record('temperature_data', 1023)
+            db.append('temperature_data', timestamp, 22.5)
+            db.values('temperature_data') -> { 'timestamp': Array('I', [...]), 'value': ... }
+            print(db)
+
+        Writes are buffered in RAM per record and written when they reach the end of
+        a block (i.e. whole blocks when buffers are large enough), when all buffers
+        together exceed buffer_size, or on flush(). values() includes buffered items.
+        """
+        self.NBLOCKS = block_dev.ioctl(4, None)      # number of blocks in block_dev
+        self.BLOCK_SIZE = block_dev.ioctl(5, None)   # block size in bytes
+        self._bdev = block_dev
+        self.buffer_size = buffer_size
+        self._buffered = 0                           # bytes in write-behind buffers
+        self._index = {}                             # key -> record (not deleted)
+        self.erases = 0                              # block erase count (wear)
+        self._read_header()
+        self._read_records()
+
+    @property
+    def config(self):
+        return self._config
+
+    @property
+    def capacity(self):
+        """Number of records the database can hold."""
+        return self._config['num_dir_blocks'] * self.BLOCK_SIZE // DIR_RECORD_SIZE
+
+    def record_capacity(self, key: str):
+        """Minimum number of items record can hold.
+        The actual size may be greater depending on the state of the circular buffer."""
+        rec = self._find_record(key)
+        return (rec['nblocks']-1)*self.BLOCK_SIZE // ITEM_SIZE - 1
+
+    @property
+    def free_blocks(self):
+        """Number of free blocks to hold records.
+        The smallest record has two blocks and holds BLOCK_SIZE/ITEM_SIZE-1 items.
+        Each additional block adds BLOCK_SIZE/ITEM_SIZE items.
+        A record with N blocks holds (N-1)*BLOCK_SIZE/ITEM_SIZE-1 items."""
+        if len(self._records) < 1:
+            return self.NBLOCKS - self._config['num_dir_blocks'] - 1
+        else:
+            r = self._records[-1]
+            return self.NBLOCKS - r['block_addr'] - r['nblocks']
+
+    @property
+    def keys(self) -> list:
+        """Keys to all records stored in the database."""
+        return [ r['key'] for r in self._records if r['type'] == DIR_TYPE_CBUF ]
+
+    def __contains__(self, key: str):
+        return key in self._index
+
+    def values(self, key: str, since=None, until=None, ignore_deleted=True) -> dict:
+        """Dict with timestamps and values as arrays, since <= timestamp <= until if specified.
+        Timestamps must be increasing (within a record) for since and until to work.
+        @param ignore_deleted: set to False to return values records marked "deleted"
+        """
+        rec = self._find_record(key, ignore_deleted)
+        BLOCK_SIZE = self.BLOCK_SIZE
+        nblocks = rec['nblocks']
+        buf = bytearray(BLOCK_SIZE)
+        bdev = self._bdev
+        val = array('f')
+        ts  = array('I')
+        first  = rec['start'] // BLOCK_SIZE
+        n      = (rec['next'] // BLOCK_SIZE - first) % nblocks + 1    # blocks with data
+        i      = 0 if since is None else self._search(rec, first, n, since)
+        mv = memoryview(buf)
+        done = False
+        while i < n and not done:
+            bdev.readblocks(rec['block_addr'] + (first+i) % nblocks, buf)
+            for offset in range(0, BLOCK_SIZE, ITEM_SIZE):
+                item = mv[offset:offset+ITEM_SIZE]
+                if item == BLANK_ITEM:
+                    done = True
+                    break
+                t, v = struct.unpack(ITEM_FMT, item)
+                if until is not None and t > until:
+                    return { 'timestamps': ts, 'values': val }
+                if since is None or t >= since:
+                    val.append(v)
+                    ts.append(t)
+            i += 1
+        # items not written yet
+        pending = rec.get('buffer')
+        if pending:
+            for offset in range(0, len(pending), ITEM_SIZE):
+                t, v = struct.unpack_from(ITEM_FMT, pending, offset)
+                if until is not None and t > until:
+                    break
+                if since is None or t >= since:
+                    val.append(v)
+                    ts.append(t)
+        return { 'timestamps': ts, 'values': val }
+
+    def create_record(self, key: str, capacity=1023):
+        """Create new time-series record with given key (if it does not exist already).
+        @param key: arbitrary but unique identifier
+        @param capacity (items): will be rounded to next block boundary. E.g. for BLOCK_SIZE=4096
+               capacity   blocks
+                 <512        2
+                <1024        3
+                <1536        4
+                <2048        5
+        """
+        # already in database?
+        if key in self._index:
+            return
+        # check available space in dir structure
+        if len(self._records) >= self.capacity:
+            raise TSDBException('Directory structure full')
+        if len(self._records) < 1:
+            block_addr = self._config['num_dir_blocks'] + 1
+        else:
+            r = self._records[-1]
+            block_addr = r['block_addr'] + r['nblocks']
+        nblocks = int(math.ceil((capacity+1)*ITEM_SIZE/self.BLOCK_SIZE+1))
+        # check available space for cbuf's
+        if self.free_blocks < nblocks:
+            raise TSDBException(f'Insufficient space: need {nblocks} blocks, {self.free_blocks} free')
+        # erase space for new record
+        buf = bytearray(self.BLOCK_SIZE)
+        for i in range(block_addr, block_addr+nblocks):
+            self._erase(i, buf)
+        # write new record
+        rec = struct.pack(DIR_RECORD_FMT, DIR_TYPE_CBUF, block_addr, nblocks, key.encode())
+        byte_addr = len(self._records)*DIR_RECORD_SIZE
+        block_num = byte_addr // self.BLOCK_SIZE
+        offset    = byte_addr %  self.BLOCK_SIZE
+        self._bdev.writeblocks(block_num+1, rec, offset)
+        rec = { 'key': key, 'block_addr': block_addr, 'nblocks': nblocks, 'type': DIR_TYPE_CBUF, 'start': 0, 'next': 0, 'index': len(self._records) }
+        self._records.append(rec)
+        self._index[key] = rec
+
+    def append(self, key: str, timestamp: int, value: float):
+        """Add new (timestamp, value) tuple to record, overwriting oldest entries as needed"""
+        self.extend(key, (timestamp,), (value,))
+
+    def extend(self, key: str, timestamps, values):
+        """Add items to record, overwriting oldest entries as needed.
+        Items are buffered and written to block_dev as described in TSDB.__init__."""
+        rec = self._find_record(key)
+        buf = rec.get('buffer')
+        if buf is None:
+            buf = rec['buffer'] = bytearray()
+        for i in range(len(timestamps)):
+            buf.extend(struct.pack(ITEM_FMT, timestamps[i], values[i]))
+        self._buffered += len(timestamps) * ITEM_SIZE
+        if rec['next'] % self.BLOCK_SIZE + len(buf) >= self.BLOCK_SIZE:
+            # reached end of block
+            self._flush(rec)
+        if self._buffered > self.buffer_size:
+            self.flush()
+
+    def flush(self, key: str | None = None):
+        """Write buffered items of record key (all records if None) to block_dev."""
+        for rec in (self._find_record(key),) if key else self._index.values():
+            self._flush(rec)
+
+    def delete_record(self, key: str):
+        """Mark record "deleted".
+        Note: the data is not actually removed from the database and can still be accessed by setting
+        'ignore_deleted' to False in keys and values.
+        Backup, delete, and restore the database to actually delete the data from the block_device.
+        It's not possible to "undelete" records.
+        """
+        rec = self._find_record(key)
+        self._flush(rec)
+        # write new record
+        new_rec = struct.pack(DIR_RECORD_FMT, DIR_TYPE_DEL, rec['block_addr'], rec['nblocks'], key.encode())
+        byte_addr = rec['index']*DIR_RECORD_SIZE
+        block_num = byte_addr // self.BLOCK_SIZE
+        offset    = byte_addr %  self.BLOCK_SIZE
+        self._bdev.writeblocks(block_num+1, new_rec, offset)
+        rec['type'] = DIR_TYPE_DEL
+        del self._index[key]
+
+    def __str__(self):
+        BLOCK_SIZE = self.BLOCK_SIZE
+        config = self._config
+        records = self._records
+        s = io.StringIO()
+        s.write(f"{config['description']} Version {config['version']}\n")
+        s.write(f"Blocks:  {self.NBLOCKS:4} total, {self.free_blocks:4} free\n")
+        s.write(f"Records: {self.capacity:4} total, {self.capacity-len(records):4} free\n")
+        s.write(f"{len(records)} Record(s)\n")
+        for r in records:
+            capacity = (r['nblocks']-1)*BLOCK_SIZE // ITEM_SIZE - 1
+            s.write(f"  {r['key']:30} capacity: {capacity} @ block address {r['block_addr']:4}\n")
+        return s.getvalue()
+
+    def _find_record(self, key: str, ignore_deleted=True):
+        rec = self._index.get(key)
+        if rec is not None:
+            return rec
+        if not ignore_deleted:
+            for x in self._records:
+                if x['key'] == key:
+                    return x
+        raise TSDBException(f"Record '{key}' not in database")
+
+    def _search(self, rec, first, n, t):
+        """Index (relative to first) of the last of n blocks with data whose first timestamp is <= t.
+        Reads one item per probed block."""
+        nblocks = rec['nblocks']
+        item = bytearray(ITEM_SIZE)
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            self._bdev.readblocks(rec['block_addr'] + (first+mid) % nblocks, item, 0)
+            if item != BLANK_ITEM and struct.unpack(ITEM_FMT, item)[0] <= t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return max(0, lo - 1)
+
+    def _flush(self, rec):
+        """Write buffered items of rec, one writeblocks call per (partial) block."""
+        buf = rec.get('buffer')
+        if not buf:
+            return
+        rec['buffer'] = bytearray()
+        self._buffered -= len(buf)
+        BLOCK_SIZE = self.BLOCK_SIZE
+        nblocks = rec['nblocks']
+        mv = memoryview(buf)
+        pos = 0
+        while pos < len(buf):
+            nxt = rec['next']
+            block  = nxt // BLOCK_SIZE
+            offset = nxt %  BLOCK_SIZE
+            # bytes that fit into current block
+            k = min(len(buf) - pos, BLOCK_SIZE - offset)
+            if offset + k >= BLOCK_SIZE:
+                # block full: erase next one (drops oldest items once wrapped around)
+                nxt_block = (block+1) % nblocks
+                self._erase(rec['block_addr']+nxt_block)
+                if rec['start'] // BLOCK_SIZE == nxt_block:
+                    rec['start'] = ((nxt_block+1) % nblocks) * BLOCK_SIZE
+            # write
+            self._bdev.writeblocks(rec['block_addr']+block, mv[pos:pos+k], offset)
+            # compute new p
+            rec['next'] = (nxt + k) % (nblocks * BLOCK_SIZE)
+            pos += k
+
+    def _erase(self, block_num, buf=None):
+        if _erase_block(self._bdev, block_num, buf):
+            self.erases += 1
+
+    def _read_header(self):
+        buf = bytearray(self.BLOCK_SIZE)
+        self._bdev.readblocks(0, buf)
+        if buf[0] == 0xff:
+            raise TSDBException("No valid database found on block device. Run TDDB.make_db.")
+        try:
+            buf = buf[:buf.index(b'\xff')]
+        except ValueError:
+            pass
+        self._config = json.loads(buf)
+        assert self._config['version'] == VERSION, f"version {self._config['version']} not supported"
+        assert self._config['magic'] == MAGIC, f"wrong magic number, {self._config['magic']:08x}"
+        assert self._config['block_size'] == self.BLOCK_SIZE
+
+    def _read_records(self):
+        BLOCK_SIZE = self.BLOCK_SIZE
+        buf = bytearray(BLOCK_SIZE)
+        self._records = records = []
+        for dir_block_index in range(1, self._config['num_dir_blocks']+1):
+            self._bdev.readblocks(dir_block_index, buf)
+            mv = memoryview(buf)
+            for i in range(BLOCK_SIZE // DIR_RECORD_SIZE):
+                offset = i*DIR_RECORD_SIZE
+                tp, addr, n, key = struct.unpack(DIR_RECORD_FMT, mv[offset:offset+DIR_RECORD_SIZE])
+                if tp == DIR_TYPE_BLANK:
+                    return
+                try:
+                    key = key[:key.index(b'\x00')]
+                except ValueError:
+                    pass
+                key = key.decode()
+                rec = { 'key': key, 'block_addr': addr, 'nblocks': n, 'type': tp, 'index': len(records) }
+                records.append(rec)
+                if tp == DIR_TYPE_CBUF:
+                    self._index[key] = rec
+                self._find_start_next(rec)
+
+    def _find_start_next(self, rec):
+        """Determine addresses (addr) for first item (start) and insert point (next) in circular buffer."""
+        BLOCK_SIZE = self.BLOCK_SIZE
+        buf = bytearray(BLOCK_SIZE)
+        nblocks = rec['nblocks']
+        block_addr = rec['block_addr']
+
+        nxt = -1
+        for block in range(nblocks):
+            a, b = self._block_fill(block_addr+block, buf)
+            if not a and not b:
+                # full block, check if next one is empty
+                nxt_block = (block+1) % nblocks
+                aa, bb = self._block_fill(block_addr+nxt_block, buf)
+                if aa and bb:
+                    nxt = nxt_block * BLOCK_SIZE
+                    break
+            if not a and b:
+                # partially full block
+                mv = memoryview(buf)
+                for offset in range(0, BLOCK_SIZE, ITEM_SIZE):
+                    if mv[offset:offset+ITEM_SIZE] == BLANK_ITEM:
+                        nxt = block*BLOCK_SIZE + offset
+                        break
+                assert mv[offset:offset+ITEM_SIZE] == BLANK_ITEM
+                break
+
+        if nxt == -1:
+            # empty database
+            rec['start'] = rec['next'] = 0
+            return
+        # start is beginning of first non-empty block after next
+        block = nxt // BLOCK_SIZE
+        while True:
+            block = (block+1) % nblocks
+            a, b = self._block_fill(block_addr+block, buf)
+            if not a:
+                start = block * BLOCK_SIZE
+                break
+        rec['start'] = start
+        rec['next']  = nxt
+
+    def _block_fill(self, block_num, buf):
+        """Check block status
+           @return (start empty, tail empty)"""
+        self._bdev.readblocks(block_num, buf)
+        return (buf[:8]  == BLANK_ITEM, buf[-8:] == BLANK_ITEM)
+
+
+def _erase_block(bdev, block_num, buf=None):
+    """Erase block, unless buf (bytearray of block size) is given and the block is blank already.
+    Skipping blank blocks saves erase cycles (flash wear), e.g. the first time around
+    a circular buffer created by create_record.
+    @return True if the block was erased"""
+    assert block_num < bdev.ioctl(4, None)
+    if buf is not None:
+        bdev.readblocks(block_num, buf)
+        if buf == b'\xff' * len(buf):
+            return False
+    bdev.ioctl(6, block_num)
+    return True
+
+def is_power_of_2(n):
+    return (n & (n-1) == 0) and n != 0
@@ -0,0 +1,7 @@
+import asyncio
+
+from eventbus.bus import Metrics
+
+
+async def init(interval: float = 60, instrument: bool = False):
+    asyncio.create_task(Metrics(interval=interval, instrument=instrument).metrics_task())
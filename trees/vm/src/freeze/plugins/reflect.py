@@ -5,7 +5,7 @@ from eventbus.bus import Reflect
 reflect = None
 
 
-async def init(interval: float = 10):
+async def init(interval: float = 10, window: int = 100, publish: int = 6, alert_after: int = 3):
     global reflect
-    reflect = Reflect(interval=interval)
+    reflect = Reflect(interval=interval, window=window, publish=publish, alert_after=alert_after)
     asyncio.create_task(reflect.emitter_task())
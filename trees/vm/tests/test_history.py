@@ -0,0 +1,42 @@
+"""History plugin (plugins.history) recording STATE updates to the flash TSDB.
+
+Run with: cd trees/vm; python -m pytest tests
+"""
+
+import time
+
+from eventbus import event_type, eventbus
+from eventbus.event import State
+from plugins.history import Recorder
+from plugins.history.tsdb import TSDB, FileBlockDevice
+
+
+async def test_recorder(tmp_path, monkeypatch):
+    bdev = FileBlockDevice(str(tmp_path / "tsdb.bin"), 64, 256)
+    TSDB.make_db(bdev, 8)
+    recorder = Recorder(TSDB(bdev), ["*.temp", "*.switch"], 100)
+
+    @eventbus.on(event_type.STATE)
+    def state(eid, value, timestamp, **event):
+        recorder.record(eid, value, timestamp)
+
+    # a second per update, State.update timestamps with time.time()
+    clock = [1000.0]
+
+    def now():
+        clock[0] += 1
+        return clock[0]
+
+    monkeypatch.setattr(time, "time", now)
+    temp = State("recorder.temp")
+    switch = State("recorder.switch")
+    try:
+        for v in range(5):
+            await temp.update(v)
+            await switch.update(v % 2 == 0)
+    finally:
+        eventbus.off(state)
+    recorder.flush()
+    assert [x[1] for x in recorder.query(temp.eid)] == list(range(5))
+    # bools are not recorded
+    assert recorder.query(switch.eid) is None
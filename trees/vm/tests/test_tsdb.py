@@ -0,0 +1,90 @@
+"""Flash TSDB (plugins.history.tsdb) on a file backed block device.
+
+Run with: cd trees/vm; python -m pytest tests
+"""
+
+from plugins.history.tsdb import ITEM_SIZE, TSDB, FileBlockDevice
+
+BLOCK_SIZE = 256
+PER_BLOCK = BLOCK_SIZE // ITEM_SIZE
+
+
+def _open(tmp_path, buffer_size=1024):
+    bdev = FileBlockDevice(str(tmp_path / "tsdb.bin"), 64, BLOCK_SIZE)
+    return bdev, TSDB(bdev, buffer_size)
+
+
+def _create(tmp_path, **kwargs):
+    bdev = FileBlockDevice(str(tmp_path / "tsdb.bin"), 64, BLOCK_SIZE)
+    TSDB.make_db(bdev, 8)
+    db = TSDB(bdev, **kwargs)
+    db.create_record("temp", 3 * PER_BLOCK)
+    return bdev, db
+
+
+def _scan(db, since, until):
+    d = db.values("temp")
+    return [(t, v) for t, v in zip(d["timestamps"], d["values"]) if since <= t <= until]
+
+
+def test_wrap_around(tmp_path):
+    _, db = _create(tmp_path)
+    n = 10 * PER_BLOCK
+    for t in range(n):
+        db.append("temp", 1000 + t, t)
+    db.flush()
+    d = db.values("temp")
+    ts = list(d["timestamps"])
+    # oldest items were overwritten, the rest is contiguous and ends with the last one
+    assert db.record_capacity("temp") <= len(ts) < n
+    assert ts == list(range(ts[0], 1000 + n))
+    assert list(d["values"]) == [t - 1000 for t in ts]
+    assert db.erases > 0
+
+
+def test_range(tmp_path):
+    _, db = _create(tmp_path)
+    for t in range(7 * PER_BLOCK):
+        db.append("temp", 2 * t, t)
+    db.flush()
+    first = db.values("temp")["timestamps"][0]
+    for since, until in ((0, 50), (first, first), (first + 1, first + 3 * PER_BLOCK), (first + 100, 10**6)):
+        d = db.values("temp", since, until)
+        assert list(zip(d["timestamps"], d["values"])) == _scan(db, since, until)
+    assert len(db.values("temp", 10**6, 10**7)["timestamps"]) == 0
+
+
+def test_buffered(tmp_path):
+    bdev, db = _create(tmp_path, buffer_size=4096)
+    for t in range(5):
+        db.append("temp", t, t / 2)
+    # not written yet, but returned
+    assert list(db.values("temp")["values"]) == [0, 0.5, 1, 1.5, 2]
+    assert list(db.values("temp", 1, 3)["timestamps"]) == [1, 2, 3]
+    assert len(TSDB(bdev).values("temp")["timestamps"]) == 0
+    db.flush()
+    assert list(TSDB(bdev).values("temp")["timestamps"]) == [0, 1, 2, 3, 4]
+
+
+def test_reopen(tmp_path):
+    bdev, db = _create(tmp_path)
+    for t in range(PER_BLOCK + 5):
+        db.append("temp", t, t)
+    db.flush()
+    bdev.close()
+
+    bdev, db = _open(tmp_path)
+    assert db.keys == ["temp"]
+    for t in range(PER_BLOCK + 5, 8 * PER_BLOCK):
+        db.append("temp", t, t)
+    db.flush()
+    ts = list(db.values("temp")["timestamps"])
+    assert ts == list(range(ts[0], 8 * PER_BLOCK))
+    bdev.close()
+
+    # wrapped around before reopening
+    bdev, db = _open(tmp_path)
+    assert list(db.values("temp")["timestamps"]) == ts
+    db.append("temp", 8 * PER_BLOCK, 0)
+    db.flush()
+    assert db.values("temp")["timestamps"][-1] == 8 * PER_BLOCK
@@ -0,0 +1,166 @@
+/**
+ * Compact binary encoding of events (RFC 8949 CBOR subset), see eventbus/eventbus/cbor.py.
+ *
+ * Supported types: null, boolean, number, string, Uint8Array, Array, plain objects.
+ * Decodes definite-length items only.
+ */
+
+export function encode(obj: any): Uint8Array {
+  const out: number[] = [];
+  encodeItem(out, obj);
+  return new Uint8Array(out);
+}
+
+export function decode(data: ArrayBuffer | Uint8Array): any {
+  const bytes = data instanceof Uint8Array ? data : new Uint8Array(data);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  const [obj, pos] = decodeItem(bytes, view, 0);
+  if (pos !== bytes.length) throw new Error('cbor: extra data');
+  return obj;
+}
+
+const textEncoder = new TextEncoder();
+const textDecoder = new TextDecoder();
+const scratch = new DataView(new ArrayBuffer(8));
+
+function head(out: number[], major: number, n: number) {
+  major <<= 5;
+  if (n < 24) {
+    out.push(major | n);
+  } else if (n < 0x100) {
+    out.push(major | 24, n);
+  } else if (n < 0x10000) {
+    out.push(major | 25, n >> 8, n & 0xff);
+  } else if (n < 0x100000000) {
+    out.push(major | 26, (n >>> 24) & 0xff, (n >> 16) & 0xff, (n >> 8) & 0xff, n & 0xff);
+  } else {
+    scratch.setBigUint64(0, BigInt(n));
+    out.push(major | 27);
+    for (let i = 0; i < 8; i++) out.push(scratch.getUint8(i));
+  }
+}
+
+function encodeItem(out: number[], obj: any) {
+  if (obj === null || obj === undefined) {
+    out.push(0xf6);
+  } else if (obj === true) {
+    out.push(0xf5);
+  } else if (obj === false) {
+    out.push(0xf4);
+  } else if (typeof obj === 'string') {
+    const b = textEncoder.encode(obj);
+    head(out, 3, b.length);
+    for (const x of b) out.push(x);
+  } else if (typeof obj === 'number') {
+    if (Number.isSafeInteger(obj)) {
+      if (obj >= 0) head(out, 0, obj);
+      else head(out, 1, -1 - obj);
+    } else if (Math.fround(obj) === obj || Number.isNaN(obj)) {
+      scratch.setFloat32(0, obj);
+      out.push(0xfa);
+      for (let i = 0; i < 4; i++) out.push(scratch.getUint8(i));
+    } else {
+      scratch.setFloat64(0, obj);
+      out.push(0xfb);
+      for (let i = 0; i < 8; i++) out.push(scratch.getUint8(i));
+    }
+  } else if (obj instanceof Uint8Array) {
+    head(out, 2, obj.length);
+    for (const x of obj) out.push(x);
+  } else if (Array.isArray(obj)) {
+    head(out, 4, obj.length);
+    for (const v of obj) encodeItem(out, v);
+  } else if (typeof obj === 'object') {
+    const entries = Object.entries(obj).filter(([_, v]) => v !== undefined);
+    head(out, 5, entries.length);
+    for (const [k, v] of entries) {
+      encodeItem(out, k);
+      encodeItem(out, v);
+    }
+  } else {
+    throw new Error(`cbor: cannot encode ${typeof obj}`);
+  }
+}
+
+function half(h: number): number {
+  const exp = (h >> 10) & 0x1f;
+  const mant = h & 0x3ff;
+  let val: number;
+  if (exp === 0) val = mant * 2 ** -24;
+  else if (exp === 31) val = mant ? NaN : Infinity;
+  else val = (mant + 1024) * 2 ** (exp - 25);
+  return h & 0x8000 ? -val : val;
+}
+
+function decodeItem(bytes: Uint8Array, view: DataView, pos: number): [any, number] {
+  const ib = bytes[pos++];
+  const major = ib >> 5;
+  const info = ib & 0x1f;
+  if (major === 7) {
+    switch (info) {
+      case 20:
+        return [false, pos];
+      case 21:
+        return [true, pos];
+      case 22:
+      case 23:
+        return [null, pos];
+      case 25:
+        return [half(view.getUint16(pos)), pos + 2];
+      case 26:
+        return [view.getFloat32(pos), pos + 4];
+      case 27:
+        return [view.getFloat64(pos), pos + 8];
+    }
+    throw new Error(`cbor: unsupported simple value ${info}`);
+  }
+  let n: number;
+  if (info < 24) {
+    n = info;
+  } else if (info === 24) {
+    n = bytes[pos];
+    pos += 1;
+  } else if (info === 25) {
+    n = view.getUint16(pos);
+    pos += 2;
+  } else if (info === 26) {
+    n = view.getUint32(pos);
+    pos += 4;
+  } else if (info === 27) {
+    n = Number(view.getBigUint64(pos));
+    pos += 8;
+  } else {
+    throw new Error('cbor: indefinite length items are not supported');
+  }
+  switch (major) {
+    case 0:
+      return [n, pos];
+    case 1:
+      return [-1 - n, pos];
+    case 2:
+      return [bytes.slice(pos, pos + n), pos + n];
+    case 3:
+      return [textDecoder.decode(bytes.subarray(pos, pos + n)), pos + n];
+    case 4: {
+      const res = [];
+      for (let i = 0; i < n; i++) {
+        let v: any;
+        [v, pos] = decodeItem(bytes, view, pos);
+        res.push(v);
+      }
+      return [res, pos];
+    }
+    case 5: {
+      const res = {};
+      for (let i = 0; i < n; i++) {
+        let k: any, v: any;
+        [k, pos] = decodeItem(bytes, view, pos);
+        [v, pos] = decodeItem(bytes, view, pos);
+        res[k] = v;
+      }
+      return [res, pos];
+    }
+  }
+  // major 6: tag, ignored
+  return decodeItem(bytes, view, pos);
+}
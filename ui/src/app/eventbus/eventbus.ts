@@ -3,18 +3,19 @@ import { api_get } from '../api.ts';
 import { alertDialog } from '../dialog.ts';
 import { EventEmitter, IEventEmitter } from '../event-emitter';
 import { BleBus } from './ble-bus.ts';
+import * as cbor from './cbor.ts';
 import { WsBus } from './ws-bus.ts';
 
 /** Event data over some medium, e.g. websockets or bluetooth.
  *
  *  Emits the following events:
  *    connected, disconnected(msg)
- *    msg(data: string)
+ *    msg(data: string | ArrayBuffer)
  */
 export interface Transport extends IEventEmitter {
   readonly connected: boolean;
   disconnect();
-  send(msg: string): Promise<void>;
+  send(msg: string | Uint8Array): Promise<void>;
 }
 
 /**
@@ -49,11 +50,16 @@ export interface EventBus extends IEventEmitter {
   postEvent(event: any): Promise<void>;
 }
 
+/** Requested coalescing of events into list frames (server may grant smaller values). */
+const BATCH = { size: 50, window: 0.05 };
+
 class _EventBus extends EventEmitter implements EventBus {
   private ping_interval: number = 5000;
   private _bus: Transport;
   private _connected: boolean = false;
   private _reconnect: boolean = true;
+  // wire encoding agreed with the server in the handshake ('json' or 'cbor')
+  private _encoding: string = 'json';
 
   /**
    * Connected to and authenticated with server.
@@ -65,7 +71,7 @@ class _EventBus extends EventEmitter implements EventBus {
 
   async postEvent(event: any): Promise<void> {
     try {
-      this._bus.send(JSON.stringify(event));
+      this._bus.send(this._encoding === 'cbor' ? cbor.encode(event) : JSON.stringify(event));
     } catch {
       //alertDialog('EventBus', `postEvent failed for ${JSON.stringify(event, null, 2)}`);
       console.log('EventBus', `postEvent failed for ${JSON.stringify(event, null, 2)}`);
@@ -89,6 +95,7 @@ class _EventBus extends EventEmitter implements EventBus {
     this._bus = bluetooth ? new BleBus(treeId) : new WsBus(treeId);
     const bus = this._bus;
     this._reconnect = true;
+    this._encoding = 'json';
 
     // subscribe to communication events
     bus.on('connected', () => {
@@ -106,12 +113,15 @@ class _EventBus extends EventEmitter implements EventBus {
       }
     });
 
-    bus.on('message', async (data: string) => {
-      const event = JSON.parse(data);
-      this.emit(event.type, event);
+    bus.on('message', async (data: string | ArrayBuffer) => {
+      const frame = typeof data === 'string' ? JSON.parse(data) : cbor.decode(data);
+      // frames are single events or lists of events
+      for (const event of Array.isArray(frame) ? frame : [frame]) {
+        this.emit(event.type, event);
+      }
     });
 
-    this.on('get_auth', async () => {
+    this.on('get_auth', async (event) => {
       let client_token;
       try {
         client_token = await api_get('client_token');
@@ -120,13 +130,17 @@ class _EventBus extends EventEmitter implements EventBus {
         return;
       }
       try {
-        await this.postEvent({ type: 'put_auth', token: client_token });
+        const put_auth = { type: 'put_auth', token: client_token, batch: BATCH };
+        // binary frames are supported by websockets only
+        if (bus instanceof WsBus && (event.encodings || []).includes('cbor')) put_auth['encoding'] = 'cbor';
+        await this.postEvent(put_auth);
       } catch (error) {
         alertDialog('Authentication - failed sending token to server', error.message);
       }
     });
 
     this.on('hello_connected', (event) => {
+      this._encoding = event.param.encoding || 'json';
       this.ping_interval = 1000 * event.param.timeout_interval;
       this.pingTask();
       this.wdtTask();
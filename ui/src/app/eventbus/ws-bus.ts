@@ -10,6 +10,7 @@ export class WsBus extends EventEmitter implements IEventEmitter, Transport {
     super();
     const url = `${ws_url}/ws`; // TODO: url based on treeId
     this._ws = new WebSocket(url);
+    this._ws.binaryType = 'arraybuffer'; // cbor frames
 
     // eventbus
     this._ws.addEventListener('message', (event: MessageEvent) => {
@@ -43,7 +44,7 @@ export class WsBus extends EventEmitter implements IEventEmitter, Transport {
     return this._connected;
   }
 
-  public async send(msg: any) {
+  public async send(msg: string | Uint8Array) {
     if (this.connected) this._ws.send(msg);
   }
 
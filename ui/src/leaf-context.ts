@@ -12,6 +12,9 @@ import { state_handler } from './app/eventbus/state';
 export class LeafContext extends LeafBase {
   public connected: Connected = false;
 
+  /** get_state cursor ({since, epoch}) of the last snapshot: on reconnect, fetch only changed states. */
+  private state_cursor = {};
+
   public config: Config;
   public settings: any;
   protected settings_cache: SettingsCache;
@@ -45,7 +48,7 @@ export class LeafContext extends LeafBase {
       this.connected = true;
       this._connectedProvider.setValue(this.connected, true);
       await eventbus.postEvent({ type: 'get_config', dst: '#server' });
-      await eventbus.postEvent({ type: 'get_state', dst: '#server' });
+      await eventbus.postEvent({ type: 'get_state', dst: '#server', ...this.state_cursor });
       // await eventbus.postEvent({ type: 'get_log', dst: '#server' });
     });
 
@@ -64,6 +67,17 @@ export class LeafContext extends LeafBase {
       this._stateProvider.setValue(state, true);
     });
 
+    eventbus.on('state_snapshot', (event) => {
+      // reply to get_state: [[eid, value, timestamp], ...], notify context once
+      const state = this._stateProvider.value;
+      for (const [eid, value, timestamp] of event.states) {
+        const proxy = new Proxy({ type: 'state', src: event.src, dst: event.dst, eid, value, timestamp }, state_handler);
+        state.set(eid, proxy);
+      }
+      this._stateProvider.setValue(state, true);
+      if (event.seq !== undefined) this.state_cursor = { since: event.seq, epoch: event.epoch };
+    });
+
     eventbus.on('put_config', (event) => {
       this.config = event.data;
       this._configProvider.setValue(this.config, true);
@@ -74,6 +88,12 @@ export class LeafContext extends LeafBase {
     eventbus.on('log', (event) => {
       this._logProvider.setValue([...this._logProvider.value, event]);
     });
+
+    eventbus.on('log_snapshot', (event) => {
+      // reply to get_log: records = [log event without type and dst, ...]
+      const records = event.records.map((record) => ({ type: 'log', dst: event.dst, ...record }));
+      this._logProvider.setValue([...this._logProvider.value, ...records]);
+    });
   }
 
   async connectedCallback(): Promise<void> {